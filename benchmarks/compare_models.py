@@ -0,0 +1,194 @@
+"""
+Compares a model variant (quantized, reduced precision, ONNX or distilled) against
+the fp32 PyTorch reference on the same texts: how far the outputs drift and how
+much faster the variant is.
+
+Examples:
+    python -m benchmarks.compare_models --quantize dynamic_int8
+    python -m benchmarks.compare_models --stage zero_shot --model valhalla/distilbart-mnli-12-3 \
+        --reference-model facebook/bart-large-mnli --documents 50
+    python -m benchmarks.compare_models notes/*.md --output drift.json --min-agreement 0.95
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from scripts.ingestion import CONFIG_PATH, load_config
+from scripts.file_handler import get_file_text
+from scripts.model_loader import model_id, model_settings
+from scripts.model_registry import model_registry
+from benchmarks.corpus import generate_corpus
+
+STAGES = ["zero_shot", "summarizer"]
+
+
+def token_f1(reference: str, candidate: str) -> float:
+    """
+    Computes the unigram F1 overlap (ROUGE-1) of two texts.
+
+    :param reference: The reference text.
+    :param candidate: The candidate text.
+    :return: The F1 score between 0 and 1; 1 if both texts are empty.
+    """
+    reference_tokens = Counter(reference.lower().split())
+    candidate_tokens = Counter(candidate.lower().split())
+    if not reference_tokens and not candidate_tokens:
+        return 1.0
+    overlap = sum((reference_tokens & candidate_tokens).values())
+    if not overlap:
+        return 0.0
+    precision = overlap / sum(candidate_tokens.values())
+    recall = overlap / sum(reference_tokens.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def build_service(stage: str, settings: dict, config: dict):
+    """
+    Builds an uncached, unscheduled service for a stage with the given model settings
+    and loads its model.
+
+    :param stage: "zero_shot" or "summarizer".
+    :param settings: The model configuration of the stage.
+    :param config: The configuration dictionary.
+    :return: A tuple of (service, load time in seconds).
+    """
+    start = time.perf_counter()
+    if stage == "zero_shot":
+        from scripts.zero_shot_service import ZeroShotService
+
+        service = ZeroShotService(config={"scheduler": {"enabled": False}}, model_config=settings)
+        service.classifier
+    else:
+        from scripts.summarizer import Summarizer
+
+        service = Summarizer(config=config.get("summarizer", {}), model_config=settings)
+        service.summarizer
+    return service, time.perf_counter() - start
+
+
+def run_stage(stage: str, service, texts: list[str], labels: list) -> tuple[list, list[float]]:
+    """
+    Runs every text through a service one at a time.
+
+    :param stage: "zero_shot" or "summarizer".
+    :param service: The service built by `build_service`.
+    :param texts: The input texts.
+    :param labels: The zero-shot candidate labels.
+    :return: A tuple of (outputs, per-text latencies in seconds).
+    """
+    outputs, latencies = [], []
+    for text in texts:
+        start = time.perf_counter()
+        if stage == "zero_shot":
+            outputs.append(service.predict(text, labels))
+        else:
+            outputs.append(service.summarize(text))
+        latencies.append(time.perf_counter() - start)
+    return outputs, latencies
+
+
+def compare_stage(stage: str, reference_settings: dict, candidate_settings: dict, config: dict,
+                  texts: list[str]) -> dict:
+    """
+    Measures the output drift and latency of a candidate model against the reference.
+
+    Zero-shot drift is the share of texts whose top label agrees and the absolute
+    difference of the top score; summary drift is the unigram F1 of the summaries.
+
+    :param stage: "zero_shot" or "summarizer".
+    :param reference_settings: The model configuration of the reference.
+    :param candidate_settings: The model configuration of the candidate.
+    :param config: The configuration dictionary.
+    :param texts: The input texts.
+    :return: The comparison result of the stage.
+    """
+    labels = config.get("ml_service", {}).get("labels", [])
+    result = {}
+    outputs = {}
+    for name, settings in (("reference", reference_settings), ("candidate", candidate_settings)):
+        service, load_seconds = build_service(stage, settings, config)
+        outputs[name], latencies = run_stage(stage, service, texts, labels)
+        result[name] = {"model": model_id(model_settings(stage, settings)), "load_seconds": load_seconds,
+                        "mean_seconds": statistics.fmean(latencies), "median_seconds": statistics.median(latencies)}
+        if stage == "zero_shot":
+            service.close()
+        # Only one of the two models is resident at a time.
+        model_registry.unload()
+
+    result["speedup"] = (result["reference"]["mean_seconds"] / result["candidate"]["mean_seconds"]
+                         if result["candidate"]["mean_seconds"] else 0.0)
+    pairs = list(zip(outputs["reference"], outputs["candidate"]))
+    if stage == "zero_shot":
+        result["label_agreement"] = sum(ref[0] == cand[0] for ref, cand in pairs) / len(pairs)
+        score_drift = [abs(ref[1] - cand[1]) for ref, cand in pairs if ref[0] == cand[0]]
+        result["mean_score_drift"] = statistics.fmean(score_drift) if score_drift else 0.0
+        result["max_score_drift"] = max(score_drift, default=0.0)
+    else:
+        overlaps = [token_f1(ref, cand) for ref, cand in pairs]
+        result["mean_summary_f1"] = statistics.fmean(overlaps)
+        result["min_summary_f1"] = min(overlaps)
+    return result
+
+
+def load_texts(args: argparse.Namespace) -> list[str]:
+    """
+    Reads the given files, or generates a synthetic corpus if none are given.
+
+    :param args: The parsed command-line arguments.
+    :return: The non-empty input texts.
+    """
+    if args.paths:
+        return [text for text in (get_file_text(str(path)) for path in args.paths) if text]
+    with tempfile.TemporaryDirectory(prefix="pkdm-compare-") as temp_dir:
+        paths = generate_corpus(Path(temp_dir), args.documents, seed=args.seed)
+        return [path.read_text(encoding="utf-8") for path in paths]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare a model variant against the fp32 reference.")
+    parser.add_argument("paths", nargs="*", type=Path, help="Input files; a synthetic corpus if omitted.")
+    parser.add_argument("--stage", choices=STAGES, action="append", help="Stage to compare; default all.")
+    parser.add_argument("--documents", type=int, default=10, help="Size of the synthetic corpus.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the synthetic corpus.")
+    parser.add_argument("--config", type=Path, default=CONFIG_PATH, help="Configuration file.")
+    parser.add_argument("--model", help="Candidate model id or path; defaults to the configured model.")
+    parser.add_argument("--reference-model", help="Reference model id or path; defaults to the candidate model.")
+    parser.add_argument("--backend", choices=["pytorch", "onnx"], help="Candidate backend.")
+    parser.add_argument("--dtype", choices=["float32", "bfloat16", "float16"], help="Candidate dtype.")
+    parser.add_argument("--quantize", choices=["dynamic_int8"], help="Candidate quantization.")
+    parser.add_argument("--threads", type=int, help="Intra-op threads for both models.")
+    parser.add_argument("--output", type=Path, help="Write the result as JSON to this file.")
+    parser.add_argument("--min-agreement", type=float, default=0.0,
+                        help="Exit with status 1 if the zero-shot label agreement is lower.")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    texts = load_texts(args)
+    if not texts:
+        print("No input texts.")
+        return 1
+
+    overrides = {key: value for key, value in (("model", args.model), ("backend", args.backend),
+                                               ("dtype", args.dtype), ("quantize", args.quantize),
+                                               ("threads", args.threads)) if value is not None}
+    results = {"texts": len(texts), "stages": {}}
+    for stage in args.stage or STAGES:
+        candidate = {**config.get("models", {}).get(stage, {}), **overrides}
+        reference = {**candidate, "backend": "pytorch", "dtype": "float32", "quantize": None}
+        if args.reference_model:
+            reference["model"] = args.reference_model
+        results["stages"][stage] = compare_stage(stage, reference, candidate, config, texts)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    agreement = results["stages"].get("zero_shot", {}).get("label_agreement", 1.0)
+    return 1 if agreement < args.min_agreement else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
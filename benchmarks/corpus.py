@@ -0,0 +1,151 @@
+import random
+from pathlib import Path
+
+# Document kinds and the share of the corpus each one takes by default.
+DEFAULT_MIX = {
+    "meeting": 0.3,
+    "code": 0.2,
+    "article": 0.25,
+    "long": 0.05,
+    "transcript": 0.2,
+}
+
+_WORDS = (
+    "system data model result analysis process design method value network user performance study "
+    "approach problem solution research paper feature function memory index query cache latency "
+    "throughput document note project team budget plan review release customer service report"
+).split()
+_NAMES = ["Alice", "Bob", "Carol", "Dave", "Erin", "Frank", "Grace", "Heidi", "Ivan", "Judy"]
+_ORGS = ["Acme Corp", "Globex", "Initech", "Umbrella", "Stark Industries", "Wayne Enterprises"]
+_VERBS = ["review", "send", "prepare", "update", "schedule", "fix", "write", "check", "deploy", "share"]
+
+
+def _sentence(rng: random.Random, min_words: int = 8, max_words: int = 20) -> str:
+    words = rng.choices(_WORDS, k=rng.randint(min_words, max_words))
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng: random.Random, sentences: int) -> str:
+    return " ".join(_sentence(rng) for _ in range(sentences))
+
+
+def meeting_notes(rng: random.Random) -> str:
+    """
+    Generates a meeting note with attendees, agenda, discussion and action items.
+
+    :param rng: The random generator.
+    :return: The document text.
+    """
+    attendees = ", ".join(rng.sample(_NAMES, 4))
+    lines = [f"# Weekly sync with {rng.choice(_ORGS)}", "", f"Attendees: {attendees}", "", "## Agenda"]
+    lines += [f"- {_sentence(rng, 3, 6)}" for _ in range(rng.randint(3, 6))]
+    lines += ["", "## Discussion", _paragraph(rng, rng.randint(4, 10)), "", "## Action items"]
+    lines += [f"- [ ] {rng.choice(_NAMES)} will {rng.choice(_VERBS)} the {rng.choice(_WORDS)} by Friday"
+              for _ in range(rng.randint(2, 6))]
+    return "\n".join(lines) + "\n"
+
+
+def code_snippet(rng: random.Random) -> str:
+    """
+    Generates a Python module with a few functions and a class.
+
+    :param rng: The random generator.
+    :return: The document text.
+    """
+    lines = ["import os", "import sys", ""]
+    for index in range(rng.randint(3, 8)):
+        name = f"{rng.choice(_VERBS)}_{rng.choice(_WORDS)}_{index}"
+        lines += [f"def {name}(value, limit=10):", f'    """{_sentence(rng, 4, 8)}"""',
+                  "    result = []", "    for item in range(limit):", "        result.append(value * item)",
+                  "    return result", ""]
+    lines += [f"class {rng.choice(_WORDS).capitalize()}Manager:", "    def __init__(self):",
+              "        self.items = {}", ""]
+    return "\n".join(lines)
+
+
+def article(rng: random.Random) -> str:
+    """
+    Generates a technical article with an introduction, sections and a conclusion.
+
+    :param rng: The random generator.
+    :return: The document text.
+    """
+    sections = [f"# A study of {rng.choice(_WORDS)} {rng.choice(_WORDS)}",
+                f"Published by {rng.choice(_NAMES)} at {rng.choice(_ORGS)}.", "Introduction",
+                _paragraph(rng, rng.randint(5, 10))]
+    for _ in range(rng.randint(2, 5)):
+        sections += [f"{rng.choice(_WORDS).capitalize()} {rng.choice(_WORDS)}", _paragraph(rng, rng.randint(5, 12))]
+    sections += ["Conclusion", _paragraph(rng, rng.randint(3, 6))]
+    return "\n\n".join(sections) + "\n"
+
+
+def long_document(rng: random.Random, pages: int = 60) -> str:
+    """
+    Generates a long multi-page report, standing in for the text of a long PDF.
+
+    :param rng: The random generator.
+    :param pages: The number of pages, each a heading and a few paragraphs.
+    :return: The document text.
+    """
+    elements = []
+    for page in range(1, pages + 1):
+        elements.append(f"Section {page}: {rng.choice(_WORDS).capitalize()} {rng.choice(_WORDS)}")
+        elements += [_paragraph(rng, rng.randint(4, 8)) for _ in range(3)]
+    return "\n\n".join(elements) + "\n"
+
+
+def transcript(rng: random.Random, lines: int = 400) -> str:
+    """
+    Generates a line-heavy meeting transcript with the occasional actionable line.
+
+    :param rng: The random generator.
+    :param lines: The number of transcript lines.
+    :return: The document text.
+    """
+    output = []
+    for index in range(lines):
+        speaker = rng.choice(_NAMES)
+        minute, second = divmod(index * 7, 60)
+        if rng.random() < 0.1:
+            text = f"I will {rng.choice(_VERBS)} the {rng.choice(_WORDS)} by tomorrow."
+        else:
+            text = _sentence(rng, 5, 15)
+        output.append(f"[{minute:02d}:{second:02d}] {speaker}: {text}")
+    return "\n".join(output) + "\n"
+
+
+GENERATORS = {
+    "meeting": (meeting_notes, ".md"),
+    "code": (code_snippet, ".py"),
+    "article": (article, ".txt"),
+    "long": (long_document, ".txt"),
+    "transcript": (transcript, ".txt"),
+}
+
+
+def generate_corpus(directory: Path, size: int, mix: dict[str, float] | None = None, seed: int = 0) -> list[Path]:
+    """
+    Writes a synthetic corpus of documents into the given directory.
+
+    The same size, mix and seed always produce the same files, so runs are comparable.
+
+    :param directory: The directory the documents are written to.
+    :param size: The number of documents.
+    :param mix: The share of each document kind; defaults to DEFAULT_MIX.
+    :param seed: The random seed.
+    :return: The paths of the generated documents.
+    """
+    mix = mix or DEFAULT_MIX
+    rng = random.Random(seed)
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    directory.mkdir(parents=True, exist_ok=True)
+
+    paths = []
+    for index in range(size):
+        kind = rng.choices(kinds, weights=weights)[0]
+        generator, extension = GENERATORS[kind]
+        path = directory / f"{index:05d}-{kind}{extension}"
+        path.write_text(generator(rng), encoding="utf-8")
+        paths.append(path)
+    return paths
@@ -0,0 +1,283 @@
+"""
+Benchmarks every stage of the ingestion pipeline on a synthetic corpus.
+
+Examples:
+    python -m benchmarks.run_benchmark --documents 200 --output bench.json
+    python -m benchmarks.run_benchmark --documents 200 --baseline bench.json
+    python -m benchmarks.run_benchmark --documents 20 --models real
+    python -m benchmarks.run_benchmark --documents 200 --batch 32
+"""
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from scripts.ingestion import CONFIG_PATH, PROJECT_ROOT, IngestionService, archive_file, load_config
+from scripts.file_handler import get_file_text
+from scripts.data_models import ClassifiedData
+from scripts.hybrid_classifier import HybridClassifier
+from scripts.enrichment_pipeline import EnrichmentPipeline
+from scripts.kb_integrator import KBIntegrator
+from scripts.metrics import metrics
+from benchmarks.corpus import DEFAULT_MIX, generate_corpus
+
+STAGES = ["get_file_text", "classify", "enrich", "create_note", "archive"]
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """
+    Parses a document mix such as "meeting=0.5,code=0.5".
+
+    :param value: The mix specification.
+    :return: A mapping of document kind to its share.
+    """
+    mix = {}
+    for part in value.split(","):
+        kind, _, share = part.partition("=")
+        if kind.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown document kind: {kind}")
+        mix[kind.strip()] = float(share)
+    return mix
+
+
+def build_components(config: dict, models: str, delay: float):
+    """
+    Builds the classifier and enrichment pipeline with real models or stand-ins.
+
+    :param config: The configuration dictionary.
+    :param models: "stub" for deterministic stand-ins, "real" for the configured models.
+    :param delay: Simulated model time per call for the stand-ins, in seconds.
+    :return: A tuple of (HybridClassifier, EnrichmentPipeline).
+    """
+    if models == "stub":
+        from benchmarks.stubs import StubNerEnricher, StubSummarizer, StubZeroShotService
+
+        zs_service = StubZeroShotService(config=config.get("ml_service", {}), delay_per_pair=delay)
+        enrichment_pipeline = EnrichmentPipeline(
+            zs_service=zs_service, config=config, enricher=StubNerEnricher(),
+            summarizer=StubSummarizer(config=config.get("summarizer", {}), delay_per_text=delay)
+        )
+    else:
+        from scripts.zero_shot_service import ZeroShotService
+
+        zs_service = ZeroShotService(config=config.get("ml_service", {}),
+                                     model_config=config.get("models", {}).get("zero_shot"))
+        enrichment_pipeline = EnrichmentPipeline(zs_service=zs_service, config=config)
+    return HybridClassifier(config=config, zs_service=zs_service), enrichment_pipeline
+
+
+def summarize_timings(samples: list[float]) -> dict:
+    """
+    Computes summary statistics of a list of timings.
+
+    :param samples: The timings in seconds.
+    :return: A dictionary with count, total, mean, median, p95 and max.
+    """
+    if not samples:
+        return {"count": 0, "total": 0.0, "mean": 0.0, "median": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "total": sum(ordered),
+        "mean": statistics.fmean(ordered),
+        "median": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        "max": ordered[-1],
+    }
+
+
+def run(args: argparse.Namespace) -> dict:
+    """
+    Generates the corpus, runs every stage per document and collects the timings.
+
+    :param args: The parsed command-line arguments.
+    :return: The benchmark result.
+    """
+    config = load_config(args.config)
+    # Measure the pipeline itself, not the on-disk inference cache.
+    config["cache"] = {"enabled": False}
+    labels = config.get("ml_service", {}).get("labels", [])
+
+    timings = {stage: [] for stage in STAGES}
+    with tempfile.TemporaryDirectory(prefix="pkdm-bench-") as temp_dir:
+        temp_path = Path(temp_dir)
+        paths = generate_corpus(temp_path / "inbox", args.documents, args.mix, args.seed)
+
+        hybrid_classifier, enrichment_pipeline = build_components(config, args.models, args.stub_delay)
+        kb_integrator = KBIntegrator(temp_path / "vault", config.get("templates", {}), project_root=PROJECT_ROOT)
+
+        run_start = time.perf_counter()
+        for path in paths:
+            file_path = str(path)
+            start = time.perf_counter()
+            text = get_file_text(file_path) or ""
+            timings["get_file_text"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            category = hybrid_classifier.classify(text=text, labels=labels, source_path=file_path)
+            timings["classify"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            enriched_data = enrichment_pipeline.run(ClassifiedData(text=text, source_path=file_path,
+                                                                   category=category))
+            timings["enrich"].append(time.perf_counter() - start)
+            if enriched_data is None:
+                continue
+
+            start = time.perf_counter()
+            final_path = kb_integrator.create_note(data=enriched_data)
+            timings["create_note"].append(time.perf_counter() - start)
+            if not final_path:
+                continue
+
+            start = time.perf_counter()
+            archive_file(file_path, temp_path / "archive")
+            timings["archive"].append(time.perf_counter() - start)
+        wall_seconds = time.perf_counter() - run_start
+    # Models load lazily during the first documents that need them; the run includes that cold start.
+    model_load_seconds = metrics.snapshot()["stages"].get("model_load", {}).get("wall_seconds", 0.0)
+
+    return {
+        "parameters": {"documents": args.documents, "mix": args.mix or DEFAULT_MIX, "seed": args.seed,
+                       "models": args.models, "stub_delay": args.stub_delay},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "processor": platform.processor()},
+        "model_load_seconds": model_load_seconds,
+        "wall_seconds": wall_seconds,
+        "documents_per_second": args.documents / wall_seconds if wall_seconds else 0.0,
+        "stages": {stage: summarize_timings(samples) for stage, samples in timings.items()},
+        "classifier_cascade": dict(hybrid_classifier.stats),
+    }
+
+
+def run_batches(args: argparse.Namespace) -> dict:
+    """
+    Generates the corpus and runs it through `IngestionService.process_batch` in
+    batches of `args.batch` documents, as the watcher does.
+
+    Conversion, duplicate detection, the indexes and the note writes run as in
+    production; the stage timings are the totals the service records in the metrics.
+
+    :param args: The parsed command-line arguments.
+    :return: The benchmark result.
+    """
+    config = load_config(args.config)
+    # Measure the pipeline itself, not the on-disk inference cache.
+    config["cache"] = {"enabled": False}
+    if args.models == "stub":
+        # There is no stand-in for the embedding model.
+        config["similar_notes"] = {"enabled": False}
+
+    batch_timings = []
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="pkdm-bench-") as temp_dir:
+        temp_path = Path(temp_dir)
+        # The service keeps its indexes and spool files under the project root, so it gets a temporary one.
+        shutil.copytree(PROJECT_ROOT / "templates", temp_path / "templates")
+        paths = generate_corpus(temp_path / "inbox", args.documents, args.mix, args.seed)
+
+        metrics.reset()
+        service = IngestionService(config, vault_path=temp_path / "vault", archive_path=temp_path / "archive",
+                                   project_root=temp_path)
+        service.hybrid_classifier, service.enrichment_pipeline = build_components(config, args.models,
+                                                                                  args.stub_delay)
+        run_start = time.perf_counter()
+        for index in range(0, len(paths), args.batch):
+            start = time.perf_counter()
+            results.update(service.process_batch([str(path) for path in paths[index:index + args.batch]]))
+            batch_timings.append(time.perf_counter() - start)
+        service.flush()
+        wall_seconds = time.perf_counter() - run_start
+        for index in (service.source_index, service.duplicate_index, service.entity_index):
+            if index is not None:
+                index.close()
+    snapshot = metrics.snapshot()
+    stages = {name: {"calls": totals["calls"], "total": totals["wall_seconds"], "cpu_total": totals["cpu_seconds"],
+                     "mean": totals["wall_seconds"] / args.documents if args.documents else 0.0}
+              for name, totals in snapshot["stages"].items() if name != "model_load"}
+
+    return {
+        "parameters": {"documents": args.documents, "mix": args.mix or DEFAULT_MIX, "seed": args.seed,
+                       "models": args.models, "stub_delay": args.stub_delay, "batch": args.batch},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "processor": platform.processor()},
+        "model_load_seconds": snapshot["stages"].get("model_load", {}).get("wall_seconds", 0.0),
+        "wall_seconds": wall_seconds,
+        "documents_per_second": args.documents / wall_seconds if wall_seconds else 0.0,
+        "succeeded": sum(1 for final_path in results.values() if final_path),
+        "batches": summarize_timings(batch_timings),
+        # Per stage, "mean" is the time spent per document of the corpus.
+        "stages": stages,
+        "classifier_cascade": dict(service.hybrid_classifier.stats),
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Compares the mean stage timings and throughput against a baseline result.
+
+    :param result: The current benchmark result.
+    :param baseline: The baseline benchmark result.
+    :param tolerance: The allowed relative slowdown, e.g. 0.1 for 10%.
+    :return: A list of regressions; empty if none.
+    """
+    regressions = []
+    print(f"{'stage':<16}{'baseline':>14}{'current':>14}{'change':>10}")
+    for stage in result["stages"]:
+        old = baseline.get("stages", {}).get(stage, {}).get("mean", 0.0)
+        new = result["stages"][stage]["mean"]
+        change = (new - old) / old if old else 0.0
+        print(f"{stage:<16}{old * 1000:>12.3f}ms{new * 1000:>12.3f}ms{change:>+10.1%}")
+        if old and change > tolerance:
+            regressions.append(f"{stage} mean {old * 1000:.3f}ms -> {new * 1000:.3f}ms ({change:+.1%})")
+
+    old_rate = baseline.get("documents_per_second", 0.0)
+    new_rate = result["documents_per_second"]
+    print(f"{'docs/second':<16}{old_rate:>14.2f}{new_rate:>14.2f}")
+    if old_rate and new_rate < old_rate * (1 - tolerance):
+        regressions.append(f"throughput {old_rate:.2f} -> {new_rate:.2f} documents/second")
+    if result["parameters"] != baseline.get("parameters"):
+        print("Warning: benchmark parameters differ from the baseline.")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the ingestion pipeline on a synthetic corpus.")
+    parser.add_argument("--documents", type=int, default=100, help="Number of documents to generate.")
+    parser.add_argument("--mix", type=parse_mix, default=None,
+                        help="Document mix, e.g. meeting=0.3,code=0.2,article=0.25,long=0.05,transcript=0.2")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the corpus.")
+    parser.add_argument("--models", choices=["stub", "real"], default="stub",
+                        help="Use deterministic stand-ins or the real models.")
+    parser.add_argument("--stub-delay", type=float, default=0.0,
+                        help="Simulated model time per call for the stand-ins, in seconds.")
+    parser.add_argument("--batch", type=int,
+                        help="Run the corpus through IngestionService.process_batch in batches of this size "
+                             "instead of timing each stage per document.")
+    parser.add_argument("--config", type=Path, default=CONFIG_PATH, help="Configuration file.")
+    parser.add_argument("--output", type=Path, help="Write the result as JSON to this file.")
+    parser.add_argument("--baseline", type=Path, help="Compare against a previous JSON result.")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative slowdown.")
+    args = parser.parse_args()
+
+    result = run_batches(args) if args.batch else run(args)
+    print(json.dumps({"documents_per_second": result["documents_per_second"],
+                      "model_load_seconds": result["model_load_seconds"],
+                      "stage_means_ms": {stage: stats["mean"] * 1000 for stage, stats in result["stages"].items()}},
+                     indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    if args.baseline:
+        regressions = compare(result, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
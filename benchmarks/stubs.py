@@ -0,0 +1,122 @@
+"""
+Deterministic, fast stand-ins for the transformer and spaCy models.
+
+The stand-ins replace only the model objects; caching, batching, chunking and the
+rest of the service code run unchanged, so a benchmark with stubs measures the
+pure-Python overhead of the pipeline.
+"""
+import hashlib
+import re
+import time
+from scripts.zero_shot_service import ZeroShotService
+from scripts.summarizer import Summarizer
+from scripts.enricher import NerEnricher
+
+
+def _stable_score(*parts: str) -> float:
+    digest = hashlib.blake2b("\x00".join(parts).encode("utf-8", "surrogatepass"), digest_size=4).digest()
+    return int.from_bytes(digest, "big") / 0xFFFFFFFF
+
+
+class StubZeroShotPipeline:
+    def __init__(self, delay_per_pair: float = 0.0) -> None:
+        """
+        :param delay_per_pair: Simulated model time per sequence/label pair, in seconds.
+        """
+        self.delay_per_pair = delay_per_pair
+
+    def __call__(self, sequences, candidate_labels, batch_size: int = 1, **kwargs):
+        single = isinstance(sequences, str)
+        results = []
+        for sequence in [sequences] if single else sequences:
+            raw = [_stable_score(sequence, label) for label in candidate_labels]
+            total = sum(raw) or 1.0
+            ranked = sorted(zip(candidate_labels, (score / total for score in raw)), key=lambda item: -item[1])
+            results.append({"sequence": sequence, "labels": [label for label, _ in ranked],
+                            "scores": [score for _, score in ranked]})
+        if self.delay_per_pair:
+            time.sleep(self.delay_per_pair * len(results) * len(candidate_labels))
+        return results[0] if single else results
+
+
+class StubTokenizer:
+    model_max_length = 1024
+
+    def __call__(self, texts, add_special_tokens: bool = True):
+        return {"input_ids": [text.split() for text in texts]}
+
+    def decode(self, ids) -> str:
+        return " ".join(ids)
+
+    def num_special_tokens_to_add(self, pair: bool = False) -> int:
+        return 2
+
+
+class StubSummarizationPipeline:
+    def __init__(self, delay_per_text: float = 0.0) -> None:
+        """
+        :param delay_per_text: Simulated model time per summarized text, in seconds.
+        """
+        self.delay_per_text = delay_per_text
+        self.tokenizer = StubTokenizer()
+
+    def __call__(self, texts, max_length: int = 150, min_length: int = 40, **kwargs):
+        texts = [texts] if isinstance(texts, str) else texts
+        if self.delay_per_text:
+            time.sleep(self.delay_per_text * len(texts))
+        return [{"summary_text": " ".join(text.split()[:max_length])} for text in texts]
+
+
+class _StubSpan:
+    def __init__(self, text: str, label: str) -> None:
+        self.text = text
+        self.label_ = label
+
+
+class _StubDoc:
+    def __init__(self, ents: list[_StubSpan]) -> None:
+        self.ents = ents
+
+
+class StubNlp:
+    # Runs of capitalized words; the label only depends on the matched text.
+    ENTITY_PATTERN = re.compile(r"\b[A-Z][a-z]+(?: [A-Z][a-z]+)*\b")
+    LABELS = ["PERSON", "ORG", "GPE", "DATE"]
+
+    def __call__(self, text: str) -> _StubDoc:
+        ents = [_StubSpan(match.group(0), self.LABELS[len(match.group(0)) % len(self.LABELS)])
+                for match in self.ENTITY_PATTERN.finditer(text)]
+        return _StubDoc(ents)
+
+    def pipe(self, texts, batch_size: int = 1, **kwargs):
+        for text in texts:
+            yield self(text)
+
+
+class StubZeroShotService(ZeroShotService):
+    def __init__(self, *args, delay_per_pair: float = 0.0, **kwargs) -> None:
+        self.delay_per_pair = delay_per_pair
+        super().__init__(*args, **kwargs)
+        self.model_name = "stub/zero-shot"
+
+    def _load_pipeline(self):
+        return StubZeroShotPipeline(self.delay_per_pair)
+
+
+class StubSummarizer(Summarizer):
+    def __init__(self, *args, delay_per_text: float = 0.0, **kwargs) -> None:
+        self.delay_per_text = delay_per_text
+        super().__init__(*args, **kwargs)
+        self.model_name = "stub/summarizer"
+
+    def _load_pipeline(self):
+        return StubSummarizationPipeline(self.delay_per_text)
+
+
+class StubNerEnricher(NerEnricher):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.model_name = "stub/ner"
+
+    def _load_model(self):
+        return StubNlp()
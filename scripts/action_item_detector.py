@@ -1,15 +1,71 @@
 from scripts.logging_config import setup_logging
 import logging
+import re
+import time
+from collections import Counter
 from typing import List
 from scripts.zero_shot_service import ZeroShotService
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
+# Explicit task markers: an unchecked checkbox, or an upper-case TODO/FIXME/ACTION tag followed by
+# ":", "(" or "-", each with content after it. Lines carrying one are action items without asking the
+# model; headings and prose such as "Action items:" or "Todo list review" are not markers.
+TASK_MARKER_PATTERN = re.compile(r"^\s*(?:[-*+]\s*)?(?:\[ \]\s+\S|(?:TODO|FIXME|ACTION(?: ITEM)?)\s*[:(-]\s*\S)")
+# The list bullet and unchecked checkbox in front of a line; the note template adds its own.
+CHECKBOX_PREFIX_PATTERN = re.compile(r"^\s*(?:[-*+]\s*)?(?:\[ \]\s*)?")
+
+# Cheap cues that a line might be actionable; lines without any of them never reach the model.
+ACTION_CUE_PATTERNS = [
+    # Checkbox markers, including already ticked ones.
+    re.compile(r"^\s*(?:[-*+]\s*)?\[[ xX]?\]"),
+    # Task keywords.
+    re.compile(r"\b(?:todo|to-do|fixme|action items?|follow[- ]?up|deadline|due|reminder|remind|asap|task)\b",
+               re.IGNORECASE),
+    # @mentions of an owner.
+    re.compile(r"(?<![\w.])@\w+"),
+    # Obligations and requests.
+    re.compile(r"\b(?:need(?:s)? to|have to|has to|must|should|will|going to|please|let's|assigned to|owner)\b",
+               re.IGNORECASE),
+    # Dates and relative deadlines.
+    re.compile(r"\b(?:\d{4}-\d{2}-\d{2}|\d{1,2}[/.]\d{1,2}(?:[/.]\d{2,4})?|today|tomorrow|tonight|eod|eow|"
+               r"next (?:week|month)|this (?:week|month)|by (?:monday|tuesday|wednesday|thursday|friday|"
+               r"saturday|sunday|end of)|(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]* \d{1,2})\b",
+               re.IGNORECASE),
+    # Imperative verbs at the start of the line (after an optional bullet or number).
+    re.compile(r"^\s*(?:[-*+•]|\d+[.)])?\s*(?:add|arrange|ask|book|buy|call|check|clean|confirm|contact|create|"
+               r"decide|deliver|deploy|draft|email|finish|fix|follow|investigate|make|meet|organi[sz]e|plan|"
+               r"prepare|read|reply|request|review|schedule|send|set up|setup|share|submit|test|update|"
+               r"upload|write)\b", re.IGNORECASE),
+]
+
+
+def is_action_candidate(sentence: str) -> bool:
+    """
+    Checks whether the given line carries any lexical cue of being actionable.
+
+    :param sentence: The line that should be checked.
+    :return: True if the line should be passed on to the zero-shot model, otherwise False.
+    """
+    return any(pattern.search(sentence) for pattern in ACTION_CUE_PATTERNS)
+
 
 class ActionItemDetector:
-    def __init__(self, zs_service: ZeroShotService) -> None:
-        self.confidence_threshold = 0.5
+    def __init__(self, zs_service: ZeroShotService, config: dict | None = None) -> None:
+        """
+        Initializes the ActionItemDetector instance.
+
+        :param zs_service: The ZeroShotService instance used to classify candidate lines.
+        :param config: The `action_items` configuration section with the confidence
+            threshold, rule pre-filter switch, batch size and per-document time budget.
+        :return: None
+        """
+        config = config or {}
+        self.confidence_threshold = config.get("confidence_threshold", 0.5)
+        self.prefilter = config.get("prefilter", True)
+        self.batch_size = config.get("batch_size", 16)
+        self.time_budget_seconds = config.get("time_budget_seconds")
         try:
             self.service = zs_service
             logging.info("Zero-shot classification model loaded successfully.")
@@ -24,30 +80,83 @@ class ActionItemDetector:
         The function takes in the text content and the list of labels to classify into.
         It returns a list of action items detected in the text content.
 
-        The function splits the text content into individual sentences, and then
-        uses the zero-shot classification model to classify each sentence into one
-        of the predefined labels. If the confidence score is above the
-        threshold (0.75), the sentence is considered an action item.
+        The text is split into lines and passed through a cascade: lines with an
+        explicit task marker (unchecked checkbox, "TODO:") are accepted directly, lines
+        without any lexical cue are dropped, and the remaining candidates are classified
+        by the zero-shot model in batches. A candidate whose top label is one of the
+        given labels with a confidence score above the threshold is an action item.
 
         :param text: The text content to detect action items from.
         :param labels: The list of labels to classify into.
         :return: A list of action items detected in the text content.
-        :raises Exception: If there is an error during the detection process.
         """
-        sentences = text.split('\n')
-        action_items = []
-        try:
-            for sentence in sentences:
+        return self.detect_batch([text], labels)[0]
+
+    def detect_batch(self, texts: list[str], labels: list, batch_size: int | None = None) -> list[List[str]]:
+        """
+        Detects action items in several texts with batched zero-shot classification.
+
+        The candidate lines of all texts are classified together, so the model runs
+        padded batches across documents instead of one call per line. Predictions are
+        cached per line, so an edited document only pays for its changed lines. If a
+        time budget is configured, the lines of a text stop being sent to the model once
+        `time_budget_seconds` of model time has been spent on that text (a batch's time
+        is shared among its lines); its lines that were not classified by then are not
+        reported, while the other texts keep their own budget.
+
+        Reported lines are stripped of their list bullet and unchecked checkbox.
+
+        :param texts: The text contents to detect action items from.
+        :param labels: The list of labels to classify into.
+        :param batch_size: The number of lines per forward pass; defaults to the configured batch size.
+        :return: A list with the detected action items for each text, in the order of `texts`.
+        """
+        batch_size = batch_size or self.batch_size
+        action_items: list[List[str]] = [[] for _ in texts]
+        # Each entry is (text index, line index, line) so results can be put back in document order.
+        accepted = []
+        candidates = []
+        for index, text in enumerate(texts):
+            for line_index, sentence in enumerate(text.split('\n')):
                 sentence = sentence.strip()
                 if not sentence:
                     continue
-                results = self.service.predict(sentence, labels)
-                if results and isinstance(results, dict):
-                    label = results.get('labels', [""])[0]
-                    score = results.get('scores', [0.0])[0]
+                if self.prefilter and TASK_MARKER_PATTERN.search(sentence):
+                    accepted.append((index, line_index, sentence))
+                elif not self.prefilter or is_action_candidate(sentence):
+                    candidates.append((index, line_index, sentence))
+
+        # Model time spent on each text, so one long document cannot use up the budget of the others.
+        spent = [0.0] * len(texts)
+        skipped = Counter()
+        position = 0
+        try:
+            while position < len(candidates):
+                batch = []
+                while position < len(candidates) and len(batch) < batch_size:
+                    candidate = candidates[position]
+                    position += 1
+                    if self.time_budget_seconds and spent[candidate[0]] >= self.time_budget_seconds:
+                        skipped[candidate[0]] += 1
+                    else:
+                        batch.append(candidate)
+                if not batch:
+                    break
+                started = time.monotonic()
+                predictions = self.service.predict_batch([sentence for _, _, sentence in batch], labels,
+                                                         batch_size=batch_size, stage="action_items")
+                elapsed = time.monotonic() - started
+                for candidate, (label, score) in zip(batch, predictions):
+                    spent[candidate[0]] += elapsed / len(batch)
                     if label in labels and score >= self.confidence_threshold:
-                        action_items.append(sentence)
-            return action_items
+                        accepted.append(candidate)
         except Exception as e:
             logger.error(f"Failed to detect action items: {e}")
-            return []
+        for index, count in sorted(skipped.items()):
+            logger.warning(f"Action item time budget exhausted for text {index}, "
+                           f"{count} candidate lines left unclassified")
+
+        for index, _, sentence in sorted(accepted):
+            action_items[index].append(CHECKBOX_PREFIX_PATTERN.sub("", sentence, count=1))
+        logger.info(f"Action item detection: {len(accepted)} items from {len(candidates)} model candidates")
+        return action_items
@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 
 @dataclass
@@ -8,6 +8,8 @@ class ClassifiedData:
     source_path: str
     category: str = "uncategorized"
     tags: List[str] = field(default_factory=list)
+    # For streamed inputs: the full text on disk, of which `text` holds a bounded sample.
+    body_path: Optional[str] = None
 
 
 @dataclass
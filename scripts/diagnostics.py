@@ -0,0 +1,104 @@
+import argparse
+import re
+import subprocess
+import sys
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from scripts.logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+IMPORTTIME_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+# Libraries that take seconds to import and should only be loaded when a model runs.
+HEAVY_MODULES = ("torch", "transformers", "spacy", "unstructured", "optimum", "onnxruntime")
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> list[ImportRecord]:
+    """
+    Parses the report Python writes to stderr when run with `-X importtime`.
+
+    :param output: The stderr output.
+    :return: One record per imported module, in the order the imports finished.
+    """
+    records = []
+    for line in output.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            records.append(ImportRecord(module=match.group(4), self_us=int(match.group(1)),
+                                        cumulative_us=int(match.group(2)), depth=len(match.group(3)) // 2))
+    return records
+
+
+def profile_imports(module: str) -> list[ImportRecord]:
+    """
+    Imports a module in a fresh interpreter with `-X importtime` and parses the report.
+
+    :param module: The module to import, e.g. "scripts.ingestion".
+    :return: The import records of the module and everything it imported.
+    :raises RuntimeError: If the import fails.
+    """
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=PROJECT_ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed: {completed.stderr.strip().splitlines()[-1]}")
+    return parse_importtime(completed.stderr)
+
+
+def importtime_report(records: list[ImportRecord], top: int = 15) -> str:
+    """
+    Summarizes an import profile: the total time, the top-level packages and the
+    modules that are slowest on their own, and any heavy library that was imported.
+
+    :param records: The records returned by `profile_imports`.
+    :param top: The number of entries per list.
+    :return: The report as text.
+    """
+    total_us = sum(record.self_us for record in records)
+    packages = {}
+    for record in records:
+        package = record.module.split(".")[0]
+        packages[package] = packages.get(package, 0) + record.self_us
+    lines = [f"Total import time: {total_us / 1000:.1f} ms over {len(records)} modules", "",
+             "Slowest packages (self time of all their modules):"]
+    for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        lines.append(f"  {self_us / 1000:9.1f} ms  {package}")
+    lines += ["", "Slowest modules (self time):"]
+    for record in sorted(records, key=lambda record: record.self_us, reverse=True)[:top]:
+        lines.append(f"  {record.self_us / 1000:9.1f} ms  {record.module}")
+    heavy = sorted({package for package in packages if package in HEAVY_MODULES})
+    lines += ["", f"Heavy libraries imported: {', '.join(heavy) if heavy else 'none'}"]
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Diagnostics of the ingestion tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    importtime_parser = subparsers.add_parser("importtime", help="Profile the import time of a module.")
+    importtime_parser.add_argument("module", nargs="?", default="scripts.ingestion",
+                                   help="Module to import (default: scripts.ingestion).")
+    importtime_parser.add_argument("--top", type=int, default=15, help="Entries per list.")
+    args = parser.parse_args()
+
+    if args.command == "importtime":
+        try:
+            records = profile_imports(args.module)
+        except RuntimeError as e:
+            logger.error(str(e))
+            return 1
+        print(importtime_report(records, top=args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import logging
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from scripts.logging_config import setup_logging
+from scripts.inference_cache import content_hash
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"\w+")
+_EMPTY_BIN = 1 << 64
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "big")
+
+
+def minhash_signature(words: list[str], num_perm: int = 128, shingle_size: int = 5) -> list[int]:
+    """
+    Computes a MinHash signature of the word shingles of a text.
+
+    Uses one-permutation hashing: every shingle is hashed once, the hash picks one
+    of `num_perm` bins and each bin keeps its smallest value. Empty bins borrow the
+    value of the next non-empty bin, offset by the distance, so short texts still
+    get comparable signatures. The cost is linear in the number of shingles.
+
+    :param words: The normalized words of the text.
+    :param num_perm: The signature length.
+    :param shingle_size: The number of consecutive words per shingle.
+    :return: The signature as a list of 32-bit integers; empty if there are no words.
+    """
+    if not words:
+        return []
+    shingles = {" ".join(words[start:start + shingle_size])
+                for start in range(max(1, len(words) - shingle_size + 1))}
+    bins = [_EMPTY_BIN] * num_perm
+    for shingle in shingles:
+        bin_index, value = divmod(_hash64(shingle), 1 << 32)
+        bin_index %= num_perm
+        if value < bins[bin_index]:
+            bins[bin_index] = value
+
+    filled = [index for index, value in enumerate(bins) if value != _EMPTY_BIN]
+    signature = list(bins)
+    for index, value in enumerate(bins):
+        if value == _EMPTY_BIN:
+            # Rotation densification: take the next filled bin to the right, circularly.
+            donor = next((position for position in filled if position > index), filled[0])
+            distance = (donor - index) % num_perm
+            signature[index] = (bins[donor] + distance * 0x9E3779B1) & 0xFFFFFFFF
+    return signature
+
+
+def signature_similarity(first: list[int], second: list[int]) -> float:
+    """
+    Estimates the Jaccard similarity of two texts from their MinHash signatures.
+
+    :param first: The signature of the first text.
+    :param second: The signature of the second text.
+    :return: The share of equal signature positions, between 0 and 1.
+    """
+    if not first or len(first) != len(second):
+        return 0.0
+    return sum(a == b for a, b in zip(first, second)) / len(first)
+
+
+@dataclass
+class Fingerprint:
+    text_hash: str
+    signature: list[int] = field(default_factory=list)
+
+
+class DuplicateIndex:
+    def __init__(self, path: Path, num_perm: int = 128, bands: int = 16, shingle_size: int = 5,
+                 threshold: float = 0.85) -> None:
+        """
+        Initializes the DuplicateIndex instance.
+
+        The index is a SQLite database of the fingerprint of every note's source text:
+        the hash of its normalized words for exact duplicates, and a MinHash signature
+        split into `bands` locality-sensitive hash buckets for near duplicates. A lookup
+        reads the notes sharing at least one bucket and compares their signatures, so
+        it stays fast with hundreds of thousands of notes.
+
+        :param path: The path to the SQLite database file.
+        :param num_perm: The MinHash signature length; must be a multiple of `bands`.
+        :param bands: The number of LSH bands.
+        :param shingle_size: The number of consecutive words per shingle.
+        :param threshold: The estimated Jaccard similarity from which a text is a near duplicate.
+        :return: None
+        :raises ValueError: If `num_perm` is not a multiple of `bands`.
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.path = Path(path)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(
+            "CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "id INTEGER PRIMARY KEY, note_path TEXT NOT NULL UNIQUE, text_hash TEXT NOT NULL, "
+            "signature BLOB NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS documents_text_hash ON documents (text_hash);"
+            "CREATE TABLE IF NOT EXISTS lsh_buckets (band INTEGER NOT NULL, bucket INTEGER NOT NULL, "
+            "document_id INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS lsh_buckets_bucket ON lsh_buckets (band, bucket);"
+            "CREATE INDEX IF NOT EXISTS lsh_buckets_document ON lsh_buckets (document_id);"
+        )
+        self._check_settings()
+
+    def fingerprint(self, text: str) -> Fingerprint:
+        """
+        Computes the fingerprint of a text.
+
+        Words are lowercased and punctuation and whitespace are dropped, so the same
+        document converted from different formats gets the same exact-duplicate hash.
+
+        :param text: The extracted text.
+        :return: The fingerprint of the text.
+        """
+        words = WORD_PATTERN.findall(text.lower())
+        return Fingerprint(text_hash=content_hash(" ".join(words)),
+                           signature=minhash_signature(words, self.num_perm, self.shingle_size))
+
+    def find(self, fingerprint: Fingerprint) -> tuple[str, float] | None:
+        """
+        Looks up the note whose source is an exact or near duplicate of a text.
+
+        :param fingerprint: The fingerprint of the text.
+        :return: A tuple of (note path, estimated similarity) of the most similar note
+            at or above the threshold, or None if there is none.
+        """
+        try:
+            with self.lock:
+                row = self.connection.execute("SELECT note_path FROM documents WHERE text_hash = ? LIMIT 1",
+                                              (fingerprint.text_hash,)).fetchone()
+                if row is not None:
+                    return row[0], 1.0
+                buckets = self._buckets(fingerprint.signature)
+                if not buckets:
+                    return None
+                conditions = " OR ".join("(band = ? AND bucket = ?)" for _ in buckets)
+                rows = self.connection.execute(
+                    f"SELECT note_path, signature FROM documents WHERE id IN "
+                    f"(SELECT document_id FROM lsh_buckets WHERE {conditions})",
+                    [value for bucket in buckets for value in bucket]
+                ).fetchall()
+        except Exception as e:
+            logger.error(f"Failed to read from duplicate index: {e}")
+            return None
+        best = None
+        for note_path, signature in rows:
+            similarity = signature_similarity(fingerprint.signature, array("I", signature).tolist())
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (note_path, similarity)
+        return best
+
+    def add(self, note_path: str, fingerprint: Fingerprint) -> None:
+        """
+        Stores the fingerprint of a note's source, replacing any previous one of the note.
+
+        :param note_path: The path to the note.
+        :param fingerprint: The fingerprint of the note's source text.
+        """
+        try:
+            with self.lock:
+                self._delete(note_path)
+                cursor = self.connection.execute(
+                    "INSERT INTO documents (note_path, text_hash, signature) VALUES (?, ?, ?)",
+                    (note_path, fingerprint.text_hash, array("I", fingerprint.signature).tobytes())
+                )
+                self.connection.executemany(
+                    "INSERT INTO lsh_buckets (band, bucket, document_id) VALUES (?, ?, ?)",
+                    [(band, bucket, cursor.lastrowid) for band, bucket in self._buckets(fingerprint.signature)]
+                )
+                self.connection.commit()
+        except Exception as e:
+            logger.error(f"Failed to write to duplicate index: {e}")
+
+    def remove(self, note_path: str) -> None:
+        """
+        Removes the fingerprint of a note.
+
+        :param note_path: The path to the note.
+        """
+        try:
+            with self.lock:
+                self._delete(note_path)
+                self.connection.commit()
+        except Exception as e:
+            logger.error(f"Failed to write to duplicate index: {e}")
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+        """
+        with self.lock:
+            self.connection.close()
+
+    def _buckets(self, signature: list[int]) -> list[tuple[int, int]]:
+        if len(signature) != self.num_perm:
+            return []
+        buckets = []
+        for band in range(self.bands):
+            rows = array("I", signature[band * self.rows:(band + 1) * self.rows]).tobytes()
+            digest = hashlib.blake2b(rows, digest_size=8).digest()
+            buckets.append((band, int.from_bytes(digest, "big", signed=True)))
+        return buckets
+
+    def _delete(self, note_path: str) -> None:
+        row = self.connection.execute("SELECT id FROM documents WHERE note_path = ?", (note_path,)).fetchone()
+        if row is not None:
+            self.connection.execute("DELETE FROM lsh_buckets WHERE document_id = ?", row)
+            self.connection.execute("DELETE FROM documents WHERE id = ?", row)
+
+    def _check_settings(self) -> None:
+        # Signatures computed with other parameters cannot be compared; start over.
+        settings = f"{self.num_perm}/{self.bands}/{self.shingle_size}"
+        with self.lock:
+            row = self.connection.execute("SELECT value FROM settings WHERE name = 'signature'").fetchone()
+            if row is not None and row[0] != settings:
+                logger.warning(f"Duplicate index built with settings {row[0]}, not {settings}; clearing it.")
+                self.connection.execute("DELETE FROM lsh_buckets")
+                self.connection.execute("DELETE FROM documents")
+            self.connection.execute("INSERT OR REPLACE INTO settings (name, value) VALUES ('signature', ?)",
+                                    (settings,))
+            self.connection.commit()
@@ -1,24 +1,46 @@
-import spacy
 from scripts.logging_config import setup_logging
 import logging
 from scripts.data_models import EnrichedData, ClassifiedData
+from scripts.inference_cache import InferenceCache
+from scripts.file_handler import split_elements
+from scripts.spooled_text import iter_spooled_elements
+from scripts.model_registry import model_registry
 from collections import defaultdict
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
 
+# Components of the spaCy pipelines that named entity recognition does not need.
+DEFAULT_EXCLUDE = ("tagger", "parser", "attribute_ruler", "lemmatizer", "senter")
+
+
 class NerEnricher:
-    def __init__(self) -> None:
+    def __init__(self, cache: InferenceCache | None = None, config: dict | None = None) -> None:
         """
         Initializes the NerEnricher instance.
 
-        The instance will load the en_core_web_sm spaCy model during initialization,
-        which is used to extract named entities from the given text content.
+        The spaCy model (en_core_web_sm by default), which is used to extract named
+        entities from the given text content, is loaded through the shared model registry
+        on first use, without the components listed in `exclude`.
 
+        :param cache: An optional InferenceCache; cached entities skip spaCy entirely.
+        :param config: The `ner` configuration section.
         :return: None
         """
-        self.nlp = spacy.load("en_core_web_sm")
+        config = config or {}
+        self.model_name = config.get("model", "en_core_web_sm")
+        self.exclude = list(config.get("exclude", DEFAULT_EXCLUDE))
+        self.n_process = max(1, int(config.get("n_process", 1)))
+        self.max_chars = max(1, int(config.get("max_chars", 100_000)))
+        self.cache = cache
+
+    @property
+    def nlp(self):
+        """
+        The spaCy pipeline, loaded on first use.
+        """
+        return model_registry.get(f"spacy:{self.model_name}", self._load_model)
 
     def enrich(self, data: ClassifiedData) -> EnrichedData | None:
         """
@@ -27,18 +49,132 @@ class NerEnricher:
         :param data: The data that should be enriched with named entities.
         :return: The enriched data, or None if an error occurred during the enrichment process.
         """
-        enriched_data = EnrichedData(text=data.text,
-                                     source_path=data.source_path,
-                                     category=data.category,
-                                     tags=data.tags)
         try:
-            s_obj = self.nlp(data.text)
-            entities = defaultdict(list)
-            for ent in s_obj.ents:
-                entities[ent.label_].append(ent.text)
-            entities = dict(entities)
-            enriched_data.entities = entities
-            return enriched_data
+            return self._build_enriched(data, self._document_entities([data], batch_size=1)[0])
         except Exception as e:
             logger.error(f"Error during NER enrichment for file {data.source_path}: {e}")
             return None
+
+    def enrich_batch(self, data_list: list[ClassifiedData], batch_size: int = 16) -> list[EnrichedData | None]:
+        """
+        Enriches a list of data objects with named entities using `nlp.pipe`.
+
+        Every text is processed element by element (see `split_elements`), and the
+        entities of each element are cached on their own. A revised document therefore
+        only sends its changed elements through spaCy. Elements longer than `max_chars`
+        are cut into windows at line or sentence boundaries, so no Doc ever exceeds that
+        size however long the document is. Streaming the elements through `nlp.pipe`
+        lets spaCy batch them internally, in `n_process` processes when there are enough
+        of them. Entities are merged in document order. Streamed documents are read back
+        from disk in windows of elements instead of their in-memory sample, and their
+        entities are deduplicated as they are merged. If the batched run fails, every
+        item is enriched on its own so the failure stays isolated to the offending document.
+
+        :param data_list: The data objects that should be enriched with named entities.
+        :param batch_size: The number of elements spaCy processes per batch.
+        :return: A list of enriched data objects in the order of `data_list`; failed entries are None.
+        """
+        if not data_list:
+            return []
+        try:
+            entities_list = self._document_entities(data_list, batch_size)
+        except Exception as e:
+            logger.error(f"Error during batched NER enrichment, retrying one by one: {e}")
+            return [self.enrich(data) for data in data_list]
+        return [self._build_enriched(data, entities) for data, entities in zip(data_list, entities_list)]
+
+    def _document_entities(self, data_list: list[ClassifiedData], batch_size: int) -> list[dict]:
+        in_memory = [data for data in data_list if not data.body_path]
+        entities_by_id = dict(zip(map(id, in_memory), self._entities([data.text for data in in_memory], batch_size)))
+        for data in data_list:
+            if data.body_path:
+                entities_by_id[id(data)] = self._streamed_entities(data.body_path, batch_size)
+        return [entities_by_id[id(data)] for data in data_list]
+
+    def _streamed_entities(self, body_path: str, batch_size: int, window_batches: int = 8) -> dict:
+        entities = defaultdict(dict)
+        window = []
+        for element in iter_spooled_elements(body_path):
+            window.append(element)
+            if len(window) >= batch_size * window_batches:
+                self._merge_unique(entities, self._entities(window, batch_size))
+                window = []
+        if window:
+            self._merge_unique(entities, self._entities(window, batch_size))
+        return {label: list(names) for label, names in entities.items()}
+
+    @staticmethod
+    def _merge_unique(entities: dict, entities_list: list[dict]) -> None:
+        # Dicts keep the first-seen order of the names while dropping repeats.
+        for element_entities in entities_list:
+            for label, items in element_entities.items():
+                entities[label].update(dict.fromkeys(items))
+
+    def _entities(self, texts: list[str], batch_size: int) -> list[dict]:
+        keys_per_text = []
+        pending = {}
+        for text in texts:
+            elements = [window for element in (split_elements(text) or [text]) for window in self._windows(element)]
+            keys = [self._cache_key(element) for element in elements]
+            keys_per_text.append(keys)
+            pending.update(zip(keys, elements))
+        entities_by_key = self.cache.get_many(list(pending)) if self.cache is not None else {}
+        pending = {key: element for key, element in pending.items() if key not in entities_by_key}
+        if pending:
+            # Worker processes only pay off once each of them gets a few batches.
+            n_process = self.n_process if len(pending) >= self.n_process * batch_size * 2 else 1
+            docs = self.nlp.pipe(pending.values(), batch_size=batch_size, n_process=n_process)
+            computed = {key: self._extract_entities(s_obj) for key, s_obj in zip(pending, docs)}
+            if self.cache is not None:
+                self.cache.set_many(computed)
+            entities_by_key.update(computed)
+
+        entities_list = []
+        for keys in keys_per_text:
+            entities = defaultdict(list)
+            for key in keys:
+                for label, items in entities_by_key[key].items():
+                    entities[label].extend(items)
+            entities_list.append(dict(entities))
+        return entities_list
+
+    def _load_model(self):
+        import spacy
+
+        nlp = spacy.load(self.model_name, exclude=self.exclude)
+        nlp.max_length = max(nlp.max_length, self.max_chars + 1)
+        return nlp
+
+    def _windows(self, element: str) -> list[str]:
+        windows = []
+        while len(element) > self.max_chars:
+            # Cut at the last line break or sentence end of the window, so no entity is split.
+            cut = max(element.rfind("\n", 0, self.max_chars), element.rfind(". ", 0, self.max_chars) + 1)
+            if cut <= 0:
+                cut = element.rfind(" ", 0, self.max_chars)
+            if cut <= 0:
+                cut = self.max_chars
+            windows.append(element[:cut])
+            element = element[cut:].lstrip()
+        if element:
+            windows.append(element)
+        return windows
+
+    def _cache_key(self, text: str) -> str:
+        return InferenceCache.make_key("ner", self.model_name, None, text)
+
+    @staticmethod
+    def _extract_entities(s_obj) -> dict:
+        entities = defaultdict(list)
+        for ent in s_obj.ents:
+            entities[ent.label_].append(ent.text)
+        return dict(entities)
+
+    @staticmethod
+    def _build_enriched(data: ClassifiedData, entities: dict) -> EnrichedData:
+        return EnrichedData(text=data.text,
+                            source_path=data.source_path,
+                            category=data.category,
+                            tags=data.tags,
+                            body_path=data.body_path,
+                            entities=entities)
@@ -3,15 +3,18 @@ from scripts.enricher import NerEnricher
 from scripts.summarizer import Summarizer
 from scripts.action_item_detector import ActionItemDetector
 from scripts.zero_shot_service import ZeroShotService
+from scripts.inference_cache import InferenceCache
 from scripts.logging_config import setup_logging
 import logging
+from scripts.metrics import metrics
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
 
 class EnrichmentPipeline:
-    def __init__(self, zs_service: ZeroShotService, config: dict) -> None:
+    def __init__(self, zs_service: ZeroShotService, config: dict, cache: InferenceCache | None = None,
+                 enricher: NerEnricher | None = None, summarizer: Summarizer | None = None) -> None:
         """
         Initializes the EnrichmentPipeline instance.
 
@@ -22,14 +25,21 @@ class EnrichmentPipeline:
             zero-shot classification model.
         :param config: The configuration dictionary containing settings for the
             zero-shot classification model and the keyword-based classification model.
+        :param cache: An optional InferenceCache shared by the NER and summarization stages.
+        :param enricher: An optional pre-built NerEnricher; one is created if omitted.
+        :param summarizer: An optional pre-built Summarizer; one is created if omitted.
         :return: None
         :raises Exception: If there is an error during the model loading process.
         """
         self.action_items_labels = config.get("ml_service", {}).get("action_items_labels", [])
+        batch_config = config.get("batch", {})
+        self.summarizer_batch_size = batch_config.get("summarizer_batch_size", 4)
+        self.ner_batch_size = batch_config.get("ner_batch_size", 16)
 
-        self.enricher = NerEnricher()
-        self.summarizer = Summarizer()
-        self.action_item_detector = ActionItemDetector(zs_service=zs_service)
+        self.enricher = enricher or NerEnricher(cache=cache, config=config.get("ner", {}))
+        self.summarizer = summarizer or Summarizer(cache=cache, config=config.get("summarizer", {}),
+                                                   model_config=config.get("models", {}).get("summarizer"))
+        self.action_item_detector = ActionItemDetector(zs_service=zs_service, config=config.get("action_items", {}))
 
     def run(self, data: ClassifiedData) -> EnrichedData | None:
         """
@@ -45,18 +55,55 @@ class EnrichmentPipeline:
         """
         try:
             logger.info(f"Running enrichment pipeline for file: {data.source_path}")
-            enriched_data = self.enricher.enrich(data=data)
+            with metrics.stage("ner", documents=1):
+                enriched_data = self.enricher.enrich(data=data)
 
             if enriched_data:
-                summary = self.summarizer.summarize(text=enriched_data.text)
+                with metrics.stage("summarize", documents=1):
+                    summary = self.summarizer.summarize(text=enriched_data.text)
                 enriched_data.summary = summary
                 logger.info(f"File '{data.source_path}' enriched with summary and action items.")
 
-                action_items = self.action_item_detector.detect(text=enriched_data.text,
-                                                                labels=self.action_items_labels)
+                with metrics.stage("action_items", documents=1):
+                    action_items = self.action_item_detector.detect(text=enriched_data.text,
+                                                                    labels=self.action_items_labels)
                 enriched_data.action_items = action_items
                 logger.info(f"Action items detected for file '{data.source_path}': {action_items}")
             return enriched_data
         except Exception as e:
             logger.error(f"Error during enrichment pipeline for file {data.source_path}: {e}")
             return None
+
+    def run_batch(self, data_list: list[ClassifiedData]) -> list[EnrichedData | None]:
+        """
+        Runs the enrichment pipeline over a batch of ClassifiedData objects.
+
+        Every stage (NER, summarization, action-item detection) processes the whole
+        batch at once. Documents that fail NER are reported as None and skipped by
+        the later stages; if a stage fails for the batch as a whole, the documents are
+        enriched one by one so a single bad document cannot sink the others.
+
+        :param data_list: The ClassifiedData objects that should be enriched.
+        :return: A list of EnrichedData objects in the order of `data_list`; failed entries are None.
+        """
+        if not data_list:
+            return []
+        try:
+            logger.info(f"Running enrichment pipeline for a batch of {len(data_list)} files")
+            with metrics.stage("ner", documents=len(data_list)):
+                enriched_list = self.enricher.enrich_batch(data_list, batch_size=self.ner_batch_size)
+            succeeded = [enriched_data for enriched_data in enriched_list if enriched_data is not None]
+            texts = [enriched_data.text for enriched_data in succeeded]
+
+            with metrics.stage("summarize", documents=len(texts)):
+                summaries = self.summarizer.summarize_batch(texts, batch_size=self.summarizer_batch_size)
+            with metrics.stage("action_items", documents=len(texts)):
+                action_items = self.action_item_detector.detect_batch(texts, labels=self.action_items_labels)
+            for enriched_data, summary, items in zip(succeeded, summaries, action_items):
+                enriched_data.summary = summary
+                enriched_data.action_items = items
+                logger.info(f"Action items detected for file '{enriched_data.source_path}': {items}")
+            return enriched_list
+        except Exception as e:
+            logger.error(f"Error during batched enrichment pipeline, retrying one by one: {e}")
+            return [self.run(data) for data in data_list]
@@ -0,0 +1,247 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import logging
+from pathlib import Path
+from scripts.logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# spaCy labels that get a hub page; numbers, dates and amounts are not worth one.
+DEFAULT_HUB_LABELS = ("PERSON", "ORG", "GPE", "LOC", "NORP", "FAC", "PRODUCT", "EVENT", "WORK_OF_ART", "LAW")
+_EDGE_CHARACTERS = " \t\"'“”‘’.,;:!?()[]{}<>*_#|-"
+_POSSESSIVE_PATTERN = re.compile(r"['’]s$", re.IGNORECASE)
+_ARTICLE_PATTERN = re.compile(r"^the\s+", re.IGNORECASE)
+# Characters Obsidian does not allow in link targets or file names.
+_UNSAFE_PATTERN = re.compile(r'[\[\]#^|\\/:*?"<>]')
+
+
+def normalize_entity(name: str) -> str:
+    """
+    Cleans up an entity string as extracted by NER.
+
+    Whitespace is collapsed, and surrounding punctuation, a leading "the" and a
+    trailing possessive are dropped, so "the  Acme Corp.'s" becomes "Acme Corp".
+
+    :param name: The entity text.
+    :return: The cleaned entity, or an empty string if nothing meaningful is left.
+    """
+    name = " ".join(name.split()).strip(_EDGE_CHARACTERS)
+    name = _ARTICLE_PATTERN.sub("", _POSSESSIVE_PATTERN.sub("", name)).strip(_EDGE_CHARACTERS)
+    return name if len(name) > 1 and any(character.isalnum() for character in name) else ""
+
+
+def entity_key(name: str) -> str:
+    """
+    Builds the key under which spellings of the same entity are merged.
+
+    :param name: The normalized entity.
+    :return: The case-folded entity.
+    """
+    return name.casefold()
+
+
+def normalize_entities(entities: dict[str, list[str]]) -> dict[str, list[str]]:
+    """
+    Normalizes and deduplicates the entities of one note.
+
+    Each entity is kept once, in its first spelling and under its first label.
+
+    :param entities: The entities per label, as returned by NER.
+    :return: The normalized entities per label, in their original order.
+    """
+    seen = set()
+    normalized = {}
+    for label, names in entities.items():
+        for name in names:
+            name = normalize_entity(name)
+            if name and entity_key(name) not in seen:
+                seen.add(entity_key(name))
+                normalized.setdefault(label, []).append(name)
+    return normalized
+
+
+def hub_name(name: str) -> str:
+    """
+    Builds the file name (without extension) of an entity's hub page.
+
+    An entity that is a valid Obsidian link target is its own hub name. Otherwise the
+    invalid characters are replaced and a hash of the entity key is appended, so
+    entities that only differ in those characters, like "A/B" and "A B" or "C#" and
+    "C", get separate hub pages. Every spelling of an entity gets the same hub name,
+    up to case.
+
+    :param name: The normalized entity.
+    :return: The hub page name.
+    """
+    cleaned = " ".join(_UNSAFE_PATTERN.sub(" ", name).split()).strip(".")
+    if cleaned == name:
+        return name
+    digest = hashlib.blake2b(entity_key(name).encode("utf-8", "surrogatepass"), digest_size=4).hexdigest()
+    return f"{cleaned or '_'} ({digest})"
+
+
+class EntityIndex:
+    def __init__(self, path: Path, hub_dir: Path, labels: tuple[str, ...] = DEFAULT_HUB_LABELS,
+                 debounce_seconds: float = 30.0) -> None:
+        """
+        Initializes the EntityIndex instance.
+
+        The index is a SQLite database mapping every entity to the notes that mention
+        it. Updating a note only replaces that note's mentions, and the entities it
+        gained or lost are marked dirty. Their hub pages, which link back to every note
+        mentioning the entity, are rewritten by `flush`, at most once per
+        `debounce_seconds` unless forced, so a burst of notes mentioning the same
+        entity rewrites its hub page once. Dirty entities are stored in the database,
+        so pending hub pages survive a restart.
+
+        :param path: The path to the SQLite database file.
+        :param hub_dir: The directory of the hub pages.
+        :param labels: The entity labels that get hub pages; other entities are not indexed.
+        :param debounce_seconds: The minimum time between two unforced flushes.
+        :return: None
+        """
+        self.path = Path(path)
+        self.hub_dir = Path(hub_dir)
+        self.labels = set(labels)
+        self.debounce_seconds = debounce_seconds
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.last_flush = time.monotonic()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(
+            "CREATE TABLE IF NOT EXISTS entities (key TEXT PRIMARY KEY, name TEXT NOT NULL, label TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS mentions (key TEXT NOT NULL, note_path TEXT NOT NULL, "
+            "PRIMARY KEY (key, note_path));"
+            "CREATE INDEX IF NOT EXISTS mentions_note_path ON mentions (note_path);"
+            "CREATE TABLE IF NOT EXISTS dirty (key TEXT PRIMARY KEY);"
+        )
+
+    def is_indexed(self, label: str) -> bool:
+        """
+        Tells whether the entities of a label get hub pages.
+
+        :param label: The entity label.
+        :return: True if the label is indexed.
+        """
+        return label in self.labels
+
+    def update_note(self, note_path: str, entities: dict[str, list[str]]) -> None:
+        """
+        Replaces the entities mentioned by a note.
+
+        :param note_path: The path to the note.
+        :param entities: The normalized entities of the note per label, see `normalize_entities`.
+        """
+        names = {entity_key(name): (name, label) for label, items in entities.items()
+                 if label in self.labels for name in items}
+        try:
+            with self.lock:
+                previous = {row[0] for row in self.connection.execute(
+                    "SELECT key FROM mentions WHERE note_path = ?", (note_path,))}
+                added = set(names) - previous
+                removed = previous - set(names)
+                # The first spelling and label seen for an entity name its hub page.
+                self.connection.executemany("INSERT OR IGNORE INTO entities (key, name, label) VALUES (?, ?, ?)",
+                                            [(key, *names[key]) for key in added])
+                self.connection.executemany("INSERT INTO mentions (key, note_path) VALUES (?, ?)",
+                                            [(key, note_path) for key in added])
+                self.connection.executemany("DELETE FROM mentions WHERE key = ? AND note_path = ?",
+                                            [(key, note_path) for key in removed])
+                self.connection.executemany("INSERT OR IGNORE INTO dirty (key) VALUES (?)",
+                                            [(key,) for key in added | removed])
+                self.connection.commit()
+        except Exception as e:
+            logger.error(f"Failed to write to entity index: {e}")
+
+    def remove_note(self, note_path: str) -> None:
+        """
+        Removes all mentions of a note.
+
+        :param note_path: The path to the note.
+        """
+        self.update_note(note_path, {})
+
+    def notes(self, name: str) -> list[str]:
+        """
+        Lists the notes mentioning an entity.
+
+        :param name: The entity, in any spelling.
+        :return: The paths of the notes, sorted.
+        """
+        with self.lock:
+            rows = self.connection.execute("SELECT note_path FROM mentions WHERE key = ? ORDER BY note_path",
+                                           (entity_key(normalize_entity(name)),)).fetchall()
+        return [row[0] for row in rows]
+
+    def flush(self, force: bool = False) -> int:
+        """
+        Rewrites the hub pages of the dirty entities.
+
+        A hub page is only written if its content changed, and deleted once no note
+        mentions its entity anymore.
+
+        :param force: Flush even if the last flush was less than `debounce_seconds` ago.
+        :return: The number of hub pages written or deleted.
+        """
+        if not force and time.monotonic() - self.last_flush < self.debounce_seconds:
+            return 0
+        with self.flush_lock:
+            self.last_flush = time.monotonic()
+            try:
+                with self.lock:
+                    pages = {}
+                    for key, name, label in self.connection.execute(
+                            "SELECT e.key, e.name, e.label FROM dirty d JOIN entities e ON e.key = d.key").fetchall():
+                        note_paths = [row[0] for row in self.connection.execute(
+                            "SELECT note_path FROM mentions WHERE key = ?", (key,))]
+                        pages[key] = (name, label, note_paths)
+                        if not note_paths:
+                            self.connection.execute("DELETE FROM entities WHERE key = ?", (key,))
+                    self.connection.execute("DELETE FROM dirty")
+                    self.connection.commit()
+            except Exception as e:
+                logger.error(f"Failed to read from entity index: {e}")
+                return 0
+
+            written = 0
+            for name, label, note_paths in pages.values():
+                hub_path = self.hub_dir / f"{hub_name(name)}.md"
+                try:
+                    if not note_paths:
+                        if hub_path.exists():
+                            hub_path.unlink()
+                            written += 1
+                        continue
+                    content = self._render(name, label, note_paths)
+                    if hub_path.exists() and hub_path.read_text(encoding="utf-8") == content:
+                        continue
+                    self.hub_dir.mkdir(parents=True, exist_ok=True)
+                    hub_path.write_text(content, encoding="utf-8")
+                    written += 1
+                except Exception as e:
+                    logger.error(f"Failed to write hub page {hub_path}: {e}")
+        if written:
+            logger.info(f"Updated {written} entity hub page(s) in {self.hub_dir}")
+        return written
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+        """
+        with self.lock:
+            self.connection.close()
+
+    @staticmethod
+    def _render(name: str, label: str, note_paths: list[str]) -> str:
+        # Newest notes first: note file names start with their date.
+        stems = sorted({Path(note_path).stem for note_path in note_paths}, reverse=True)
+        backlinks = "".join(f"- [[{stem}]]\n" for stem in stems)
+        return (f"---\ntype: entity\nlabel: {label}\n---\n\n# {name}\n\n"
+                f"## Mentioned in ({len(stems)})\n{backlinks}")
@@ -1,7 +1,12 @@
 import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Iterator
 import abc
-from unstructured.partition.auto import partition
 from scripts.logging_config import setup_logging
 
 
@@ -14,33 +19,262 @@ class FileConverter(abc.ABC):
     def convert(self, file_path: str) -> str:
         pass
 
+    def iter_elements(self, file_path: str) -> Iterator[str]:
+        """
+        Yields the elements of a file one at a time, for inputs too large to hold in memory.
+
+        Converters that cannot stream produce the whole text and split it.
+
+        :param file_path: The path to the file that should be converted.
+        :return: An iterator over the elements, in document order.
+        :raises Exception: An exception is raised if there is an error during the conversion process.
+        """
+        yield from split_elements(self.convert(file_path))
+
+
+class PlainTextConverter(FileConverter):
+    def __init__(self, chunk_size: int = 1 << 20, max_element_chars: int = 1 << 16) -> None:
+        """
+        Initializes the PlainTextConverter instance.
+
+        :param chunk_size: The number of characters read from the file at a time.
+        :param max_element_chars: The size from which a streamed element is cut, for
+            inputs without blank lines such as CSV files or logs.
+        :return: None
+        """
+        self.chunk_size = chunk_size
+        self.max_element_chars = max_element_chars
+
+    def convert(self, file_path: str) -> str:
+        """
+        Reads a text-like file (plain text, markdown, source code, CSV, logs) directly.
+
+        The file is decoded as UTF-8 (a BOM is dropped and undecodable bytes are
+        replaced) and read in chunks, without going through `unstructured`.
+
+        :param file_path: The path to the file that should be converted.
+        :return: The text content of the file if the conversion was successful, otherwise an empty string.
+        """
+        try:
+            with open(file_path, 'r', encoding='utf-8-sig', errors='replace') as file:
+                text_content = "".join(iter(lambda: file.read(self.chunk_size), ""))
+            logging.info(f"File converted successfully: {file_path}")
+            return text_content
+        except Exception as e:
+            logger.error(f"Error converting file {file_path}: {e}")
+            return ""
+
+    def iter_elements(self, file_path: str) -> Iterator[str]:
+        """
+        Reads a text-like file element by element, splitting on blank lines.
+
+        Lines are read with a bounded length, and an element is cut once it reaches
+        `max_element_chars`, so memory stays bounded whatever the file looks like.
+
+        :param file_path: The path to the file that should be converted.
+        :return: An iterator over the elements, in document order.
+        :raises Exception: An exception is raised if the file cannot be read.
+        """
+        with open(file_path, 'r', encoding='utf-8-sig', errors='replace') as file:
+            lines = []
+            size = 0
+            for line in iter(lambda: file.readline(self.max_element_chars), ""):
+                if not line.strip():
+                    if lines:
+                        yield "".join(lines).strip()
+                    lines, size = [], 0
+                    continue
+                lines.append(line)
+                size += len(line)
+                if size >= self.max_element_chars:
+                    yield "".join(lines).strip()
+                    lines, size = [], 0
+            if lines:
+                yield "".join(lines).strip()
+        logging.info(f"File streamed successfully: {file_path}")
+
+
+def _partition_file(file_path: str, strategy: str | None) -> list[str]:
+    """
+    Partitions a file with `unstructured` and returns the text of its elements.
+
+    Kept at module level so it can run in a worker process.
+
+    :param file_path: The path to the file that should be partitioned.
+    :param strategy: The partition strategy, or None for unstructured's default.
+    :return: The text of every element, in document order.
+    """
+    from unstructured.partition.auto import partition
+
+    kwargs = {"strategy": strategy} if strategy else {}
+    return [str(element) for element in partition(filename=file_path, **kwargs)]
+
 
 class UnstructuredConverter(FileConverter):
+    def __init__(self, config: dict | None = None) -> None:
+        """
+        Initializes the UnstructuredConverter instance.
+
+        :param config: The `converters` configuration section with the partition
+            strategy per extension and the thresholds for automatic strategy selection
+            and page-parallel PDF conversion.
+        :return: None
+        """
+        config = config or {}
+        self.strategies = {extension.lower(): strategy
+                           for extension, strategy in config.get("strategies", {}).items()}
+        self.hi_res_max_pages = config.get("hi_res_max_pages", 20)
+        self.hi_res_max_bytes = config.get("hi_res_max_mb", 10) * 1024 * 1024
+        self.parallel_min_pages = config.get("parallel_min_pages", 16)
+        self.pages_per_chunk = config.get("pages_per_chunk", 8)
+        self.max_workers = config.get("max_workers") or os.cpu_count() or 1
+        self.executor: ProcessPoolExecutor | None = None
+        self.lock = threading.Lock()
+
     def convert(self, file_path: str) -> str:
         """
         Converts a file to a string of unstructured text.
 
+        `unstructured` is imported on the first call, so processes that only ever
+        see text-like files never load it. Multi-page PDFs above `parallel_min_pages`
+        are split into page ranges that are partitioned in a process pool and
+        reassembled in order.
+
         :param file_path: The path to the file that should be converted.
         :return: A string of unstructured text if the conversion was successful, otherwise an empty string.
         :raises Exception: An exception is raised if there is an error during the conversion process.
         """
         try:
-            element_list = partition(file_path)
-            text_content = "\n\n".join([str(element) for element in element_list])
-            logging.info(f"File converted successfully: {file_path}")
-            return text_content
+            return "\n\n".join(self.iter_elements(file_path))
         except Exception as e:
             logger.error(f"Error converting file {file_path}: {e}")
             return ""
 
+    def iter_elements(self, file_path: str) -> Iterator[str]:
+        """
+        Converts a file to its unstructured elements.
+
+        Page-parallel PDFs are yielded page range by page range, as the ranges finish
+        in order; other files are partitioned as a whole by `unstructured`.
+
+        :param file_path: The path to the file that should be converted.
+        :return: An iterator over the text of every element, in document order.
+        :raises Exception: An exception is raised if there is an error during the conversion process.
+        """
+        extension = Path(file_path).suffix.lower()
+        page_count = self._page_count(file_path) if extension == ".pdf" else 1
+        strategy = self._select_strategy(file_path, extension, page_count)
+        if page_count >= self.parallel_min_pages and self.max_workers > 1:
+            yield from self._partition_pages(file_path, page_count, strategy)
+        else:
+            yield from _partition_file(file_path, strategy)
+        logging.info(f"File converted successfully: {file_path} (strategy: {strategy or 'default'})")
+
+    def _select_strategy(self, file_path: str, extension: str, page_count: int) -> str | None:
+        strategy = self.strategies.get(extension)
+        if strategy != "auto":
+            return strategy
+        if extension == ".pdf":
+            # Documents with a text layer do not need layout or OCR models.
+            if self._has_text_layer(file_path):
+                return "fast"
+            return "hi_res" if page_count <= self.hi_res_max_pages else "ocr_only"
+        return "hi_res" if os.path.getsize(file_path) <= self.hi_res_max_bytes else "ocr_only"
+
+    @staticmethod
+    def _page_count(file_path: str) -> int:
+        from pypdf import PdfReader
+
+        return len(PdfReader(file_path).pages)
+
+    @staticmethod
+    def _has_text_layer(file_path: str, sample_pages: int = 3) -> bool:
+        from pypdf import PdfReader
+
+        pages = PdfReader(file_path).pages
+        return any((pages[index].extract_text() or "").strip() for index in range(min(sample_pages, len(pages))))
+
+    def _partition_pages(self, file_path: str, page_count: int, strategy: str | None) -> Iterator[str]:
+        from pypdf import PdfReader, PdfWriter
+
+        reader = PdfReader(file_path)
+        with tempfile.TemporaryDirectory(prefix="pkdm-pages-") as temp_dir:
+            range_paths = []
+            for start in range(0, page_count, self.pages_per_chunk):
+                writer = PdfWriter()
+                for page in reader.pages[start:start + self.pages_per_chunk]:
+                    writer.add_page(page)
+                range_path = os.path.join(temp_dir, f"pages-{start:06d}.pdf")
+                with open(range_path, "wb") as range_file:
+                    writer.write(range_file)
+                range_paths.append(range_path)
+
+            logging.info(f"Partitioning {file_path} as {len(range_paths)} page ranges in parallel")
+            futures = [self._get_executor().submit(_partition_file, range_path, strategy)
+                       for range_path in range_paths]
+            # Collect in submission order so the elements stay in page order.
+            for future in futures:
+                yield from future.result()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.executor is None:
+                # Spawned workers import unstructured once and are reused for later documents;
+                # forking a process that already runs model threads is not safe.
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                    mp_context=multiprocessing.get_context("spawn"))
+            return self.executor
+
+
+PLAIN_TEXT_EXTENSIONS = [
+    ".txt", ".md", ".csv", ".tsv", ".log", ".js", ".py", ".cpp", ".c", ".ts"
+]
 
 UNSTRUCTURED_SUPPORTED_EXTENSIONS = [
-    ".txt", ".doc", ".docx", ".pdf", ".md", ".csv", ".tsv", ".xls", ".xlsx",
-    ".ppt", ".pptx", ".epub", ".html", ".hml", ".png", ".jpg", ".jpeg",
-    ".heic", ".log", ".rtf", ".js", ".py", ".cpp", ".c", ".ts"
+    ".doc", ".docx", ".pdf", ".xls", ".xlsx", ".ppt", ".pptx", ".epub", ".html", ".hml",
+    ".png", ".jpg", ".jpeg", ".heic", ".rtf"
 ]
 
-CONVERTERS = dict.fromkeys(UNSTRUCTURED_SUPPORTED_EXTENSIONS, UnstructuredConverter())
+CONVERTERS: dict[str, FileConverter] = {}
+
+
+def register_converter(extensions: list[str], converter: FileConverter) -> None:
+    """
+    Registers a converter for the given file extensions, replacing any previous one.
+
+    :param extensions: The file extensions (including the leading dot) handled by the converter.
+    :param converter: The converter instance.
+    """
+    for extension in extensions:
+        CONVERTERS[extension.lower()] = converter
+
+
+register_converter(PLAIN_TEXT_EXTENSIONS, PlainTextConverter())
+register_converter(UNSTRUCTURED_SUPPORTED_EXTENSIONS, UnstructuredConverter())
+
+
+def configure_converters(config: dict) -> None:
+    """
+    Re-creates the rich-format converter from the `converters` configuration section.
+
+    :param config: The configuration dictionary.
+    """
+    register_converter(UNSTRUCTURED_SUPPORTED_EXTENSIONS, UnstructuredConverter(config.get("converters", {})))
+
+
+def get_file_elements(file_path: str) -> Iterator[str] | None:
+    """
+    Gets the elements of the given file one at a time, using the appropriate converter.
+
+    :param file_path: The path to the file whose elements should be retrieved.
+    :return: An iterator over the elements, or None if no converter is found for the given file extension.
+    """
+    extension = Path(file_path).suffix.lower()
+    converter = CONVERTERS.get(extension)
+    if converter is None:
+        logging.warning(f"No converter found for file extension: {extension}")
+        return None
+    return converter.iter_elements(file_path)
 
 
 def get_file_text(file_path: str) -> str | None:
@@ -56,3 +290,16 @@ def get_file_text(file_path: str) -> str | None:
         logging.warning(f"No converter found for file extension: {extension}")
         return None
     return converter_class.convert(file_path)
+
+
+def split_elements(text: str) -> list[str]:
+    """
+    Splits converted text back into its elements.
+
+    Converters join the elements they extract (paragraphs, titles, list items, ...)
+    with blank lines, so the blank lines are the element boundaries.
+
+    :param text: The converted text.
+    :return: The non-empty elements, stripped, in document order.
+    """
+    return [element.strip() for element in text.split("\n\n") if element.strip()]
@@ -1,6 +1,33 @@
 from scripts.zero_shot_service import ZeroShotService
 from scripts.word_classifier import KeywordClassifier
+from collections import Counter
+from pathlib import Path
 import logging
+import re
+
+# Line-level structural cues, scored as the share of non-empty lines that match.
+# A category is decided when its share reaches the threshold in `structure_thresholds`.
+# Generic headers such as "Date:" or "Location:" are no cue: travel logs, invoices and lab
+# records use them as much as meeting notes do. Neither are @mentions, nor a trailing semicolon
+# on its own: both are common in prose, so a semicolon only counts after a call or an assignment.
+STRUCTURAL_CUES = {
+    "Code Snippet": re.compile(
+        r"^\s*(?:def |class |import |from \S+ import |function\b|const |let |var |#include\b|public |private |"
+        r"return\b|if \(|for \(|while \(|})|[{}]\s*$|\)\s*;\s*$|=.*;\s*$"
+    ),
+    "Meeting Notes": re.compile(
+        r"^\s*(?:#+\s*)?(?:agenda|attendees|participants|minutes|action items|decisions|next steps)\b|"
+        r"^\s*(?:present|absent|apologies)\s*:",
+        re.IGNORECASE
+    ),
+}
+# Cues a category is only decided on when at least one line also matches these, so generic
+# cues (decisions, next steps, present; assignments and returns) alone never file a document
+# under the category. Code needs a definition, an import or a brace line.
+REQUIRED_CUES = {
+    "Code Snippet": re.compile(r"^\s*(?:def |class |import |from \S+ import |function\b|#include\b|})|\{\s*$"),
+    "Meeting Notes": re.compile(r"^\s*(?:#+\s*)?(?:agenda|attendees|participants|minutes)\b", re.IGNORECASE),
+}
 
 
 class HybridClassifier:
@@ -21,9 +48,10 @@ class HybridClassifier:
         :return: None
         :raises Exception: If there is an error during the initialization process.
         """
+        classifier_config = config.get("classifier", {})
         try:
             self.ml_classifier = zs_service
-            self.confidence_threshold = 0.6
+            self.confidence_threshold = classifier_config.get("confidence_threshold", 0.6)
         except Exception as e:
             logging.error(f"Failed to initialize ML classifier: {e}")
             self.ml_classifier = None
@@ -31,23 +59,116 @@ class HybridClassifier:
         word_config = config.get("word_classifier", {})
         self.word_classifier = KeywordClassifier(config=word_config.get("config", {}))
 
-    def classify(self, text: str, labels: list) -> str:
+        self.fast_path = classifier_config.get("fast_path", True)
+        self.extension_categories = {extension.lower(): category for extension, category
+                                     in classifier_config.get("extension_categories", {}).items()}
+        self.structure_thresholds = {"Code Snippet": 0.3, "Meeting Notes": 0.15,
+                                     **classifier_config.get("structure_thresholds", {})}
+        self.structure_min_lines = classifier_config.get("structure_min_lines", 2)
+        self.keyword_min_hits = classifier_config.get("keyword_min_hits", 3)
+        self.keyword_min_density = classifier_config.get("keyword_min_density", 5.0)
+        self.keyword_margin = classifier_config.get("keyword_margin", 2.0)
+        self.sample_words = classifier_config.get("sample_words", 400)
+        # How many documents were decided by each stage of the cascade.
+        self.stats = Counter()
+
+    def classify(self, text: str, labels: list, source_path: str | None = None) -> str:
         """
         Classify the given text into one of the predefined categories.
 
-        The function first tries to classify the text using the zero-shot classification model.
-        If the zero-shot classification model fails (e.g., due to an error during the classification process),
+        The function first runs the cheap stages of the cascade (file extension,
+        structural cues and keyword hit density) and returns as soon as one of them
+        is decisive. Only ambiguous documents are sent to the zero-shot classification
+        model, which sees a sample of at most `sample_words` words taken from the start,
+        middle and end of the text. If the model is not confident enough (or fails),
         the function falls back to the keyword-based classification model.
 
         :param text: The text content that should be classified.
+        :param labels: The list of labels to classify into.
+        :param source_path: The path of the source file, used for the extension stage.
         :return: The category that the text belongs to, or "uncategorized" if no category is found.
         :raises Exception: If there is an error during the classification process.
         """
+        return self.classify_batch([text], labels, batch_size=1, source_paths=[source_path])[0]
+
+    def classify_batch(self, texts: list[str], labels: list, batch_size: int = 8,
+                       source_paths: list[str | None] | None = None) -> list[str]:
+        """
+        Classify several texts, escalating only the ambiguous ones to one batched zero-shot pass.
+
+        Texts whose ML confidence is below the threshold fall back to the
+        keyword-based classification model, as in `classify`.
+
+        :param texts: The text contents that should be classified.
+        :param labels: The list of labels to classify into.
+        :param batch_size: The number of sequence/label pairs per forward pass.
+        :param source_paths: The source file paths of the texts, used for the extension stage.
+        :return: The category of each text, in the order of `texts`.
+        """
+        source_paths = source_paths or [None] * len(texts)
+        categories: list[str | None] = [None] * len(texts)
+        if self.fast_path:
+            for index, (text, source_path) in enumerate(zip(texts, source_paths)):
+                categories[index] = self._fast_classify(text, labels, source_path)
+        escalated = [index for index, category in enumerate(categories) if category is None]
+        if not escalated:
+            return categories
+
+        predictions = [("uncategorized", 0.0)] * len(escalated)
         try:
             if self.ml_classifier:
-                label, score = self.ml_classifier.predict(text=text, labels=labels)
-                if score >= self.confidence_threshold:
-                    return label
+                samples = [self._sample(texts[index]) for index in escalated]
+                predictions = self.ml_classifier.predict_batch(texts=samples, labels=labels, batch_size=batch_size)
         except Exception as e:
-            logging.info(f"ML classification failed: {e}")
-        return self.word_classifier.classify(text=text)
+            logging.info(f"Batched ML classification failed: {e}")
+        for index, (label, score) in zip(escalated, predictions):
+            if score >= self.confidence_threshold:
+                self.stats["model"] += 1
+                categories[index] = label
+            else:
+                self.stats["keyword_fallback"] += 1
+                categories[index] = self.word_classifier.classify(text=texts[index])
+        return categories
+
+    def _fast_classify(self, text: str, labels: list, source_path: str | None) -> str | None:
+        if source_path:
+            category = self.extension_categories.get(Path(source_path).suffix.lower())
+            if category:
+                self.stats["extension"] += 1
+                return category
+
+        lines = [line for line in text.splitlines() if line.strip()]
+        if lines:
+            for category, pattern in STRUCTURAL_CUES.items():
+                if category not in labels:
+                    continue
+                matched = sum(1 for line in lines if pattern.search(line))
+                if (matched >= self.structure_min_lines
+                        and matched / len(lines) >= self.structure_thresholds.get(category, 1.0)
+                        and (category not in REQUIRED_CUES
+                             or any(REQUIRED_CUES[category].search(line) for line in lines))):
+                    self.stats["structure"] += 1
+                    return category
+
+        scores = self.word_classifier.scores(text)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if ranked:
+            category, hits = ranked[0]
+            runner_up = ranked[1][1] if len(ranked) > 1 else 0
+            density = hits * 1000 / max(1, len(text.split()))
+            if (hits >= self.keyword_min_hits and density >= self.keyword_min_density
+                    and hits >= self.keyword_margin * runner_up):
+                self.stats["keywords"] += 1
+                return category
+        return None
+
+    def _sample(self, text: str) -> str:
+        words = text.split()
+        if len(words) <= self.sample_words:
+            return text
+        # Half from the start, a quarter each from the middle and the end.
+        head = self.sample_words // 2
+        middle = self.sample_words // 4
+        tail = self.sample_words - head - middle
+        middle_start = (len(words) - middle) // 2
+        return " ".join(words[:head] + words[middle_start:middle_start + middle] + words[-tail:])
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import logging
+from pathlib import Path
+from typing import Any
+from scripts.logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: str) -> str:
+    """
+    Computes the SHA-256 hash of the given text.
+
+    :param text: The text to hash.
+    :return: The hexadecimal digest of the text.
+    """
+    return hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+class InferenceCache:
+    def __init__(self, path: Path, max_entries: int = 200_000, evict_every: int = 1000,
+                 access_resolution_seconds: float = 3600.0) -> None:
+        """
+        Initializes the InferenceCache instance.
+
+        The cache is a SQLite table of model outputs keyed by the hash of
+        (stage, model id, parameters, content hash). Entries are evicted least
+        recently used first once the table grows beyond `max_entries`.
+
+        The size of the table is only counted every `evict_every` written entries, so
+        the table may exceed `max_entries` by that many entries in between. The last
+        access time of an entry is coarse: a hit only updates it once it is older than
+        `access_resolution_seconds`, so most hits are plain reads.
+
+        :param path: The path to the SQLite database file.
+        :param max_entries: The maximum number of cached results to keep.
+        :param evict_every: The number of written entries between two size checks.
+        :param access_resolution_seconds: The precision of the last access times used for eviction.
+        :return: None
+        """
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.evict_every = max(1, evict_every)
+        self.access_resolution_seconds = access_resolution_seconds
+        # Entries written since the size of the table was last checked.
+        self.unchecked_writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS inference_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS inference_cache_last_access ON inference_cache (last_access)"
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(stage: str, model: str, params: Any, text: str) -> str:
+        """
+        Builds the cache key for one model call.
+
+        :param stage: The pipeline stage, e.g. "zero_shot" or "summarize".
+        :param model: The model id that produced the result.
+        :param params: The JSON-serializable call parameters (labels, length limits, ...).
+        :param text: The input text of the call.
+        :return: The cache key.
+        """
+        key_source = json.dumps([stage, model, params, content_hash(text)], sort_keys=True)
+        return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Any | None:
+        """
+        Looks up one cached result.
+
+        :param key: The cache key.
+        :return: The cached result, or None if it is not cached.
+        """
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """
+        Looks up several cached results at once.
+
+        :param keys: The cache keys.
+        :return: A mapping of the keys that were found to their cached results.
+        """
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        stale = []
+        now = time.time()
+        stale_before = now - self.access_resolution_seconds
+        try:
+            with self.lock:
+                # Stay well below SQLite's limit on bound parameters.
+                for start in range(0, len(unique_keys), 500):
+                    chunk = unique_keys[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = self.connection.execute(
+                        f"SELECT key, value, last_access FROM inference_cache WHERE key IN ({placeholders})", chunk
+                    ).fetchall()
+                    found.update((key, json.loads(value)) for key, value, _ in rows)
+                    stale.extend(key for key, _, last_access in rows if last_access < stale_before)
+                if stale:
+                    self.connection.executemany("UPDATE inference_cache SET last_access = ? WHERE key = ?",
+                                                [(now, key) for key in stale])
+                    self.connection.commit()
+                self.hits += len(found)
+                self.misses += len(unique_keys) - len(found)
+        except Exception as e:
+            logger.error(f"Failed to read from inference cache: {e}")
+        return found
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Stores one result in the cache.
+
+        :param key: The cache key.
+        :param value: The JSON-serializable result.
+        """
+        self.set_many({key: value})
+
+    def set_many(self, items: dict[str, Any]) -> None:
+        """
+        Stores several results in the cache and, every `evict_every` written entries,
+        evicts the least recently used entries if the cache is over its size limit.
+
+        :param items: A mapping of cache keys to JSON-serializable results.
+        """
+        if not items:
+            return
+        try:
+            now = time.time()
+            with self.lock:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO inference_cache (key, value, last_access) VALUES (?, ?, ?)",
+                    [(key, json.dumps(value), now) for key, value in items.items()]
+                )
+                self.unchecked_writes += len(items)
+                if self.unchecked_writes >= self.evict_every:
+                    self._evict()
+                    self.unchecked_writes = 0
+                self.connection.commit()
+        except Exception as e:
+            logger.error(f"Failed to write to inference cache: {e}")
+
+    def _evict(self) -> None:
+        count = self.connection.execute("SELECT COUNT(*) FROM inference_cache").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.connection.execute(
+                "DELETE FROM inference_cache WHERE key IN "
+                "(SELECT key FROM inference_cache ORDER BY last_access LIMIT ?)", (excess,)
+            )
+            logger.info(f"Evicted {excess} entries from the inference cache")
+
+    def stats(self) -> dict:
+        """
+        Returns the hit and miss counters of the cache.
+
+        :return: A dictionary with the number of hits, misses and the hit rate.
+        """
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+        """
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,456 @@
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from datetime import date
+from pathlib import Path
+import yaml
+from scripts.logging_config import setup_logging
+from scripts.file_handler import get_file_elements, get_file_text, configure_converters, split_elements
+from scripts.spooled_text import SpooledText, clear_spool, spool_elements
+from scripts.data_models import ClassifiedData, EnrichedData
+from scripts.zero_shot_service import ZeroShotService
+from scripts.hybrid_classifier import HybridClassifier
+from scripts.enrichment_pipeline import EnrichmentPipeline
+from scripts.kb_integrator import KBIntegrator
+from scripts.inference_cache import InferenceCache
+from scripts.source_index import SourceIndex, SourceRecord, file_hash
+from scripts.related_notes import Embedder, RelatedNotes
+from scripts.vector_index import VectorIndex
+from scripts.search_index import SearchIndex
+from scripts.entity_index import DEFAULT_HUB_LABELS, EntityIndex
+from scripts.duplicate_index import DuplicateIndex, Fingerprint, signature_similarity
+from scripts.metrics import metrics
+from scripts.model_registry import model_registry
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Define base paths for the Obsidian vault, archive, and configuration file.
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+VAULT_PATH = PROJECT_ROOT / "knowledge_base"
+ARCHIVE_PATH = PROJECT_ROOT / "archive"
+CONFIG_PATH = PROJECT_ROOT / "config.yml"
+
+
+def load_config(config_path: Path = CONFIG_PATH) -> dict:
+    """
+    Loads the YAML configuration file.
+
+    :param config_path: The path to the configuration file.
+    :return: The configuration dictionary.
+    """
+    with open(config_path, 'r', encoding='utf-8') as config_file:
+        return yaml.safe_load(config_file) or {}
+
+
+def archive_file(file_path: str, archive_path: Path = ARCHIVE_PATH) -> bool:
+    """
+    Archives the given file into a dated zip file and removes the original.
+
+    :param file_path: The path to the file that should be archived.
+    :param archive_path: The directory where the archive should be stored.
+    :return: True if the file was archived and removed, otherwise False.
+    """
+    try:
+        os.makedirs(archive_path, exist_ok=True)
+        archive_name = f"{date.today().isoformat()}-{os.path.basename(file_path)}.zip"
+        archive_file_path = os.path.join(archive_path, archive_name)
+        with zipfile.ZipFile(archive_file_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.write(file_path, arcname=os.path.basename(file_path))
+        logger.info(f"Original file archived at: {archive_file_path}")
+        os.remove(file_path)
+        logger.info(f"Original file '{file_path}' removed after archiving")
+        return True
+    except Exception as e:
+        logger.error(f"Error archiving file {file_path}: {e}")
+        return False
+
+
+class IngestionService:
+    def __init__(self, config: dict, vault_path: Path = VAULT_PATH, archive_path: Path = ARCHIVE_PATH,
+                 project_root: Path = PROJECT_ROOT) -> None:
+        """
+        Initializes the IngestionService instance.
+
+        Models are loaded through the shared model registry the first time a document
+        needs them and then reused for every file, so a long-running process pays the
+        start-up cost once per model and simple documents never load the heavy ones.
+
+        :param config: The configuration dictionary.
+        :param vault_path: The path to the Obsidian vault.
+        :param archive_path: The directory where processed files are archived.
+        :param project_root: The project root used to resolve template paths.
+        :return: None
+        """
+        self.config = config
+        self.archive_path = archive_path
+        configure_converters(config)
+        self.classifier_labels = config.get("ml_service", {}).get("labels", [])
+        batch_config = config.get("batch", {})
+        self.convert_workers = batch_config.get("convert_workers", 4)
+        self.zero_shot_batch_size = batch_config.get("zero_shot_batch_size", 8)
+
+        # Inputs from this size on are streamed to a spool file instead of being read into memory.
+        streaming_config = config.get("streaming", {})
+        self.streaming_min_bytes = None
+        self.sample_chars = streaming_config.get("sample_chars", 1_000_000)
+        self.spool_path = project_root / streaming_config.get("spool_path", ".cache/spool")
+        if streaming_config.get("enabled", False):
+            self.streaming_min_bytes = streaming_config.get("min_mb", 50) * 1024 * 1024
+            clear_spool(self.spool_path)
+
+        metrics_config = config.get("metrics", {})
+        if metrics_config.get("enabled", False):
+            metrics.configure(project_root / metrics_config.get("path", "metrics.jsonl"))
+
+        registry_config = config.get("model_registry", {})
+        model_registry.configure(max_memory_mb=registry_config.get("max_memory_mb"),
+                                 idle_seconds=registry_config.get("idle_seconds"))
+        metrics.register_source("model_registry", model_registry.stats)
+
+        # A single inference cache is shared by every model stage.
+        cache_config = config.get("cache", {})
+        self.cache = None
+        if cache_config.get("enabled", False):
+            self.cache = InferenceCache(project_root / cache_config.get("path", ".cache/inference.sqlite3"),
+                                        max_entries=cache_config.get("max_entries", 200_000),
+                                        evict_every=cache_config.get("evict_every", 1000),
+                                        access_resolution_seconds=cache_config.get("access_resolution_seconds",
+                                                                                   3600))
+            metrics.register_source("inference_cache", self.cache.stats)
+
+        # Index of ingested sources, used to recognize re-dropped and revised files.
+        revisions_config = config.get("revisions", {})
+        self.source_index = None
+        # Sources are identified by their path within the inbox, so equal names in different folders differ.
+        self.inbox_path = (project_root / config.get("daemon", {}).get("inbox", "inbox")).resolve()
+        self.min_revision_similarity = revisions_config.get("min_similarity", 0.5)
+        if revisions_config.get("enabled", False):
+            self.source_index = SourceIndex(project_root / revisions_config.get("index_path",
+                                                                                ".cache/sources.sqlite3"))
+            if self.cache is None:
+                logger.warning("Revisions are tracked without the inference cache; they are fully recomputed.")
+
+        # Fingerprints of every note's source text, kept next to the vault, to catch duplicates.
+        duplicates_config = config.get("duplicates", {})
+        self.duplicate_index = None
+        self.duplicate_action = duplicates_config.get("action", "link")
+        if duplicates_config.get("enabled", False):
+            self.duplicate_index = DuplicateIndex(vault_path / duplicates_config.get("path", ".duplicates.sqlite3"),
+                                                  num_perm=duplicates_config.get("num_perm", 128),
+                                                  bands=duplicates_config.get("bands", 16),
+                                                  shingle_size=duplicates_config.get("shingle_size", 5),
+                                                  threshold=duplicates_config.get("threshold", 0.8))
+
+        # Create a single instance of the ZeroShotService to be shared
+        zs_service = ZeroShotService(cache=self.cache, config=config.get("ml_service", {}),
+                                     model_config=config.get("models", {}).get("zero_shot"))
+        self.enrichment_pipeline = EnrichmentPipeline(zs_service=zs_service, config=config, cache=self.cache)
+        self.hybrid_classifier = HybridClassifier(config=config, zs_service=zs_service)
+        metrics.register_source("classifier_cascade", lambda: self.hybrid_classifier.stats)
+        # Vector index of the vault that fills the `{similar_notes}` template field.
+        similar_config = config.get("similar_notes", {})
+        related_notes = None
+        if similar_config.get("enabled", False):
+            related_notes = RelatedNotes(
+                VectorIndex(vault_path / similar_config.get("path", ".vectors"),
+                            exact_max=similar_config.get("exact_max_notes", 20_000),
+                            nprobe=similar_config.get("nprobe", 8)),
+                Embedder(cache=self.cache, model_config=config.get("models", {}).get("embeddings")),
+                top_k=similar_config.get("top_k", 5)
+            )
+        # Full-text index of the vault, queried with `python -m scripts.search_index`.
+        search_config = config.get("search", {})
+        search_index = None
+        if search_config.get("enabled", False):
+            search_index = SearchIndex(vault_path / search_config.get("path", ".search.sqlite3"))
+        # Inverted index of entities to notes, and the entity hub pages written from it.
+        entities_config = config.get("entities", {})
+        self.entity_index = None
+        if entities_config.get("enabled", False):
+            self.entity_index = EntityIndex(vault_path / entities_config.get("path", ".entities.sqlite3"),
+                                            hub_dir=vault_path / entities_config.get("hub_dir", "entities"),
+                                            labels=tuple(entities_config.get("hub_labels", DEFAULT_HUB_LABELS)),
+                                            debounce_seconds=entities_config.get("debounce_seconds", 30))
+        templates_config = config.get('templates', {})
+        notes_config = config.get("notes", {})
+        self.kb_integrator = KBIntegrator(vault_path, templates_config, project_root=project_root,
+                                          related_notes=related_notes, search_index=search_index,
+                                          entity_index=self.entity_index,
+                                          max_text_chars=streaming_config.get("note_max_chars"),
+                                          durable_writes=notes_config.get("durable_writes", False),
+                                          template_check_seconds=notes_config.get("template_check_seconds", 1.0))
+
+    def process(self, file_path: str) -> str:
+        """
+        Runs the full ingestion flow for one file.
+
+        The file is converted to text, classified, enriched and written to the vault.
+        On success the original file is archived; on failure it is quarantined.
+
+        :param file_path: The path to the file that should be processed.
+        :return: The path to the created note, or an empty string if processing failed.
+        """
+        return self.process_batch([file_path]).get(file_path, "")
+
+    def process_batch(self, file_paths: list[str]) -> dict[str, str]:
+        """
+        Runs the full ingestion flow for a batch of files.
+
+        Conversion runs in a thread pool, and classification and enrichment each
+        process the whole batch at once so the models see real batch sizes. Errors are
+        isolated per file: a file that fails any stage is quarantined and dropped from
+        the batch while the remaining files carry on.
+
+        With revision tracking enabled, a file whose path and bytes match an ingested
+        source is archived without being processed again. A file with the same path
+        whose elements largely match the previous version is a revision: it keeps its
+        category and its note is updated in place. Only its changed elements miss the
+        inference cache, so only they go through NER, summarization and action-item
+        detection again.
+
+        With duplicate detection enabled, any other file is checked against the
+        fingerprints of all notes (and the other files of the batch) before it is
+        classified. Exact and near duplicates skip the models: they are archived and
+        mapped to the existing note, which is annotated with the duplicate source if
+        the configured action is "link".
+
+        Files of at least `streaming.min_mb` are streamed: their elements are written to
+        a spool file as they are converted, and only an evenly spaced sample of bounded
+        size is kept in memory. The sample is classified, summarized and searched for
+        action items, NER reads the whole spooled text window by window, and the note
+        body is copied from the spool file, so memory stays bounded whatever the input size.
+
+        The notes of the batch are written together once every file is enriched; each
+        note is written atomically, and with durable writes the vault directories are
+        synced once per batch rather than once per note.
+
+        With the entity index enabled, the hub pages of the entities the batch added or
+        removed are rewritten at the end of the batch, at most once per debounce interval;
+        `flush` writes whatever is still pending.
+
+        :param file_paths: The paths to the files that should be processed.
+        :return: A mapping of each file path to its created note, or an empty string if processing failed.
+        """
+        results = dict.fromkeys(file_paths, "")
+        spooled: dict[str, SpooledText] = {}
+        try:
+            self._run_batch(file_paths, results, spooled)
+        finally:
+            # Also reached when no file of the batch needed the models, so every batch is accounted for.
+            for spool in spooled.values():
+                spool.remove()
+            if self.entity_index is not None:
+                with metrics.stage("entity_hubs"):
+                    self.entity_index.flush()
+
+            succeeded = sum(1 for final_path in results.values() if final_path)
+            metrics.increment("documents_processed", succeeded)
+            metrics.increment("documents_failed", len(results) - succeeded)
+            snapshot = metrics.snapshot()
+            metrics.emit("batch", documents=len(file_paths), succeeded=succeeded, **snapshot)
+            logger.info(f"Classification cascade decisions: {dict(self.hybrid_classifier.stats)}")
+            if self.cache is not None:
+                logger.info(f"Inference cache: {self.cache.stats()}")
+        return results
+
+    def _run_batch(self, file_paths: list[str], results: dict[str, str], spooled: dict[str, SpooledText]) -> None:
+        # Fills in `results` and records every spooled input in `spooled`, so the caller can clean up.
+        sources = {file_path: self._lookup_source(file_path) for file_path in file_paths}
+        for file_path, (previous, fingerprint) in sources.items():
+            if previous is not None and previous.file_hash == fingerprint and Path(previous.note_path).exists():
+                logger.info(f"File '{file_path}' is unchanged since it was ingested into {previous.note_path}")
+                metrics.increment("documents_unchanged")
+                archive_file(file_path, self.archive_path)
+                results[file_path] = previous.note_path
+        pending_paths = [file_path for file_path in file_paths if not results[file_path]]
+
+        # Extract text from the files.
+        with ThreadPoolExecutor(max_workers=self.convert_workers) as executor:
+            conversions = list(executor.map(self._convert, pending_paths))
+        converted = [(file_path, text) for file_path, (text, _) in zip(pending_paths, conversions) if text]
+        spooled.update((file_path, spool) for file_path, (_, spool) in zip(pending_paths, conversions) if spool)
+        if not converted:
+            return
+
+        # Revisions keep the category and note of their previous version.
+        revisions = {}
+        element_hashes = {}
+        for file_path, text_content in converted:
+            previous, _ = sources[file_path]
+            element_hashes[file_path] = (spooled[file_path].element_hashes if file_path in spooled
+                                         else SourceIndex.element_hashes(split_elements(text_content)))
+            if previous is None or not Path(previous.note_path).exists():
+                continue
+            similarity = previous.similarity(element_hashes[file_path])
+            if similarity >= self.min_revision_similarity:
+                changed = len(set(element_hashes[file_path]) - set(previous.element_hashes))
+                logger.info(f"File '{file_path}' is a revision of {previous.note_path}: "
+                            f"{changed} of {len(element_hashes[file_path])} elements changed")
+                metrics.increment("documents_revised")
+                revisions[file_path] = previous
+
+        # Short-circuit exact and near duplicates of existing notes or of earlier files in the batch.
+        text_fingerprints = {}
+        duplicates = {}
+        batch_duplicates = {}
+        if self.duplicate_index is not None:
+            for file_path, text_content in converted:
+                text_fingerprints[file_path] = self.duplicate_index.fingerprint(text_content)
+                if file_path in revisions:
+                    continue
+                match = self.duplicate_index.find(text_fingerprints[file_path])
+                if match is not None and Path(match[0]).exists():
+                    duplicates[file_path] = match
+                    continue
+                original = self._find_batch_duplicate(text_fingerprints[file_path], text_fingerprints,
+                                                      exclude=set(duplicates) | set(batch_duplicates) | {file_path})
+                if original is not None:
+                    batch_duplicates[file_path] = original
+            converted = [(file_path, text) for file_path, text in converted
+                         if file_path not in duplicates and file_path not in batch_duplicates]
+
+        # Classify the texts.
+        categories = {file_path: previous.category for file_path, previous in revisions.items()}
+        to_classify = [(file_path, text) for file_path, text in converted if file_path not in revisions]
+        if to_classify:
+            with metrics.stage("classify", documents=len(to_classify)):
+                classified = self.hybrid_classifier.classify_batch(texts=[text for _, text in to_classify],
+                                                                   labels=self.classifier_labels,
+                                                                   batch_size=self.zero_shot_batch_size,
+                                                                   source_paths=[path for path, _ in to_classify])
+            categories.update(zip([file_path for file_path, _ in to_classify], classified))
+        processed_list = []
+        for file_path, text_content in converted:
+            logger.info(f"File '{file_path}' classified as '{categories[file_path]}'")
+            processed_list.append(ClassifiedData(
+                text=text_content,
+                source_path=file_path,
+                category=categories[file_path],
+                body_path=spooled[file_path].path if file_path in spooled else None
+            ))
+
+        enriched_list = self.enrichment_pipeline.run_batch(data_list=processed_list)
+        notes = []
+        for processed_data, enriched_data in zip(processed_list, enriched_list):
+            if enriched_data is None:
+                logger.error(f"Enrichment pipeline failed for file: {processed_data.source_path}",
+                             path=processed_data.source_path)
+                continue
+            previous = revisions.get(processed_data.source_path)
+            notes.append((enriched_data, previous.note_path if previous else None))
+        for (enriched_data, _), final_path in zip(notes, self._write_notes(notes)):
+            file_path = enriched_data.source_path
+            results[file_path] = final_path
+            fingerprint = sources[file_path][1]
+            if final_path and self.source_index is not None and fingerprint:
+                self.source_index.record(SourceRecord(name=self._source_key(file_path), file_hash=fingerprint,
+                                                      element_hashes=element_hashes[file_path],
+                                                      note_path=final_path, category=enriched_data.category))
+            if final_path and file_path in text_fingerprints:
+                self.duplicate_index.add(final_path, text_fingerprints[file_path])
+
+        for file_path, (note_path, similarity) in duplicates.items():
+            results[file_path] = self._handle_duplicate(file_path, note_path, similarity)
+        for file_path, (original, similarity) in batch_duplicates.items():
+            if results[original]:
+                results[file_path] = self._handle_duplicate(file_path, results[original], similarity)
+            else:
+                logger.error(f"File '{file_path}' duplicates '{original}', which failed", path=file_path)
+
+    def flush(self) -> None:
+        """
+        Writes the deferred updates of the vault, i.e. the pending entity hub pages.
+
+        Called once the input has been processed, or when the watcher is idle.
+        """
+        if self.entity_index is not None:
+            self.entity_index.flush(force=True)
+
+    def _find_batch_duplicate(self, fingerprint: Fingerprint, fingerprints: dict[str, Fingerprint],
+                              exclude: set[str]) -> tuple[str, float] | None:
+        for file_path, other in fingerprints.items():
+            if file_path in exclude:
+                continue
+            if other.text_hash == fingerprint.text_hash:
+                return file_path, 1.0
+            similarity = signature_similarity(fingerprint.signature, other.signature)
+            if similarity >= self.duplicate_index.threshold:
+                return file_path, similarity
+        return None
+
+    def _handle_duplicate(self, file_path: str, note_path: str, similarity: float) -> str:
+        logger.info(f"File '{file_path}' duplicates {note_path} ({similarity:.0%} similar), skipping the models")
+        metrics.increment("documents_duplicate")
+        if self.duplicate_action == "link":
+            self.kb_integrator.link_duplicate(note_path, file_path, similarity)
+        archive_file(file_path, self.archive_path)
+        return note_path
+
+    def _lookup_source(self, file_path: str) -> tuple[SourceRecord | None, str]:
+        if self.source_index is None:
+            return None, ""
+        try:
+            fingerprint = file_hash(file_path)
+        except OSError as e:
+            logger.warning(f"Could not fingerprint file {file_path}: {e}")
+            return None, ""
+        return self.source_index.get(self._source_key(file_path)), fingerprint
+
+    def _source_key(self, file_path: str) -> str:
+        # The path relative to the inbox (the bare name for files directly in it), else the absolute path.
+        path = Path(file_path).resolve()
+        try:
+            return path.relative_to(self.inbox_path).as_posix()
+        except ValueError:
+            return str(path)
+
+    def _convert(self, file_path: str) -> tuple[str, SpooledText | None]:
+        spool = None
+        try:
+            with metrics.stage("convert", file=file_path):
+                if self.streaming_min_bytes is not None and os.path.getsize(file_path) >= self.streaming_min_bytes:
+                    spool = self._spool(file_path)
+                    text_content = spool.sample if spool is not None else None
+                else:
+                    text_content = get_file_text(file_path=file_path)
+        except Exception as e:
+            logger.error(f"Error converting file {file_path}: {e}", path=file_path)
+            return "", None
+        if text_content is None:
+            logger.warning(f"Could not extract text from file: {file_path}")
+            return "", None
+        if not text_content:
+            logger.error(f"Could not extract text from file: {file_path}", path=file_path)
+            if spool is not None:
+                spool.remove()
+            return "", None
+        metrics.increment("input_words", spool.words if spool is not None else len(text_content.split()))
+        return text_content, spool
+
+    def _spool(self, file_path: str) -> SpooledText | None:
+        elements = get_file_elements(file_path)
+        if elements is None:
+            return None
+        spool = spool_elements(elements, directory=self.spool_path, sample_chars=self.sample_chars)
+        logger.info(f"Streamed {spool.characters:,} characters of '{file_path}' to {spool.path}; "
+                    f"models see a sample of {len(spool.sample):,}")
+        return spool
+
+    def _write_notes(self, notes: list[tuple[EnrichedData, str | None]]) -> list[str]:
+        if not notes:
+            return []
+        # Create the notes in Obsidian, or update the notes of previous versions, in one batch.
+        with metrics.stage("write_note", documents=len(notes)):
+            final_paths = self.kb_integrator.create_notes(notes)
+        for (enriched_data, _), final_path in zip(notes, final_paths):
+            file_path = enriched_data.source_path
+            # Archive and delete the original file ONLY if note creation was successful.
+            if final_path:
+                with metrics.stage("archive", file=file_path):
+                    archive_file(file_path, self.archive_path)
+            else:
+                # If note creation failed, the file is already quarantined by the logger.
+                logger.warning(f"Skipping archive for {file_path} because note creation failed.")
+        return final_paths
@@ -0,0 +1,145 @@
+import itertools
+import math
+import os
+import queue
+import threading
+import logging
+from scripts.logging_config import setup_logging
+from scripts.ingestion import IngestionService
+from scripts.model_registry import model_registry
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Sentinel put on the queue to tell a worker thread to exit.
+_STOP = None
+# How long a worker waits for a file before running the idle tasks, in seconds.
+_IDLE_CHECK_SECONDS = 5
+
+
+class IngestionWorker:
+    def __init__(self, service: IngestionService, max_workers: int = 1, batch_size: int = 1) -> None:
+        """
+        Initializes the IngestionWorker instance.
+
+        The worker owns an in-process priority queue of file paths that is drained by
+        a fixed number of threads, all sharing the same IngestionService (and therefore
+        the same loaded models). Smaller files are taken first, so a burst of notes is
+        not held up behind a huge PDF, and a file that is already queued is not queued
+        twice. While the queue is empty, pending entity hub pages are
+        written and models unused for longer than the registry's idle timeout are
+        unloaded.
+
+        :param service: The IngestionService used to process each file.
+        :param max_workers: The maximum number of batches processed concurrently.
+        :param batch_size: The maximum number of queued files a thread takes as one batch.
+        :return: None
+        """
+        self.service = service
+        self.max_workers = max(1, int(max_workers))
+        self.batch_size = max(1, int(batch_size))
+        self.queue: queue.PriorityQueue = queue.PriorityQueue()
+        self.queued: set[str] = set()
+        self.queued_lock = threading.Lock()
+        # Breaks ties between equal priorities in submission order.
+        self.sequence = itertools.count()
+        self.threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        """
+        Starts the worker threads.
+        """
+        for index in range(self.max_workers):
+            thread = threading.Thread(target=self._run, name=f"ingestion-worker-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        logger.info(f"Ingestion worker started with {self.max_workers} thread(s)")
+
+    def submit(self, file_path: str, priority: float | None = None) -> bool:
+        """
+        Adds a file to the processing queue, unless it is already waiting in it.
+
+        :param file_path: The path to the file that should be processed.
+        :param priority: Lower values are processed first; defaults to the file size in bytes.
+        :return: True if the file was queued, False if it was already queued.
+        """
+        if priority is None:
+            try:
+                priority = os.path.getsize(file_path)
+            except OSError:
+                priority = 0
+        with self.queued_lock:
+            if file_path in self.queued:
+                return False
+            self.queued.add(file_path)
+        self.queue.put((priority, next(self.sequence), file_path))
+        return True
+
+    def stop(self) -> None:
+        """
+        Stops the worker threads after the queued files have been processed.
+        """
+        for _ in self.threads:
+            # Sorted after every file, so the queued files are processed first.
+            self.queue.put((math.inf, next(self.sequence), _STOP))
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        self._idle()
+        logger.info("Ingestion worker stopped")
+
+    def _run(self) -> None:
+        while True:
+            try:
+                file_path = self._take(self.queue.get(timeout=_IDLE_CHECK_SECONDS))
+            except queue.Empty:
+                self._idle()
+                continue
+            if file_path is _STOP:
+                self.queue.task_done()
+                return
+            batch = [file_path]
+            stop = False
+            # Take whatever else is already waiting, so bursts are processed as one batch.
+            while len(batch) < self.batch_size:
+                try:
+                    file_path = self._take(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+                if file_path is _STOP:
+                    stop = True
+                    break
+                batch.append(file_path)
+            try:
+                self._process(batch)
+            finally:
+                for _ in range(len(batch) + stop):
+                    self.queue.task_done()
+            if stop:
+                return
+
+    def _take(self, item: tuple) -> str | None:
+        _, _, file_path = item
+        if file_path is not _STOP:
+            with self.queued_lock:
+                self.queued.discard(file_path)
+        return file_path
+
+    def _idle(self) -> None:
+        try:
+            self.service.flush()
+        except Exception as e:
+            logger.error(f"Error writing deferred vault updates: {e}")
+        model_registry.evict_idle()
+
+    def _process(self, batch: list[str]) -> None:
+        try:
+            results = self.service.process_batch(batch)
+        except Exception as e:
+            logger.error(f"Error processing batch of {len(batch)} files: {e}")
+            for file_path in batch:
+                logger.error(f"Error processing file {file_path}: {e}", path=file_path)
+            return
+        for file_path, final_path in results.items():
+            if final_path:
+                logger.info(f"Processed file successfully: {file_path}")
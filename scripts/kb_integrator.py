@@ -1,14 +1,29 @@
+import os
+import re
+import uuid
 from datetime import date
 from scripts.data_models import EnrichedData
-import re
 from pathlib import Path
 from scripts.logging_config import setup_logging
 import logging
-from collections import defaultdict
+from scripts.metrics import metrics
+from scripts.related_notes import RelatedNotes
+from scripts.entity_index import EntityIndex, hub_name, normalize_entities
+from scripts.spooled_text import copy_spooled_text
+from scripts.note_templates import TemplateRegistry
+from scripts.search_index import DATE_PREFIX_PATTERN, NoteRecord, SearchIndex, parse_action_item
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
+# Stands in for the text of a streamed document until it is copied into the note file.
+_STREAMED_TEXT = object()
+_SLUG_INVALID_PATTERN = re.compile(r'[^a-z0-9\s-]')
+_SLUG_WHITESPACE_PATTERN = re.compile(r'\s+')
+# Ends the generated part of every note (an Obsidian comment, hidden in reading view). Whatever
+# follows it, such as the user's own notes or linked duplicates, is kept when the source is revised.
+GENERATED_END_MARKER = "%% End of generated content. Anything below this line is kept when the source is revised. %%"
+
 
 def slugify(text: str) -> str:
     """
@@ -21,70 +36,274 @@ def slugify(text: str) -> str:
     :param text: The text string to be converted into a slug format.
     :return: The slug formatted text string.
     """
-    text = text.lower()
-    text = re.sub(r'[^a-z0-9\s-]', '', text)
-    text = re.sub(r'\s+', '-', text).strip('-')
-    return text
+    text = _SLUG_INVALID_PATTERN.sub('', text.lower())
+    return _SLUG_WHITESPACE_PATTERN.sub('-', text).strip('-')
 
 
 class KBIntegrator:
-    def __init__(self, vault_path: Path, templates_config: dict, project_root: Path) -> None:
+    def __init__(self, vault_path: Path, templates_config: dict, project_root: Path,
+                 related_notes: RelatedNotes | None = None, search_index: SearchIndex | None = None,
+                 entity_index: EntityIndex | None = None, max_text_chars: int | None = None,
+                 durable_writes: bool = False, template_check_seconds: float = 1.0) -> None:
         self.vault_path = vault_path
+        self.max_text_chars = max_text_chars
         self.project_root = project_root
         self.templates_config = templates_config
+        self.templates = TemplateRegistry(project_root, templates_config, check_seconds=template_check_seconds)
+        self.related_notes = related_notes
+        self.search_index = search_index
+        self.entity_index = entity_index
+        self.durable_writes = durable_writes
 
-    def create_note(self, data: EnrichedData) -> str:
+    def create_note(self, data: EnrichedData, note_path: str | None = None) -> str:
         """
         Creates a note in the Obsidian vault based on the given EnrichedData object.
 
-        The note is created in the category-specific directory, with a filename
-        containing the date and the slugified title of the original file.
-
-        If an error occurs during the creation of the note, an empty string is
-        returned.
+        See `create_notes`.
 
         :param data: The EnrichedData object containing the information to be
             written to the note.
+        :param note_path: The path to the existing note of a previous version of the source.
         :return: The path to the created note as a string, or an empty string
             if an error occurred.
         """
-        try:
-            # Get the relative template path from the config
-            default_template_path = self.templates_config.get("Default", "templates/default.md")
-            template_path = self.templates_config.get(data.category, default_template_path)
+        return self.create_notes([(data, note_path)])[0]
+
+    def create_notes(self, items: list[tuple[EnrichedData, str | None]]) -> list[str]:
+        """
+        Creates the notes of a batch of documents in the Obsidian vault.
+
+        Each note is created in the category-specific directory, with a filename
+        containing the date and the slugified title of the original file; if that name
+        is taken, a counter is appended (`-2`, `-3`, ...) rather than overwriting the
+        other note. For a revision of an already ingested source, the existing note is
+        updated in place instead; it is only rewritten if its content changed. With
+        related notes enabled, the `{similar_notes}` field lists the most similar notes
+        of the vault as wikilinks, and the new note is added to the vault's vector
+        index. Every written note is also added to the vault's full-text search index,
+        if one is set.
+
+        Entities are normalized and listed once per note. With an entity index, only
+        the labels that have hub pages are rendered as wikilinks (to the hub pages) and
+        the note's mentions are recorded in the index; the hub pages themselves are
+        written when the index is flushed.
+
+        The `{text}` field holds at most `max_text_chars` characters of the source
+        text. For a streamed document it is copied into the note file in chunks from
+        the spooled text on disk, so the full text is never held in memory.
+
+        Every note ends its generated part with `GENERATED_END_MARKER`. When a note is
+        updated, only the part above the marker is regenerated; the user's additions
+        below it and the duplicate sources linked to the note are kept. Edits above
+        the marker are replaced by the regenerated part.
+
+        Notes are written to a hidden temporary file next to their final path and
+        renamed into place, so the vault never holds a half-written note. With durable
+        writes, every note is synced to disk before the rename, and each directory the
+        batch wrote to is synced once at the end.
 
-            # Create an absolute path to the template file
-            absolute_template_path = self.project_root / template_path
-            template_content = absolute_template_path.read_text(encoding='utf-8')
+        If an error occurs during the creation of a note, an empty string is returned
+        for it and the other notes of the batch are still written.
+
+        :param items: The EnrichedData objects paired with the path to the existing note
+            of a previous version of their source, or None.
+        :return: The path to each created note as a string, or an empty string if an
+            error occurred, in the order of `items`.
+        """
+        directories = set()
+        final_paths = [self._create_note(data, note_path, directories) for data, note_path in items]
+        if self.durable_writes:
+            for directory in directories:
+                try:
+                    _sync_directory(directory)
+                except OSError as e:
+                    logger.warning(f"Could not sync directory {directory}: {e}")
+        return final_paths
+
+    def _create_note(self, data: EnrichedData, note_path: str | None, directories: set[Path]) -> str:
+        try:
+            template = self.templates.get(data.category)
 
             # Prepare the content to be written to the note
             title = Path(data.source_path).stem
-            entity_md = ""
-            for label, items in data.entities.items():
-                entity_md += f"- **{label}:** {', '.join(f'[[{item}]]' for item in items)}\n"
+            entities = normalize_entities(data.entities)
+            entity_lines = []
+            for label, items in entities.items():
+                if self.entity_index is None or self.entity_index.is_indexed(label):
+                    entity_lines.append(f"- **{label}:** {', '.join(self._entity_link(item) for item in items)}\n")
+                else:
+                    entity_lines.append(f"- **{label}:** {', '.join(items)}\n")
 
-            action_items_md = ""
-            if data.action_items:
-                for item in data.action_items:
-                    action_items_md += f"- [ ] {item}\n"
+            embedding = None
+            similar_notes = []
+            if self.related_notes is not None:
+                embedding = self.related_notes.embed(data)
+                similar_notes = self.related_notes.find(embedding, note_path=note_path)
 
-            data_for_template = data.__dict__
-            data_for_template['title'] = title
-            data_for_template['entities_list'] = entity_md
-            data_for_template['action_items_list'] = action_items_md
+            with metrics.stage("template_render"):
+                values = {
+                    **vars(data),
+                    'title': title,
+                    'entities_list': "".join(entity_lines),
+                    'action_items_list': "".join(f"- [ ] {item}\n" for item in data.action_items),
+                    'similar_notes': "".join(f"- [[{Path(path).stem}]]\n" for path in similar_notes),
+                    'text': _STREAMED_TEXT if data.body_path else self._capped_text(data.text),
+                }
+                parts = template.render_parts(values, keep=(_STREAMED_TEXT,))
+                parts.append(f"\n{GENERATED_END_MARKER}\n")
 
-            safe_data = defaultdict(str, data_for_template)
-            file_content = template_content.format_map(safe_data)
+            if note_path and Path(note_path).exists():
+                final_path = Path(note_path)
+                existing = final_path.read_text(encoding='utf-8')
+                parts.append(_kept_content(existing))
+                if data.body_path or existing != "".join(parts):
+                    self._write(final_path, parts, data.body_path, replace=True)
+                    directories.add(final_path.parent)
+                self._index_note(final_path, data, title, entities, embedding)
+                logging.info(f"Note updated at: {final_path}")
+                return str(final_path)
 
             # Create the target directory and write the note
             target_dir = self.vault_path / slugify(data.category)
             target_dir.mkdir(parents=True, exist_ok=True)
             filename = f"{date.today().isoformat()}-{slugify(title)}.md"
-            final_path = target_dir / filename
-            final_path.write_text(file_content, encoding='utf-8')
+            final_path = self._write(target_dir / filename, parts, data.body_path, replace=False)
+            directories.add(target_dir)
+            self._index_note(final_path, data, title, entities, embedding)
 
             logging.info(f"Note created at: {final_path}")
             return str(final_path)
         except Exception as e:
-            logger.error(f"Error creating note for file {data.source_path}: {e}", data.source_path)
+            logger.error(f"Error creating note for file {data.source_path}: {e}", path=data.source_path)
             return ""
+
+    def _capped_text(self, text: str) -> str:
+        if self.max_text_chars is None or len(text) <= self.max_text_chars:
+            return text
+        return text[:self.max_text_chars] + self._truncation_notice()
+
+    def _truncation_notice(self) -> str:
+        return f"\n\n> Text truncated after {self.max_text_chars:,} characters; the full source is archived.\n"
+
+    def _write(self, final_path: Path, parts: list, body_path: str | None, replace: bool) -> Path:
+        temp_path = final_path.with_name(f".{final_path.name}.{uuid.uuid4().hex[:12]}.tmp")
+        # Created like a regular file (not with mkstemp's private mode), so the note keeps the usual permissions.
+        descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            with open(descriptor, 'w', encoding='utf-8') as note_file:
+                for part in parts:
+                    if part is not _STREAMED_TEXT:
+                        note_file.write(part)
+                    elif copy_spooled_text(body_path, note_file, max_chars=self.max_text_chars):
+                        note_file.write(self._truncation_notice())
+                if self.durable_writes:
+                    note_file.flush()
+                    os.fsync(note_file.fileno())
+            if replace:
+                os.replace(temp_path, final_path)
+                return final_path
+            return _claim_unique_path(temp_path, final_path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+
+    @staticmethod
+    def _entity_link(name: str) -> str:
+        target = hub_name(name)
+        return f"[[{target}]]" if target == name else f"[[{target}|{name}]]"
+
+    def _index_note(self, final_path: Path, data: EnrichedData, title: str, entities: dict[str, list[str]],
+                    embedding: list[float] | None) -> None:
+        if self.entity_index is not None:
+            self.entity_index.update_note(str(final_path), entities)
+        if self.related_notes is not None:
+            self.related_notes.add(str(final_path), embedding)
+        if self.search_index is not None:
+            date_match = DATE_PREFIX_PATTERN.match(final_path.name)
+            self.search_index.add(NoteRecord(
+                path=str(final_path), title=title, category=final_path.parent.name,
+                created=date_match.group(1) if date_match else date.today().isoformat(),
+                summary=data.summary, entities=entities,
+                action_items=[parse_action_item(item) for item in data.action_items], body=data.text
+            ))
+
+    def link_duplicate(self, note_path: str, source_path: str, similarity: float) -> bool:
+        """
+        Records a duplicate source file at the end of an existing note, below the
+        generated part, so the link survives revisions of the note's source.
+
+        :param note_path: The path to the existing note.
+        :param source_path: The path to the duplicate source file.
+        :param similarity: The estimated similarity of the duplicate to the note's source.
+        :return: True if the note was updated, otherwise False.
+        """
+        try:
+            with open(note_path, "a", encoding="utf-8") as note_file:
+                note_file.write(f"\n> Duplicate source: {Path(source_path).name} ({similarity:.0%} similar)\n")
+            logging.info(f"Linked duplicate {source_path} to note {note_path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error linking duplicate {source_path} to note {note_path}: {e}")
+            return False
+
+
+def _kept_content(existing: str) -> str:
+    """
+    Returns the part of an existing note that an update keeps: everything after the
+    generated part. Notes written before the marker existed keep nothing.
+
+    :param existing: The content of the existing note.
+    :return: The content to append after the regenerated part.
+    """
+    _, marker, kept = existing.partition(GENERATED_END_MARKER)
+    if marker:
+        return kept[1:] if kept.startswith("\n") else kept
+    return ""
+
+
+def _claim_unique_path(temp_path: Path, final_path: Path) -> Path:
+    """
+    Moves a written note to its final path, appending `-2`, `-3`, ... to the name
+    while that path is taken. A hard link only succeeds if the name is free, so two
+    writers can never claim the same name or overwrite each other's notes.
+
+    :param temp_path: The path to the written note.
+    :param final_path: The preferred path of the note.
+    :return: The path the note was moved to.
+    """
+    candidate = final_path
+    counter = 1
+    while True:
+        try:
+            _move_exclusive(temp_path, candidate)
+            return candidate
+        except FileExistsError:
+            counter += 1
+            candidate = final_path.with_name(f"{final_path.stem}-{counter}{final_path.suffix}")
+
+
+def _move_exclusive(temp_path: Path, target: Path) -> None:
+    try:
+        os.link(temp_path, target)
+    except FileExistsError:
+        raise
+    except OSError:
+        # The file system has no hard links; reserve the name, then move the note onto it.
+        os.close(os.open(target, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+        os.replace(temp_path, target)
+        return
+    os.unlink(temp_path)
+
+
+def _sync_directory(directory: Path) -> None:
+    """
+    Flushes the entries of a directory to disk, so the notes renamed into it survive a crash.
+
+    :param directory: The directory to sync.
+    :raises OSError: If the directory cannot be opened or synced.
+    """
+    descriptor = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
@@ -3,7 +3,11 @@ import os
 import shutil
 
 
-QUARANTINE_PATH = os.path.abspath("../quarantine")
+# Resolved against the project root so the location does not depend on the working directory.
+QUARANTINE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "quarantine")
+
+
+_configured = False
 
 
 def setup_logging():
@@ -12,8 +16,13 @@ def setup_logging():
 
     The logging level is set to INFO, and the format is set to
     '%(asctime)s - %(levelname)s - %(message)s' with the date format
-    '%Y-%m-%d %H:%M:%S'.
+    '%Y-%m-%d %H:%M:%S'. Every module calls it on import so its logger is a
+    QuarantineLogger; only the first call does any work.
     """
+    global _configured
+    if _configured:
+        return
+    _configured = True
     logging.setLoggerClass(QuarantineLogger)
     logging.basicConfig(
         level=logging.INFO,
@@ -0,0 +1,264 @@
+import json
+import resource
+import sys
+import threading
+import time
+import logging
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable
+from scripts.logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def peak_rss_bytes() -> int:
+    """
+    Returns the peak resident set size of the current process.
+
+    :return: The peak RSS in bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss_bytes() -> int:
+    """
+    Returns the current resident set size of the process.
+
+    Read from /proc on Linux; elsewhere the peak RSS is the closest available value.
+
+    :return: The current RSS in bytes.
+    """
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+
+class Metrics:
+    def __init__(self) -> None:
+        """
+        Initializes the Metrics instance.
+
+        Collects per-stage wall and CPU time, counters and the values of registered
+        statistics sources (inference cache, classification cascade, ...). Every
+        stage measurement can also be appended to a JSON-lines file.
+
+        :return: None
+        """
+        self.lock = threading.Lock()
+        self.stages = defaultdict(lambda: {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+        self.counters = Counter()
+        self.sources: dict[str, Callable[[], dict]] = {}
+        self.output_path: Path | None = None
+        # Worker process name -> its latest snapshot, see `update_worker`.
+        self.workers: dict[str, dict] = {}
+
+    def configure(self, output_path: Path | None) -> None:
+        """
+        Sets the JSON-lines file that measurements are appended to.
+
+        :param output_path: The path to the JSON-lines file, or None to disable file output.
+        """
+        self.output_path = Path(output_path) if output_path else None
+        if self.output_path:
+            self.output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def reset(self) -> None:
+        """
+        Clears the collected stages, counters and worker snapshots.
+
+        Called in a forked worker process, which would otherwise report the totals it
+        inherited from its parent a second time.
+        """
+        self.lock = threading.Lock()
+        self.stages.clear()
+        self.counters.clear()
+        self.workers.clear()
+
+    def update_worker(self, name: str, snapshot: dict) -> None:
+        """
+        Stores the latest snapshot of a worker process.
+
+        Its stages and counters are added to this process's totals in `snapshot`, so the
+        parent of a worker pool reports the work of all its processes.
+
+        :param name: The name of the worker process.
+        :param snapshot: The worker's own `snapshot()`, with cumulative totals.
+        """
+        with self.lock:
+            self.workers[name] = snapshot
+
+    @contextmanager
+    def stage(self, name: str, **fields):
+        """
+        Measures the wall and CPU time of the wrapped block as one call of a stage.
+
+        CPU time is process CPU time, so it includes model threads; with several
+        worker threads it also includes their concurrent work.
+
+        :param name: The stage name, e.g. "convert" or "summarize".
+        :param fields: Extra fields written to the JSON-lines record (file, documents, ...).
+        """
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall_seconds = time.perf_counter() - wall_start
+            cpu_seconds = time.process_time() - cpu_start
+            with self.lock:
+                totals = self.stages[name]
+                totals["calls"] += 1
+                totals["wall_seconds"] += wall_seconds
+                totals["cpu_seconds"] += cpu_seconds
+            self.emit("stage", stage=name, wall_seconds=round(wall_seconds, 6),
+                      cpu_seconds=round(cpu_seconds, 6), **fields)
+
+    def increment(self, name: str, value: int | float = 1) -> None:
+        """
+        Increments a counter.
+
+        :param name: The counter name, e.g. "input_words".
+        :param value: The amount to add.
+        """
+        with self.lock:
+            self.counters[name] += value
+
+    def register_source(self, name: str, callback: Callable[[], dict]) -> None:
+        """
+        Registers a callback whose numeric values are included in every snapshot.
+
+        :param name: The source name, e.g. "inference_cache".
+        :param callback: A callable returning a dictionary of statistics.
+        """
+        self.sources[name] = callback
+
+    def snapshot(self) -> dict:
+        """
+        Returns the current totals of all stages, counters and sources.
+
+        The stages and counters of worker processes are included in the totals; their
+        RSS is added to `rss_bytes`, their peak RSS raises `peak_rss_bytes`, and their
+        sources and memory are listed per process under "workers".
+
+        :return: A JSON-serializable dictionary of the collected metrics.
+        """
+        with self.lock:
+            snapshot = {
+                "stages": {name: dict(totals) for name, totals in self.stages.items()},
+                "counters": dict(self.counters),
+                "peak_rss_bytes": peak_rss_bytes(),
+                "rss_bytes": current_rss_bytes(),
+            }
+            workers = dict(self.workers)
+        if workers:
+            snapshot["workers"] = {}
+            for worker_name, worker in workers.items():
+                for name, totals in worker.get("stages", {}).items():
+                    merged = snapshot["stages"].setdefault(name, {"calls": 0, "wall_seconds": 0.0,
+                                                                  "cpu_seconds": 0.0})
+                    for key in merged:
+                        merged[key] += totals.get(key, 0)
+                for name, value in worker.get("counters", {}).items():
+                    snapshot["counters"][name] = snapshot["counters"].get(name, 0) + value
+                # Shared copy-on-write pages count once per process, so the sum overstates the total.
+                snapshot["rss_bytes"] += worker.get("rss_bytes", 0)
+                snapshot["peak_rss_bytes"] = max(snapshot["peak_rss_bytes"], worker.get("peak_rss_bytes", 0))
+                snapshot["workers"][worker_name] = {key: value for key, value in worker.items()
+                                                    if key not in ("stages", "counters", "workers")}
+        for name, callback in self.sources.items():
+            try:
+                snapshot[name] = dict(callback())
+            except Exception as e:
+                logger.warning(f"Failed to collect metrics source {name}: {e}")
+        return snapshot
+
+    def emit(self, event: str, **fields) -> None:
+        """
+        Appends one JSON record to the metrics file, if one is configured.
+
+        :param event: The event type, e.g. "stage" or "batch".
+        :param fields: The fields of the record.
+        """
+        if self.output_path is None:
+            return
+        record = {"timestamp": time.time(), "event": event, **fields}
+        try:
+            with self.lock, open(self.output_path, "a", encoding="utf-8") as output_file:
+                output_file.write(json.dumps(record, default=str) + "\n")
+        except Exception as e:
+            logger.warning(f"Failed to write metrics record: {e}")
+
+    def prometheus_text(self) -> str:
+        """
+        Renders the current snapshot in the Prometheus text exposition format.
+
+        :return: The metrics as Prometheus text.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for key in ("calls", "wall_seconds", "cpu_seconds"):
+            metric = f"pkdm_stage_{key}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f'{metric}{{stage="{name}"}} {totals[key]}' for name, totals in snapshot["stages"].items())
+        for name, value in snapshot["counters"].items():
+            lines.append(f"# TYPE pkdm_{name}_total counter")
+            lines.append(f"pkdm_{name}_total {value}")
+        lines.append("# TYPE pkdm_peak_rss_bytes gauge")
+        lines.append(f"pkdm_peak_rss_bytes {snapshot['peak_rss_bytes']}")
+        lines.append("# TYPE pkdm_rss_bytes gauge")
+        lines.append(f"pkdm_rss_bytes {snapshot['rss_bytes']}")
+        for source in self.sources:
+            for key, value in snapshot.get(source, {}).items():
+                if isinstance(value, (int, float)):
+                    lines.append(f"pkdm_{source}_{key} {value}")
+        for worker_name, worker in snapshot.get("workers", {}).items():
+            for name, value in worker.items():
+                if isinstance(value, (int, float)):
+                    lines.append(f'pkdm_worker_{name}{{worker="{worker_name}"}} {value}')
+                elif isinstance(value, dict):
+                    lines.extend(f'pkdm_{name}_{key}{{worker="{worker_name}"}} {number}'
+                                 for key, number in value.items() if isinstance(number, (int, float)))
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide metrics shared by every stage.
+metrics = Metrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = metrics.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes would otherwise be logged to stderr on every request.
+        pass
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serves the metrics in Prometheus text format on http://<host>:<port>/metrics.
+
+    :param port: The port to listen on.
+    :param host: The interface to bind to; local-only by default.
+    :return: The running server; call `shutdown()` to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,123 @@
+import logging
+from pathlib import Path
+from scripts.logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+
+# Settings used for a stage that has no entry in the `models` configuration section.
+DEFAULT_MODELS = {
+    "zero_shot": {"model": "facebook/bart-large-mnli"},
+    "summarizer": {"model": "facebook/bart-large-cnn"},
+    "embeddings": {"model": "sentence-transformers/all-MiniLM-L6-v2"},
+}
+DEFAULT_SETTINGS = {"dtype": "float32", "threads": None, "backend": "pytorch", "quantize": None,
+                    "local_files_only": False}
+BACKENDS = ("pytorch", "onnx")
+QUANTIZATION_MODES = (None, "dynamic_int8")
+
+
+def model_settings(stage: str, config: dict | None = None) -> dict:
+    """
+    Resolves the model settings of a pipeline stage.
+
+    The stage entry of the `models` configuration section is merged over the
+    defaults. A `model` that names an existing directory (absolute or relative to
+    the project root) is loaded from disk instead of the Hugging Face hub.
+
+    :param stage: The stage name, e.g. "zero_shot", "summarizer" or "embeddings".
+    :param config: The stage entry of the `models` configuration section.
+    :return: The settings with the keys model, dtype, threads, backend, quantize and local_files_only.
+    :raises ValueError: If the backend or quantization mode is unknown.
+    """
+    settings = {**DEFAULT_SETTINGS, **DEFAULT_MODELS.get(stage, {}), **(config or {})}
+    if settings["backend"] not in BACKENDS:
+        raise ValueError(f"Unknown backend '{settings['backend']}' for stage '{stage}', expected one of {BACKENDS}")
+    if settings["quantize"] not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization '{settings['quantize']}' for stage '{stage}'")
+
+    local_path = Path(settings["model"])
+    if not local_path.is_absolute():
+        local_path = PROJECT_ROOT / local_path
+    if local_path.is_dir():
+        settings["model"] = str(local_path)
+        settings["local_files_only"] = True
+    return settings
+
+
+def model_id(settings: dict) -> str:
+    """
+    Builds an identifier of a model and the way it is loaded.
+
+    Quantized or reduced-precision models produce slightly different outputs, so the
+    identifier is used in inference cache keys and metrics instead of the bare model id.
+
+    :param settings: The settings returned by `model_settings`.
+    :return: The model id, suffixed with the backend, dtype and quantization when not the fp32 default.
+    """
+    variant = [part for part in (settings["backend"] if settings["backend"] != "pytorch" else None,
+                                 settings["dtype"] if settings["dtype"] != "float32" else None,
+                                 settings["quantize"]) if part]
+    return settings["model"] if not variant else f"{settings['model']}@{'+'.join(variant)}"
+
+
+def load_pipeline(task: str, settings: dict):
+    """
+    Loads a transformers pipeline with the given model settings.
+
+    With the pytorch backend the model is loaded in the configured dtype and, for
+    `quantize: dynamic_int8`, its linear layers are replaced by dynamically quantized
+    int8 versions. The onnx backend exports the checkpoint to ONNX Runtime through
+    `optimum` (an optional dependency) unless the model directory already holds an
+    ONNX export.
+
+    :param task: The pipeline task, e.g. "zero-shot-classification", "summarization" or "feature-extraction".
+    :param settings: The settings returned by `model_settings`.
+    :return: The loaded pipeline.
+    :raises ImportError: If the onnx backend is selected but `optimum` is not installed.
+    """
+    if settings["backend"] == "onnx":
+        return _load_onnx_pipeline(task, settings)
+
+    # Imported on first load, so commands that never run a model start without them.
+    import torch
+    from transformers import pipeline
+
+    if settings["threads"]:
+        # Intra-op threads are process-wide in torch; the last loaded stage wins.
+        torch.set_num_threads(settings["threads"])
+    dtype = settings["dtype"]
+    if settings["quantize"] == "dynamic_int8" and dtype != "float32":
+        logger.warning(f"Dynamic int8 quantization needs float32 weights, ignoring dtype '{dtype}'.")
+        dtype = "float32"
+    loaded = pipeline(task, model=settings["model"], torch_dtype=getattr(torch, dtype),
+                      model_kwargs={"local_files_only": settings["local_files_only"]})
+    if settings["quantize"] == "dynamic_int8":
+        loaded.model = torch.ao.quantization.quantize_dynamic(loaded.model, {torch.nn.Linear}, dtype=torch.qint8)
+    return loaded
+
+
+def _load_onnx_pipeline(task: str, settings: dict):
+    try:
+        from optimum.onnxruntime import (ORTModelForFeatureExtraction, ORTModelForSeq2SeqLM,
+                                         ORTModelForSequenceClassification)
+        from onnxruntime import SessionOptions
+    except ImportError as e:
+        raise ImportError("The onnx backend needs the 'optimum[onnxruntime]' package.") from e
+    from transformers import AutoTokenizer, pipeline
+
+    if settings["quantize"]:
+        logger.warning("Quantization applies to the pytorch backend only; load a quantized ONNX export instead.")
+    session_options = SessionOptions()
+    if settings["threads"]:
+        session_options.intra_op_num_threads = settings["threads"]
+    model_class = {"summarization": ORTModelForSeq2SeqLM,
+                   "feature-extraction": ORTModelForFeatureExtraction}.get(task, ORTModelForSequenceClassification)
+    model_path = Path(settings["model"])
+    export = not (model_path.is_dir() and any(model_path.glob("*.onnx")))
+    model = model_class.from_pretrained(settings["model"], export=export, session_options=session_options,
+                                        local_files_only=settings["local_files_only"])
+    tokenizer = AutoTokenizer.from_pretrained(settings["model"], local_files_only=settings["local_files_only"])
+    return pipeline(task, model=model, tokenizer=tokenizer)
@@ -0,0 +1,192 @@
+import gc
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable
+from scripts.logging_config import setup_logging
+from scripts.metrics import current_rss_bytes, metrics
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def estimate_model_bytes(model) -> int:
+    """
+    Estimates the memory held by the weights of a loaded model.
+
+    Counts the parameters and buffers of torch models (a pipeline's `model`
+    included); other models, such as spaCy pipelines, are not inspected.
+
+    :param model: The loaded model or pipeline.
+    :return: The estimated size in bytes, or 0 if it cannot be determined.
+    """
+    module = getattr(model, "model", model)
+    try:
+        tensors = list(module.parameters()) + list(module.buffers())
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+    except Exception:
+        return 0
+
+
+class ModelRegistry:
+    def __init__(self) -> None:
+        """
+        Initializes the ModelRegistry instance.
+
+        The registry loads each model on first use and hands the same instance to
+        every caller asking for the same key, so stages that use the same model share
+        it. Loads are serialized, which also keeps the memory estimate of each model
+        (the larger of its weight size and the RSS growth while loading) accurate.
+        Above the memory ceiling, or after the idle timeout, the least recently used
+        models are dropped and reloaded on their next use.
+
+        :return: None
+        """
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        # Key -> {"model", "bytes", "last_used"}, least recently used first.
+        self.entries: OrderedDict[str, dict] = OrderedDict()
+        self.max_memory_bytes: int | None = None
+        self.idle_seconds: float | None = None
+        self.counters = Counter()
+        # Set before forking worker processes, which share the loaded models with the parent.
+        self.frozen = False
+
+    def configure(self, max_memory_mb: float | None = None, idle_seconds: float | None = None) -> None:
+        """
+        Sets the eviction limits.
+
+        :param max_memory_mb: The estimated memory all loaded models may use together; None for no limit.
+        :param idle_seconds: Models unused for this long are unloaded by `evict_idle`; None to keep them.
+        """
+        if self.frozen:
+            return
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024) if max_memory_mb else None
+        self.idle_seconds = idle_seconds or None
+        with self.lock:
+            evicted = self._enforce_ceiling()
+        self._release(evicted)
+
+    def freeze(self) -> None:
+        """
+        Keeps the limits set so far: later calls of `configure` do nothing.
+
+        Called in the parent before forking worker processes. The children inherit the
+        loaded models copy-on-write, and each child builds its own IngestionService,
+        which configures the registry again; applying the ceiling per child would evict
+        the shared weights and reload a private copy in every process.
+        """
+        self.frozen = True
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Returns the model registered under the key, loading it on first use.
+
+        :param key: The model key, e.g. "summarization:facebook/bart-large-cnn".
+        :param loader: A callable that loads the model.
+        :return: The loaded model.
+        :raises Exception: If the model fails to load.
+        """
+        model = self._lookup(key)
+        if model is not None:
+            return model
+        with self.load_lock:
+            # Another thread may have loaded it while we waited.
+            model = self._lookup(key)
+            if model is not None:
+                return model
+            rss_before = current_rss_bytes()
+            try:
+                with metrics.stage("model_load", model=key):
+                    model = loader()
+            except Exception as e:
+                logger.error(f"Failed to load model {key}: {e}")
+                raise
+            size = max(estimate_model_bytes(model), current_rss_bytes() - rss_before, 0)
+            logger.info(f"Loaded model {key} (~{size / 1024 / 1024:.0f} MB)")
+            with self.lock:
+                self.entries[key] = {"model": model, "bytes": size, "last_used": time.monotonic()}
+                self.counters["loads"] += 1
+                evicted = self._enforce_ceiling(keep=key)
+        self._release(evicted)
+        return model
+
+    def evict_idle(self) -> list[str]:
+        """
+        Unloads the models that have not been used within the idle timeout.
+
+        :return: The keys of the unloaded models.
+        """
+        if self.idle_seconds is None:
+            return []
+        cutoff = time.monotonic() - self.idle_seconds
+        with self.lock:
+            evicted = [key for key, entry in self.entries.items() if entry["last_used"] < cutoff]
+            for key in evicted:
+                del self.entries[key]
+            self.counters["idle_evictions"] += len(evicted)
+        for key in evicted:
+            logger.info(f"Unloaded idle model {key}")
+        self._release(evicted)
+        return evicted
+
+    def unload(self, key: str | None = None) -> None:
+        """
+        Unloads one model, or all of them.
+
+        :param key: The model key; None unloads every model.
+        """
+        with self.lock:
+            evicted = [key] if key in self.entries else list(self.entries) if key is None else []
+            for evicted_key in evicted:
+                del self.entries[evicted_key]
+        self._release(evicted)
+
+    def stats(self) -> dict:
+        """
+        Returns the number of loaded models, their estimated memory and the load/eviction counts.
+
+        :return: A dictionary of registry statistics.
+        """
+        with self.lock:
+            return {"loaded": len(self.entries),
+                    "estimated_bytes": sum(entry["bytes"] for entry in self.entries.values()),
+                    **self.counters}
+
+    def _lookup(self, key: str) -> Any:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            entry["last_used"] = time.monotonic()
+            self.entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry["model"]
+
+    def _enforce_ceiling(self, keep: str | None = None) -> list[str]:
+        # Called with the lock held; the model just loaded is never evicted.
+        if self.max_memory_bytes is None:
+            return []
+        evicted = []
+        total = sum(entry["bytes"] for entry in self.entries.values())
+        for key in list(self.entries):
+            if total <= self.max_memory_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self.entries.pop(key)["bytes"]
+            evicted.append(key)
+            logger.info(f"Evicted model {key} to stay under the memory ceiling")
+        self.counters["evictions"] += len(evicted)
+        return evicted
+
+    @staticmethod
+    def _release(evicted: list[str]) -> None:
+        # Models are large reference cycles; collect them now rather than at some later GC pass.
+        if evicted:
+            gc.collect()
+
+
+# Process-wide registry shared by every stage.
+model_registry = ModelRegistry()
@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+import logging
+from collections import defaultdict
+from pathlib import Path
+from string import Formatter
+from typing import Any, Mapping
+from scripts.logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+class CompiledTemplate:
+    def __init__(self, source: str) -> None:
+        """
+        Initializes the CompiledTemplate instance.
+
+        The template is parsed once into its literal text and `{field}` placeholders.
+        Plain placeholders are filled by a dictionary lookup; placeholders with a
+        conversion, format spec or attribute access fall back to `str.format_map`.
+        As with `format_map` over a `defaultdict(str)`, missing fields render empty.
+
+        :param source: The template text.
+        :return: None
+        """
+        self.segments: list[tuple[str, str | None, str | None]] = []
+        for literal, field_name, format_spec, conversion in Formatter().parse(source):
+            fallback = None
+            if field_name is not None and (not field_name.isidentifier() or format_spec or conversion):
+                fallback = ("{" + field_name + (f"!{conversion}" if conversion else "")
+                            + (f":{format_spec}" if format_spec else "") + "}")
+            self.segments.append((literal, field_name, fallback))
+
+    def render_parts(self, values: Mapping[str, Any], keep: tuple = ()) -> list:
+        """
+        Fills in the template without joining the result.
+
+        :param values: The field values.
+        :param keep: Objects that are placed in the result as they are instead of being
+            converted to text, e.g. a stand-in for text that is written separately.
+        :return: The rendered pieces, in order.
+        """
+        parts = []
+        for literal, field_name, fallback in self.segments:
+            if literal:
+                parts.append(literal)
+            if field_name is None:
+                continue
+            if fallback is not None:
+                parts.append(fallback.format_map(defaultdict(str, values)))
+                continue
+            value = values.get(field_name, "")
+            parts.append(value if isinstance(value, str) or any(value is item for item in keep) else str(value))
+        return parts
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        """
+        Fills in the template.
+
+        :param values: The field values.
+        :return: The rendered text.
+        """
+        return "".join(self.render_parts(values))
+
+
+class TemplateRegistry:
+    def __init__(self, project_root: Path, templates_config: dict, check_seconds: float = 1.0) -> None:
+        """
+        Initializes the TemplateRegistry instance.
+
+        Every template is read and compiled once. Its modification time is checked at
+        most every `check_seconds`, and a changed template is compiled again, so edits
+        are picked up without restarting the watcher.
+
+        :param project_root: The project root that template paths are relative to.
+        :param templates_config: The `templates` configuration section mapping categories to template paths.
+        :param check_seconds: The minimum time between two checks of a template for changes.
+        :return: None
+        """
+        self.project_root = project_root
+        self.templates_config = templates_config
+        self.check_seconds = check_seconds
+        self.lock = threading.Lock()
+        # Path -> (compiled template, modification time, time of the last check).
+        self.templates: dict[Path, tuple[CompiledTemplate, int, float]] = {}
+
+    def get(self, category: str) -> CompiledTemplate:
+        """
+        Returns the compiled template of a category, or the default template.
+
+        :param category: The note category.
+        :return: The compiled template.
+        :raises OSError: If the template file cannot be read.
+        """
+        default_template_path = self.templates_config.get("Default", "templates/default.md")
+        template_path = self.project_root / self.templates_config.get(category, default_template_path)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.templates.get(template_path)
+            if entry is not None and now - entry[2] < self.check_seconds:
+                return entry[0]
+        mtime = os.stat(template_path).st_mtime_ns
+        if entry is not None and entry[1] == mtime:
+            compiled = entry[0]
+        else:
+            compiled = CompiledTemplate(template_path.read_text(encoding='utf-8'))
+            if entry is not None:
+                logger.info(f"Template {template_path} changed; recompiled it")
+        with self.lock:
+            self.templates[template_path] = (compiled, mtime, now)
+        return compiled
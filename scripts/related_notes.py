@@ -0,0 +1,115 @@
+import logging
+from pathlib import Path
+import numpy as np
+from scripts.logging_config import setup_logging
+from scripts.data_models import EnrichedData
+from scripts.inference_cache import InferenceCache
+from scripts.metrics import metrics
+from scripts.model_loader import load_pipeline, model_id, model_settings
+from scripts.model_registry import model_registry
+from scripts.vector_index import VectorIndex
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+class Embedder:
+    def __init__(self, cache: InferenceCache | None = None, model_config: dict | None = None) -> None:
+        """
+        Initializes the Embedder instance.
+
+        The sentence-embedding model is loaded through the shared model registry on
+        first use. Embeddings are the mean of the model's token vectors.
+
+        :param cache: An optional InferenceCache; cached embeddings skip the model entirely.
+        :param model_config: The `models.embeddings` configuration section.
+        :return: None
+        """
+        self.model_settings = model_settings("embeddings", model_config)
+        self.model_name = model_id(self.model_settings)
+        self.cache = cache
+
+    @property
+    def extractor(self):
+        """
+        The feature-extraction pipeline, loaded on first use.
+        """
+        return model_registry.get(f"feature-extraction:{self.model_name}", self._load_pipeline)
+
+    def embed(self, text: str) -> list[float]:
+        """
+        Embeds a text; input beyond the model window is truncated.
+
+        :param text: The text to embed.
+        :return: The embedding.
+        :raises Exception: If the model fails to load or run.
+        """
+        key = InferenceCache.make_key("embed", self.model_name, None, text)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        token_vectors = self.extractor(text, truncation=True)[0]
+        embedding = np.asarray(token_vectors, dtype=np.float32).mean(axis=0).tolist()
+        if self.cache is not None:
+            self.cache.set(key, embedding)
+        return embedding
+
+    def _load_pipeline(self):
+        return load_pipeline("feature-extraction", self.model_settings)
+
+
+class RelatedNotes:
+    def __init__(self, index: VectorIndex, embedder: Embedder, top_k: int = 5) -> None:
+        """
+        Initializes the RelatedNotes instance.
+
+        Finds the notes most similar to a new note in the vault's vector index and
+        adds every written note to it, so the index never needs a rescan of the vault.
+
+        :param index: The vector index of the vault.
+        :param embedder: The Embedder that embeds note content.
+        :param top_k: The number of related notes per note.
+        :return: None
+        """
+        self.index = index
+        self.embedder = embedder
+        self.top_k = top_k
+
+    def embed(self, data: EnrichedData) -> list[float] | None:
+        """
+        Embeds the title, summary and start of a note.
+
+        :param data: The enriched data of the note.
+        :return: The embedding, or None if embedding failed.
+        """
+        try:
+            with metrics.stage("embed", file=data.source_path):
+                return self.embedder.embed(f"{Path(data.source_path).stem}\n{data.summary}\n{data.text}")
+        except Exception as e:
+            logger.error(f"Failed to embed note for file {data.source_path}: {e}")
+            return None
+
+    def find(self, embedding: list[float] | None, note_path: str | None = None) -> list[str]:
+        """
+        Finds the existing notes most similar to an embedding.
+
+        :param embedding: The embedding of the new note.
+        :param note_path: The path of the note itself, if it already exists; never returned.
+        :return: The paths of up to `top_k` related notes that still exist, most similar first.
+        """
+        if embedding is None:
+            return []
+        # Ask for a few extra results in case some notes were deleted since they were indexed.
+        matches = self.index.search(embedding, k=self.top_k * 2, exclude={note_path} if note_path else None)
+        return [path for path, _ in matches if Path(path).exists()][:self.top_k]
+
+    def add(self, note_path: str, embedding: list[float] | None) -> None:
+        """
+        Adds or replaces the embedding of a written note in the index.
+
+        :param note_path: The path to the note.
+        :param embedding: The embedding of the note.
+        """
+        if embedding is not None:
+            self.index.add(note_path, embedding)
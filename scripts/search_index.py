@@ -0,0 +1,369 @@
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import threading
+import logging
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Iterator
+from scripts.logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+DATE_PREFIX_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2})-")
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*?)\s*$", re.MULTILINE)
+ENTITY_LINE_PATTERN = re.compile(r"^\s*-\s+\*\*(.+?):\*\*\s*(.*)$", re.MULTILINE)
+WIKILINK_PATTERN = re.compile(r"\[\[([^\]|]+)(?:\|[^\]]*)?\]\]")
+CHECKBOX_PATTERN = re.compile(r"^\s*[-*]\s+\[([ xX])\]\s+(.+?)\s*$", re.MULTILINE)
+SUMMARY_HEADING_PATTERN = re.compile(r"summary|core idea|objective", re.IGNORECASE)
+# Column weights of the ranking: title, summary, entities, action items, body.
+RANK_WEIGHTS = (10.0, 5.0, 3.0, 2.0, 1.0)
+
+
+@dataclass
+class NoteRecord:
+    path: str
+    title: str
+    category: str
+    created: str
+    summary: str = ""
+    entities: dict[str, list[str]] = field(default_factory=dict)
+    # (text, done) pairs.
+    action_items: list[tuple[str, bool]] = field(default_factory=list)
+    body: str = ""
+
+
+def parse_action_item(item: str) -> tuple[str, bool]:
+    """
+    Splits a markdown checkbox marker off an action item.
+
+    :param item: The action item, with or without a leading `- [ ]` / `- [x]`.
+    :return: A tuple of (text, done).
+    """
+    match = CHECKBOX_PATTERN.match(item)
+    return (match.group(2), match.group(1) != " ") if match else (item.strip(), False)
+
+
+def parse_note(note_path: Path, vault_path: Path) -> NoteRecord:
+    """
+    Reads the indexed fields back from a markdown note.
+
+    The category is the note's directory within the vault and the date the prefix of
+    its file name. The title is the first heading, the summary the first section whose
+    heading mentions a summary (or the first section), entities the wikilinks (or the
+    comma-separated names) of `- **LABEL:** ...` lines and action items the note's
+    checkboxes.
+
+    :param note_path: The path to the note.
+    :param vault_path: The path to the vault.
+    :return: The note record.
+    """
+    content = note_path.read_text(encoding="utf-8", errors="replace")
+    if content.startswith("---"):
+        _, _, rest = content[3:].partition("\n---")
+        content = rest.lstrip("\n") if rest else content
+
+    headings = list(HEADING_PATTERN.finditer(content))
+    title = next((match.group(2) for match in headings if len(match.group(1)) == 1), note_path.stem)
+    sections = [(match.group(2), content[match.end():headings[index + 1].start() if index + 1 < len(headings)
+                                         else len(content)].strip())
+                for index, match in enumerate(headings) if len(match.group(1)) > 1]
+    summary = next((body for heading, body in sections if SUMMARY_HEADING_PATTERN.search(heading)),
+                   sections[0][1] if sections else "")
+
+    entities = {}
+    for match in ENTITY_LINE_PATTERN.finditer(content):
+        # Labels without hub pages list their entities as plain text.
+        names = (WIKILINK_PATTERN.findall(match.group(2))
+                 or [name.strip() for name in match.group(2).split(",") if name.strip()])
+        if names:
+            entities.setdefault(match.group(1), []).extend(names)
+    action_items = [(match.group(2), match.group(1) != " ") for match in CHECKBOX_PATTERN.finditer(content)]
+
+    date_match = DATE_PREFIX_PATTERN.match(note_path.name)
+    created = date_match.group(1) if date_match else date.fromtimestamp(note_path.stat().st_mtime).isoformat()
+    relative = note_path.relative_to(vault_path)
+    category = relative.parts[0] if len(relative.parts) > 1 else ""
+    return NoteRecord(path=str(note_path), title=title, category=category, created=created, summary=summary,
+                      entities=entities, action_items=action_items, body=content)
+
+
+class SearchIndex:
+    def __init__(self, path: Path) -> None:
+        """
+        Initializes the SearchIndex instance.
+
+        The index is a SQLite database with an FTS5 table over the title, summary,
+        entities, action items and body of every note, plus plain tables of entities
+        and action items for filtering. Notes are added one at a time as they are
+        written, or in bulk by `reindex`.
+
+        :param path: The path to the SQLite database file.
+        :return: None
+        """
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(
+            "CREATE TABLE IF NOT EXISTS notes (id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE, "
+            "title TEXT NOT NULL, category TEXT NOT NULL, created TEXT NOT NULL, mtime REAL NOT NULL DEFAULT 0);"
+            "CREATE INDEX IF NOT EXISTS notes_category ON notes (category, created);"
+            "CREATE INDEX IF NOT EXISTS notes_created ON notes (created);"
+            "CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5("
+            "title, summary, entities, action_items, body, tokenize='porter unicode61');"
+            "CREATE TABLE IF NOT EXISTS entities (note_id INTEGER NOT NULL, label TEXT NOT NULL, "
+            "name TEXT NOT NULL COLLATE NOCASE);"
+            "CREATE INDEX IF NOT EXISTS entities_name ON entities (name);"
+            "CREATE INDEX IF NOT EXISTS entities_note ON entities (note_id);"
+            "CREATE TABLE IF NOT EXISTS action_items (note_id INTEGER NOT NULL, text TEXT NOT NULL, "
+            "done INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS action_items_note ON action_items (note_id);"
+            "CREATE INDEX IF NOT EXISTS action_items_open ON action_items (done, note_id);"
+        )
+
+    def add(self, note: NoteRecord) -> None:
+        """
+        Adds a note to the index, replacing any previous version of it.
+
+        :param note: The note record.
+        """
+        try:
+            mtime = Path(note.path).stat().st_mtime if Path(note.path).exists() else 0.0
+            with self.lock:
+                self._upsert(note, mtime=mtime)
+                self.connection.commit()
+        except Exception as e:
+            logger.error(f"Failed to update search index for note {note.path}: {e}")
+
+    def remove(self, note_path: str) -> None:
+        """
+        Removes a note from the index.
+
+        :param note_path: The path to the note.
+        """
+        with self.lock:
+            self._delete(note_path)
+            self.connection.commit()
+
+    def search(self, query: str = "", category: str | None = None, entity: str | None = None,
+               since: str | None = None, until: str | None = None, limit: int = 20) -> list[dict]:
+        """
+        Searches the notes, best matches first.
+
+        The query uses the FTS5 syntax (words, "phrases", prefix*, AND/OR/NOT); if it
+        is not valid syntax, its words are searched as plain terms. Matches in titles
+        weigh most, then summaries, entities, action items and the body. Without a
+        query, the matching notes are listed newest first.
+
+        :param query: The full-text query.
+        :param category: Only notes of this category (the directory name in the vault).
+        :param entity: Only notes mentioning this entity.
+        :param since: Only notes created on or after this ISO date.
+        :param until: Only notes created on or before this ISO date.
+        :param limit: The maximum number of results.
+        :return: A list of results with path, title, category, created and snippet.
+        """
+        conditions, params = self._filters(category, entity, since, until)
+        if not query.strip():
+            sql = (f"SELECT path, title, category, created, '' FROM notes n "
+                   f"WHERE {' AND '.join(conditions) or '1'} ORDER BY created DESC LIMIT ?")
+            with self.lock:
+                rows = self.connection.execute(sql, params + [limit]).fetchall()
+        else:
+            sql = (f"SELECT n.path, n.title, n.category, n.created, "
+                   f"snippet(notes_fts, -1, '**', '**', '…', 16) FROM notes_fts "
+                   f"JOIN notes n ON n.id = notes_fts.rowid WHERE notes_fts MATCH ? "
+                   f"{''.join(' AND ' + condition for condition in conditions)} "
+                   f"ORDER BY bm25(notes_fts, {', '.join(map(str, RANK_WEIGHTS))}) LIMIT ?")
+            with self.lock:
+                try:
+                    rows = self.connection.execute(sql, [query] + params + [limit]).fetchall()
+                except sqlite3.OperationalError:
+                    plain_query = " ".join(f'"{word}"' for word in re.findall(r"\w+", query))
+                    if not plain_query:
+                        return []
+                    rows = self.connection.execute(sql, [plain_query] + params + [limit]).fetchall()
+        return [{"path": row[0], "title": row[1], "category": row[2], "created": row[3], "snippet": row[4]}
+                for row in rows]
+
+    def open_action_items(self, category: str | None = None, entity: str | None = None,
+                          since: str | None = None, until: str | None = None) -> list[dict]:
+        """
+        Lists the unchecked action items, newest notes first.
+
+        :param category: Only items of notes of this category.
+        :param entity: Only items of notes mentioning this entity.
+        :param since: Only items of notes created on or after this ISO date.
+        :param until: Only items of notes created on or before this ISO date.
+        :return: A list of items with path, title, created and text.
+        """
+        conditions, params = self._filters(category, entity, since, until)
+        sql = (f"SELECT n.path, n.title, n.created, a.text FROM action_items a JOIN notes n ON n.id = a.note_id "
+               f"WHERE a.done = 0{''.join(' AND ' + condition for condition in conditions)} "
+               f"ORDER BY n.created DESC, a.rowid")
+        with self.lock:
+            rows = self.connection.execute(sql, params).fetchall()
+        return [{"path": row[0], "title": row[1], "created": row[2], "text": row[3]} for row in rows]
+
+    def reindex(self, vault_path: Path, batch_size: int = 500, exclude: tuple[str, ...] = ()) -> dict:
+        """
+        Brings the index in line with the notes of an existing vault.
+
+        Notes are read one at a time while walking the vault and written in
+        transactions of `batch_size` notes. Notes whose modification time is unchanged
+        since they were indexed are skipped, and notes that no longer exist are removed.
+
+        :param vault_path: The path to the vault.
+        :param batch_size: The number of notes per transaction.
+        :param exclude: Directories, relative to the vault, whose pages are not notes, e.g. the entity hubs.
+        :return: The number of indexed, unchanged, failed and removed notes.
+        """
+        with self.lock:
+            indexed_mtimes = dict(self.connection.execute("SELECT path, mtime FROM notes"))
+        counts = {"indexed": 0, "unchanged": 0, "failed": 0, "removed": 0}
+        seen = set()
+        pending = 0
+        for note_path in self._walk(vault_path, exclude):
+            path_str = str(note_path)
+            seen.add(path_str)
+            try:
+                mtime = note_path.stat().st_mtime
+                if indexed_mtimes.get(path_str) == mtime:
+                    counts["unchanged"] += 1
+                    continue
+                note = parse_note(note_path, vault_path)
+                with self.lock:
+                    self._upsert(note, mtime=mtime)
+            except Exception as e:
+                logger.error(f"Failed to index note {note_path}: {e}")
+                counts["failed"] += 1
+                continue
+            counts["indexed"] += 1
+            pending += 1
+            if pending >= batch_size:
+                with self.lock:
+                    self.connection.commit()
+                pending = 0
+        with self.lock:
+            for path_str in set(indexed_mtimes) - seen:
+                self._delete(path_str)
+                counts["removed"] += 1
+            self.connection.commit()
+        logger.info(f"Reindexed vault {vault_path}: {counts}")
+        return counts
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+        """
+        with self.lock:
+            self.connection.close()
+
+    @staticmethod
+    def _walk(vault_path: Path, exclude: tuple[str, ...] = ()) -> Iterator[Path]:
+        # Skip hidden directories such as the vector index or Obsidian's own settings, and the excluded ones.
+        excluded = {os.path.normpath(vault_path / path) for path in exclude}
+        for directory, directory_names, file_names in os.walk(vault_path):
+            directory_names[:] = sorted(name for name in directory_names if not name.startswith(".")
+                                        and os.path.normpath(os.path.join(directory, name)) not in excluded)
+            for file_name in sorted(file_names):
+                if file_name.endswith(".md"):
+                    yield Path(directory) / file_name
+
+    def _upsert(self, note: NoteRecord, mtime: float = 0.0) -> None:
+        # Called with the lock held; the caller commits.
+        self._delete(note.path)
+        note_id = self.connection.execute(
+            "INSERT INTO notes (path, title, category, created, mtime) VALUES (?, ?, ?, ?, ?)",
+            (note.path, note.title, note.category, note.created, mtime)
+        ).lastrowid
+        entities_text = " ".join(name for names in note.entities.values() for name in names)
+        actions_text = "\n".join(text for text, _ in note.action_items)
+        self.connection.execute(
+            "INSERT INTO notes_fts (rowid, title, summary, entities, action_items, body) VALUES (?, ?, ?, ?, ?, ?)",
+            (note_id, note.title, note.summary, entities_text, actions_text, note.body)
+        )
+        self.connection.executemany("INSERT INTO entities (note_id, label, name) VALUES (?, ?, ?)",
+                                    [(note_id, label, name) for label, names in note.entities.items()
+                                     for name in dict.fromkeys(names)])
+        self.connection.executemany("INSERT INTO action_items (note_id, text, done) VALUES (?, ?, ?)",
+                                    [(note_id, text, int(done)) for text, done in note.action_items])
+
+    def _delete(self, note_path: str) -> None:
+        row = self.connection.execute("SELECT id FROM notes WHERE path = ?", (note_path,)).fetchone()
+        if row is not None:
+            for table, column in (("notes_fts", "rowid"), ("entities", "note_id"), ("action_items", "note_id"),
+                                  ("notes", "id")):
+                self.connection.execute(f"DELETE FROM {table} WHERE {column} = ?", row)
+
+    @staticmethod
+    def _filters(category: str | None, entity: str | None, since: str | None,
+                 until: str | None) -> tuple[list[str], list]:
+        conditions, params = [], []
+        if category:
+            conditions.append("n.category = ?")
+            params.append(category)
+        if entity:
+            conditions.append("n.id IN (SELECT note_id FROM entities WHERE name = ?)")
+            params.append(entity)
+        if since:
+            conditions.append("n.created >= ?")
+            params.append(since)
+        if until:
+            conditions.append("n.created <= ?")
+            params.append(until)
+        return conditions, params
+
+
+def main() -> int:
+    from scripts.ingestion import VAULT_PATH, load_config
+    from scripts.kb_integrator import slugify
+
+    parser = argparse.ArgumentParser(description="Search the knowledge base vault.")
+    parser.add_argument("--vault", type=Path, default=VAULT_PATH, help="Vault directory.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    search_parser = commands.add_parser("search", help="Ranked full-text search.")
+    search_parser.add_argument("query", nargs="?", default="", help="FTS5 query; omit to list notes.")
+    search_parser.add_argument("--limit", type=int, default=20, help="Maximum number of results.")
+    actions_parser = commands.add_parser("actions", help="List open action items.")
+    for command_parser in (search_parser, actions_parser):
+        command_parser.add_argument("--category", help="Category name, e.g. 'Meeting Notes'.")
+        command_parser.add_argument("--entity", help="Entity mentioned in the note.")
+        command_parser.add_argument("--since", help="Created on or after this date (YYYY-MM-DD).")
+        command_parser.add_argument("--until", help="Created on or before this date (YYYY-MM-DD).")
+    reindex_parser = commands.add_parser("reindex", help="Build the index from the notes in the vault.")
+    reindex_parser.add_argument("--batch-size", type=int, default=500, help="Notes per transaction.")
+    args = parser.parse_args()
+
+    config = load_config()
+    search_config = config.get("search", {})
+    index = SearchIndex(args.vault / search_config.get("path", ".search.sqlite3"))
+    if args.command == "reindex":
+        # The entity hub pages are generated from the notes and are not notes themselves.
+        entities_config = config.get("entities", {})
+        exclude = (entities_config.get("hub_dir", "entities"),) if entities_config.get("enabled", False) else ()
+        print(index.reindex(args.vault, batch_size=args.batch_size, exclude=exclude))
+        return 0
+    category = slugify(args.category) if args.category else None
+    if args.command == "search":
+        for result in index.search(args.query, category=category, entity=args.entity, since=args.since,
+                                   until=args.until, limit=args.limit):
+            print(f"{result['created']}  [{result['category']}] {result['title']}  {result['path']}")
+            if result["snippet"]:
+                print(f"    {result['snippet']}")
+    else:
+        for item in index.open_action_items(category=category, entity=args.entity, since=args.since,
+                                            until=args.until):
+            print(f"- [ ] {item['text']}  ({item['title']}, {item['created']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
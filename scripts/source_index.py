@@ -0,0 +1,166 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import zlib
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator
+from scripts.logging_config import setup_logging
+from scripts.inference_cache import content_hash
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+_BLANK_LINES_PATTERN = re.compile(r"\n\s*\n")
+# Blocks longer than this are hashed in parts that end at anchor lines (about one line in
+# _ANCHOR_EVERY, chosen by the line's content). A block that a streaming converter cut in two
+# then only differs in the parts around the cut.
+_MAX_UNIT_CHARS = 8192
+_ANCHOR_EVERY = 64
+
+
+def file_hash(file_path: str) -> str:
+    """
+    Computes the SHA-256 hash of a file's bytes.
+
+    :param file_path: The path to the file.
+    :return: The hexadecimal digest of the file.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as source_file:
+        for block in iter(lambda: source_file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class SourceRecord:
+    name: str
+    file_hash: str
+    element_hashes: list[str] = field(default_factory=list)
+    note_path: str = ""
+    category: str = "uncategorized"
+
+    def similarity(self, element_hashes: list[str]) -> float:
+        """
+        Returns the share of elements a new version has in common with this one.
+
+        :param element_hashes: The element hashes of the new version.
+        :return: The number of shared elements over the size of the larger version, between 0 and 1.
+        """
+        if not self.element_hashes or not element_hashes:
+            return 0.0
+        shared = len(set(self.element_hashes) & set(element_hashes))
+        return shared / max(len(set(self.element_hashes)), len(set(element_hashes)))
+
+
+class SourceIndex:
+    def __init__(self, path: Path) -> None:
+        """
+        Initializes the SourceIndex instance.
+
+        The index is a SQLite table of every ingested source, keyed by its path
+        relative to the inbox (see `IngestionService`), in the `name` column,
+        with the hash of its bytes, the hashes of its text elements, its category and
+        the note it was written to. It lets a re-dropped file be recognized as unchanged
+        or as a revision of an existing note.
+
+        :param path: The path to the SQLite database file.
+        :return: None
+        """
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS sources ("
+            "name TEXT PRIMARY KEY, file_hash TEXT NOT NULL, element_hashes TEXT NOT NULL, "
+            "note_path TEXT NOT NULL, category TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def element_hashes(elements: Iterable[str]) -> list[str]:
+        """
+        Hashes the text elements of a document.
+
+        Elements are split at blank lines, and long blocks into content-defined parts,
+        before they are hashed. The hashes therefore only depend on the text, not on
+        how it was read: the elements of a streaming converter and the converted text
+        in one piece hash alike, so a source stays recognizable when it grows past
+        the streaming threshold.
+
+        :param elements: The elements, e.g. as returned by `split_elements` or a streaming converter.
+        :return: The content hash of every part, in document order.
+        """
+        hashes = []
+        for element in elements:
+            for block in _BLANK_LINES_PATTERN.split(element):
+                hashes.extend(content_hash(unit) for unit in _hash_units(block.strip()) if unit)
+        return hashes
+
+    def get(self, name: str) -> SourceRecord | None:
+        """
+        Looks up the last ingested version of a source.
+
+        :param name: The key of the source, i.e. its path relative to the inbox.
+        :return: The source record, or None if the source was never ingested.
+        """
+        try:
+            with self.lock:
+                row = self.connection.execute(
+                    "SELECT name, file_hash, element_hashes, note_path, category FROM sources WHERE name = ?",
+                    (name,)
+                ).fetchone()
+        except Exception as e:
+            logger.error(f"Failed to read from source index: {e}")
+            return None
+        if row is None:
+            return None
+        return SourceRecord(name=row[0], file_hash=row[1], element_hashes=json.loads(row[2]),
+                            note_path=row[3], category=row[4])
+
+    def record(self, source: SourceRecord) -> None:
+        """
+        Stores the latest ingested version of a source.
+
+        :param source: The source record.
+        """
+        try:
+            with self.lock:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO sources (name, file_hash, element_hashes, note_path, category, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (source.name, source.file_hash, json.dumps(source.element_hashes), source.note_path,
+                     source.category, time.time())
+                )
+                self.connection.commit()
+        except Exception as e:
+            logger.error(f"Failed to write to source index: {e}")
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+        """
+        with self.lock:
+            self.connection.close()
+
+
+def _hash_units(block: str) -> Iterator[str]:
+    if len(block) <= _MAX_UNIT_CHARS:
+        yield block
+        return
+    lines = []
+    for line in block.split("\n"):
+        lines.append(line)
+        if zlib.crc32(line.encode("utf-8", "surrogatepass")) % _ANCHOR_EVERY == 0:
+            yield "\n".join(lines).strip()
+            lines = []
+    if lines:
+        yield "\n".join(lines).strip()
@@ -0,0 +1,179 @@
+import os
+import re
+import tempfile
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator, TextIO
+from scripts.logging_config import setup_logging
+from scripts.source_index import SourceIndex
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+SPOOL_PREFIX = "pkdm-spool-"
+_BLANK_LINES_PATTERN = re.compile(r"\n\s*\n")
+
+
+@dataclass
+class SpooledText:
+    path: str
+    # A bounded excerpt of the text, sampled evenly across the document.
+    sample: str
+    characters: int = 0
+    words: int = 0
+    element_hashes: list[str] = field(default_factory=list)
+
+    def elements(self) -> Iterator[str]:
+        """
+        Reads the elements of the text back from disk, one at a time.
+
+        :return: An iterator over the elements, in document order.
+        """
+        return iter_spooled_elements(self.path)
+
+    def remove(self) -> None:
+        """
+        Deletes the spool file.
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def spool_elements(elements: Iterable[str], directory: Path | None = None,
+                   sample_chars: int = 1_000_000, windows: int = 16) -> SpooledText:
+    """
+    Writes the elements of a document to a temporary file as they are produced.
+
+    The file holds the elements joined by blank lines, i.e. the same text a converter
+    returns, so only one element is in memory at a time. Blank lines inside an
+    element are collapsed so the elements can be read back one by one. The element
+    hashes (see `SourceIndex.element_hashes`, so they match those of the same text
+    read in memory) and word count are computed on the way; the sample is taken in a
+    second pass over the file, from `windows` evenly spaced positions of the document.
+
+    :param elements: The elements of the document, in order.
+    :param directory: The directory of the spool file; the system temporary directory if None.
+    :param sample_chars: The maximum size of the sample in characters.
+    :param windows: The number of positions the sample is taken from.
+    :return: The spooled text.
+    """
+    if directory is not None:
+        Path(directory).mkdir(parents=True, exist_ok=True)
+    spool_file = tempfile.NamedTemporaryFile("w", encoding="utf-8", prefix=f"{SPOOL_PREFIX}{os.getpid()}-",
+                                             suffix=".txt", dir=directory, delete=False)
+    spooled = SpooledText(path=spool_file.name, sample="")
+    try:
+        with spool_file:
+            for element in elements:
+                # Hashed before blank lines are collapsed, like the text of a document read in memory.
+                element_hashes = SourceIndex.element_hashes([element])
+                element = _BLANK_LINES_PATTERN.sub("\n", element.strip())
+                if not element:
+                    continue
+                if spooled.characters:
+                    spool_file.write("\n\n")
+                    spooled.characters += 2
+                spool_file.write(element)
+                spooled.characters += len(element)
+                spooled.words += len(element.split())
+                spooled.element_hashes.extend(element_hashes)
+        spooled.sample = _sample(spooled, sample_chars, windows)
+    except BaseException:
+        spooled.remove()
+        raise
+    return spooled
+
+
+def iter_spooled_elements(path: str) -> Iterator[str]:
+    """
+    Reads the elements of a spooled text, one at a time.
+
+    :param path: The path to the spool file.
+    :return: An iterator over the elements, in document order.
+    """
+    with open(path, "r", encoding="utf-8") as spool_file:
+        lines = []
+        for line in spool_file:
+            if line.strip():
+                lines.append(line)
+            elif lines:
+                yield "".join(lines).rstrip("\n")
+                lines = []
+        if lines:
+            yield "".join(lines).rstrip("\n")
+
+
+def copy_spooled_text(path: str, target: TextIO, max_chars: int | None = None,
+                      chunk_size: int = 1 << 20) -> bool:
+    """
+    Copies a spooled text into an open file in chunks.
+
+    :param path: The path to the spool file.
+    :param target: The file the text is written to.
+    :param max_chars: The maximum number of characters copied; all of them if None.
+    :param chunk_size: The number of characters copied at a time.
+    :return: True if the text was cut at `max_chars`, otherwise False.
+    """
+    remaining = max_chars
+    with open(path, "r", encoding="utf-8") as spool_file:
+        while True:
+            chunk = spool_file.read(chunk_size if remaining is None else min(chunk_size, remaining + 1))
+            if not chunk:
+                return False
+            if remaining is not None and len(chunk) > remaining:
+                target.write(chunk[:remaining])
+                return True
+            target.write(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+
+
+def _sample(spooled: SpooledText, sample_chars: int, windows: int) -> str:
+    if spooled.characters <= sample_chars:
+        return Path(spooled.path).read_text(encoding="utf-8")
+    window_chars = max(1, sample_chars // windows)
+    taken = [0] * windows
+    parts = []
+    offset = 0
+    for element in spooled.elements():
+        window = min(windows - 1, offset * windows // spooled.characters)
+        if taken[window] < window_chars:
+            part = element[:window_chars - taken[window]]
+            taken[window] += len(part)
+            parts.append(part)
+        offset += len(element) + 2
+    return "\n\n".join(parts)
+
+
+def clear_spool(directory: Path) -> None:
+    """
+    Deletes the spool files a previous run left behind.
+
+    Only the files of processes that are no longer running are deleted. Files of
+    running processes, this one included, are kept, so worker processes sharing the
+    spool directory can start at any time.
+
+    :param directory: The spool directory.
+    """
+    for path in Path(directory).glob(f"{SPOOL_PREFIX}*"):
+        owner = path.name[len(SPOOL_PREFIX):].split("-", 1)[0]
+        if owner.isdigit() and _is_running(int(owner)):
+            continue
+        try:
+            path.unlink()
+        except OSError as e:
+            logger.warning(f"Could not delete stale spool file {path}: {e}")
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # The process exists but belongs to someone else, or the check is unsupported.
+        return True
+    return True
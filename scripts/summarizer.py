@@ -1,35 +1,215 @@
 from scripts.logging_config import setup_logging
 import logging
-from transformers import pipeline
+from scripts.inference_cache import InferenceCache, content_hash
+from scripts.file_handler import split_elements
+from scripts.metrics import metrics
+from scripts.model_loader import load_pipeline, model_id, model_settings
+from scripts.model_registry import model_registry
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
 
 class Summarizer:
-    def __init__(self) -> None:
+    def __init__(self, cache: InferenceCache | None = None, config: dict | None = None,
+                 model_config: dict | None = None) -> None:
         """
-        Initializes the Summarizer, loading the summarization model.
+        Initializes the Summarizer.
+
+        The summarization model is loaded through the shared model registry the first
+        time a text long enough to need it is summarized.
+
+        :param cache: An optional InferenceCache; cached summaries skip the model entirely.
+        :param config: The `summarizer` configuration section controlling chunked
+            (map-reduce) summarization of documents longer than the model window.
+        :param model_config: The `models.summarizer` configuration section selecting the
+            model, dtype, threads, backend and quantization.
+        """
+        config = config or {}
+        self.model_settings = model_settings("summarizer", model_config)
+        self.model_name = model_id(self.model_settings)
+        self.generation_params = {"max_length": 150, "min_length": 40, "do_sample": False}
+        self.chunk_generation_params = {"max_length": config.get("chunk_max_length", 120),
+                                        "min_length": config.get("chunk_min_length", 30),
+                                        "do_sample": False}
+        self.chunked = config.get("chunked", True)
+        self.max_chunks = config.get("max_chunks", 32)
+        self.max_total_tokens = config.get("max_total_tokens", 32768)
+        self.max_reduce_rounds = config.get("max_reduce_rounds", 3)
+        self.chunk_token_limit = config.get("chunk_tokens", 1024)
+        self.min_words = config.get("min_words", 60)
+        self.cache = cache
+
+    @property
+    def summarizer(self):
+        """
+        The summarization pipeline, loaded on first use.
+        """
+        return model_registry.get(f"summarization:{self.model_name}", self._load_pipeline)
+
+    @property
+    def tokenizer(self):
+        """
+        The tokenizer of the summarization pipeline.
         """
-        try:
-            self.summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-            logger.info("Summarization model loaded successfully.")
-        except Exception as e:
-            logger.error(f"Failed to load summarization model: {e}")
-            raise  # Re-raise the exception to halt execution if model loading fails
+        return self.summarizer.tokenizer
+
+    @property
+    def chunk_tokens(self) -> int:
+        """
+        The number of tokens per chunk.
+        """
+        # Leave room for the special tokens the tokenizer adds around every input.
+        tokenizer = self.tokenizer
+        return min(tokenizer.model_max_length, self.chunk_token_limit) - tokenizer.num_special_tokens_to_add()
 
     def summarize(self, text: str) -> str:
         """
         Generates a summary for the given text.
 
+        Texts longer than the model window are summarized chunk by chunk (see `summarize_batch`).
+
         :param text: The text to summarize.
         :return: The summary string, or an empty string if summarization fails.
         """
-        try:
-            # Added length constraints for more predictable summaries
-            summary_result = self.summarizer(text, max_length=150, min_length=40, do_sample=False)
-            summary_text = summary_result[0]['summary_text']
-            return summary_text
-        except Exception as e:
-            logger.error(f"Failed to summarize text: {e}")
-            return ""
+        return self.summarize_batch([text], batch_size=1)[0]
+
+    def summarize_batch(self, texts: list[str], batch_size: int = 4) -> list[str]:
+        """
+        Generates summaries for a list of texts with batched generation.
+
+        Texts shorter than `min_words` words are their own summary and never reach
+        (or load) the model.
+
+        With chunked summarization enabled, every text is split on its element
+        boundaries (the blank lines between the elements produced by the converter)
+        and the elements are packed into chunks that fit the model window. Texts that
+        fit in one chunk are summarized directly. Longer texts are summarized in a map
+        pass over all their chunks, followed by reduce passes over the joined chunk
+        summaries until a single final summary is left. The number of chunks per text
+        is capped by `max_chunks` and `max_total_tokens`; over-long texts are sampled
+        evenly across the whole document rather than cut after the first pages.
+
+        Chunks from all texts share the same batched forward passes, and results found
+        in the cache are not sent to the model. A failed text gets an empty summary
+        without affecting the others.
+
+        :param texts: The texts to summarize.
+        :param batch_size: The number of texts per forward pass.
+        :return: A list of summary strings in the order of `texts`; failed entries are empty strings.
+        :raises Exception: If the model fails to load.
+        """
+        summaries = [" ".join(text.split()) for text in texts]
+        long_texts = {index: text for index, text in enumerate(texts) if len(text.split()) >= self.min_words}
+        if long_texts:
+            for index, summary in zip(long_texts, self._summarize(list(long_texts.values()), batch_size)):
+                summaries[index] = summary
+        return summaries
+
+    def _summarize(self, texts: list[str], batch_size: int) -> list[str]:
+        if not self.chunked:
+            return self._generate(texts, self.generation_params, batch_size)
+
+        summaries = [""] * len(texts)
+        # Pieces still to be reduced, per text index.
+        pieces = {index: self._chunk(text) for index, text in enumerate(texts)}
+        for _ in range(self.max_reduce_rounds + 1):
+            final_inputs = {index: chunks[0] for index, chunks in pieces.items() if len(chunks) == 1}
+            for index, summary in zip(final_inputs, self._generate(list(final_inputs.values()),
+                                                                   self.generation_params, batch_size)):
+                summaries[index] = summary
+            pieces = {index: chunks for index, chunks in pieces.items() if len(chunks) > 1}
+            if not pieces:
+                return summaries
+
+            # Map pass: summarize every chunk of every remaining text in shared batches.
+            flat_chunks = [(index, chunk) for index, chunks in pieces.items() for chunk in chunks]
+            chunk_summaries = self._generate([chunk for _, chunk in flat_chunks], self.chunk_generation_params,
+                                             batch_size)
+            joined = {index: [] for index in pieces}
+            for (index, _), summary in zip(flat_chunks, chunk_summaries):
+                if summary:
+                    joined[index].append(summary)
+            # Reduce pass: the chunk summaries become the elements of the next round.
+            pieces = {index: self._chunk("\n\n".join(parts)) for index, parts in joined.items() if parts}
+
+        # Still too long after the last reduce round: summarize the leading chunk only.
+        for index, chunks in pieces.items():
+            logger.warning("Summary did not converge within the reduce rounds, using the first chunk")
+            summaries[index] = self._generate([chunks[0]], self.generation_params, batch_size)[0]
+        return summaries
+
+    def _load_pipeline(self):
+        return load_pipeline("summarization", self.model_settings)
+
+    def _chunk(self, text: str) -> list[str]:
+        elements = split_elements(text)
+        if not elements:
+            return [text]
+        tokenizer = self.tokenizer
+        chunk_tokens = self.chunk_tokens
+        token_ids = tokenizer(elements, add_special_tokens=False)["input_ids"]
+        metrics.increment("summarizer_input_tokens", sum(len(ids) for ids in token_ids))
+
+        # Pack whole elements greedily; elements longer than a chunk are split on token windows.
+        # Past half a chunk, anchor elements (picked by their content hash) also start a new
+        # chunk, so an edit only moves the boundaries up to the next anchor and the chunk
+        # summaries of the rest of a revised document are found in the cache.
+        chunks = []
+        current = []
+        current_tokens = 0
+        for element, ids in zip(elements, token_ids):
+            if len(ids) > chunk_tokens:
+                if current:
+                    chunks.append("\n\n".join(current))
+                    current, current_tokens = [], 0
+                for start in range(0, len(ids), chunk_tokens):
+                    chunks.append(tokenizer.decode(ids[start:start + chunk_tokens]))
+                continue
+            if current and (current_tokens + len(ids) > chunk_tokens
+                            or current_tokens >= chunk_tokens // 2 and self._is_anchor(element)):
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(element)
+            current_tokens += len(ids)
+        if current:
+            chunks.append("\n\n".join(current))
+
+        max_chunks = max(1, min(self.max_chunks, self.max_total_tokens // chunk_tokens))
+        if len(chunks) > max_chunks:
+            # Sample evenly across the document so the summary covers all of it.
+            step = len(chunks) / max_chunks
+            chunks = [chunks[int(position * step)] for position in range(max_chunks)]
+        return chunks
+
+    @staticmethod
+    def _is_anchor(element: str) -> bool:
+        # About one element in four is an anchor.
+        return int(content_hash(element)[:2], 16) % 4 == 0
+
+    def _generate(self, texts: list[str], params: dict, batch_size: int) -> list[str]:
+        if not texts:
+            return []
+        keys = [self._cache_key(text, params) for text in texts]
+        summaries = self.cache.get_many(keys) if self.cache is not None else {}
+        pending = {key: text for key, text in zip(keys, texts) if key not in summaries}
+        if pending:
+            summarizer = self.summarizer
+            try:
+                summary_results = summarizer(list(pending.values()), batch_size=batch_size,
+                                             truncation=self.chunked, **params)
+                computed = {key: result['summary_text'] for key, result in zip(pending, summary_results)}
+                if self.cache is not None:
+                    self.cache.set_many(computed)
+                summaries.update(computed)
+            except Exception as e:
+                if len(pending) > 1:
+                    logger.error(f"Failed to summarize batch of {len(pending)} texts, retrying one by one: {e}")
+                    summaries.update((key, self._generate([text], params, 1)[0]) for key, text in pending.items())
+                else:
+                    logger.error(f"Failed to summarize text: {e}")
+                    summaries.update(dict.fromkeys(pending, ""))
+        return [summaries[key] for key in keys]
+
+    def _cache_key(self, text: str, params: dict) -> str:
+        return InferenceCache.make_key("summarize", self.model_name, params, text)
@@ -0,0 +1,217 @@
+import json
+import os
+import threading
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
+from scripts.logging_config import setup_logging
+
+try:
+    import fcntl
+except ImportError:  # Windows: the index is only shared by the threads of one process.
+    fcntl = None
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+class VectorIndex:
+    def __init__(self, directory: Path, exact_max: int = 20_000, nprobe: int = 8) -> None:
+        """
+        Initializes the VectorIndex instance.
+
+        Unit-length embeddings are stored row by row in a memory-mapped float32 file,
+        with an append-only file of keys mapping each row to its note. Adding a vector
+        writes one row, so the index is updated incrementally as notes are written.
+
+        Up to `exact_max` vectors, a search is an exact top-k over all rows. Above it,
+        the rows are clustered with k-means into an inverted file (IVF): every row is
+        assigned to its nearest centroid and a search only scans the rows of the
+        `nprobe` centroids nearest to the query. The clustering is retrained whenever
+        the index has doubled since the last training.
+
+        Several processes may share the index: every operation holds a lock on the
+        index directory and first picks up the keys, rows and clustering the other
+        processes added since.
+
+        :param directory: The directory holding the index files.
+        :param exact_max: The number of vectors up to which searches are exact.
+        :param nprobe: The number of IVF lists scanned per search.
+        :return: None
+        """
+        self.directory = Path(directory)
+        self.exact_max = exact_max
+        self.nprobe = nprobe
+        self.lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.meta_path = self.directory / "meta.json"
+        self.keys_path = self.directory / "keys.txt"
+        self.vectors_path = self.directory / "vectors.f32"
+        self.assignments_path = self.directory / "assignments.i32"
+        self.centroids_path = self.directory / "centroids.npy"
+        self.lock_path = self.directory / "lock"
+
+        self.dim: int | None = None
+        self.trained_count = 0
+        self.meta_version = None
+        self.keys: list[str] = []
+        self.keys_size = 0
+        self.rows: dict[str, int] = {}
+        self.capacity = 0
+        self.vectors: np.memmap | None = None
+        self.assignments: np.memmap | None = None
+        self.centroids: np.ndarray | None = None
+        with self._locked(shared=True):
+            self._refresh()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: str, vector) -> None:
+        """
+        Adds or replaces the vector of a key.
+
+        :param key: The key of the vector, e.g. the path to a note.
+        :param vector: The embedding; it is normalized to unit length.
+        """
+        vector = self._normalize(vector)
+        with self._locked(shared=False):
+            self._refresh()
+            if self.dim is None:
+                self.dim = len(vector)
+                self._write_meta()
+                self._open(1024)
+            row = self.rows.get(key)
+            if row is None:
+                row = len(self.keys)
+                if row >= self.capacity:
+                    self._open(self.capacity * 2)
+            self.vectors[row] = vector
+            self.vectors.flush()
+            if self.centroids is not None:
+                self.assignments[row] = int(np.argmax(self.centroids @ vector))
+                self.assignments.flush()
+            if key not in self.rows:
+                # The key is appended last, so a row only counts once its vector is on disk.
+                with open(self.keys_path, "a", encoding="utf-8") as keys_file:
+                    keys_file.write(key + "\n")
+                self.keys_size = os.path.getsize(self.keys_path)
+                self.keys.append(key)
+                self.rows[key] = row
+            if len(self.keys) > self.exact_max and len(self.keys) >= 2 * self.trained_count:
+                self._train()
+
+    def search(self, vector, k: int = 5, exclude: set[str] | None = None) -> list[tuple[str, float]]:
+        """
+        Finds the keys whose vectors are most similar to a query vector.
+
+        :param vector: The query embedding.
+        :param k: The number of results.
+        :param exclude: Keys that must not be returned.
+        :return: Up to `k` (key, cosine similarity) tuples, most similar first.
+        """
+        exclude = exclude or set()
+        query = self._normalize(vector)
+        with self._locked(shared=True):
+            self._refresh()
+            count = len(self.keys)
+            if not count or self.dim != len(query):
+                return []
+            if self.centroids is not None and count > self.exact_max:
+                probes = np.argsort(self.centroids @ query)[-self.nprobe:]
+                candidates = np.flatnonzero(np.isin(self.assignments[:count], probes))
+            else:
+                candidates = np.arange(count)
+            scores = self.vectors[candidates] @ query
+            wanted = min(len(candidates), k + len(exclude))
+            if not wanted:
+                return []
+            top = np.argpartition(-scores, wanted - 1)[:wanted]
+            top = top[np.argsort(-scores[top])]
+            results = [(self.keys[candidates[index]], float(scores[index])) for index in top]
+        return [(key, score) for key, score in results if key not in exclude][:k]
+
+    @contextmanager
+    def _locked(self, shared: bool):
+        with self.lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self) -> None:
+        # Called with the locks held: catch up with what other processes wrote.
+        meta_version = self.meta_path.stat().st_mtime_ns if self.meta_path.exists() else None
+        if meta_version != self.meta_version:
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            self.dim = meta.get("dim")
+            self.trained_count = meta.get("trained_count", 0)
+            self.centroids = np.load(self.centroids_path) if self.centroids_path.exists() else None
+            self.meta_version = meta_version
+        keys_size = os.path.getsize(self.keys_path) if self.keys_path.exists() else 0
+        if keys_size > self.keys_size:
+            with open(self.keys_path, "rb") as keys_file:
+                keys_file.seek(self.keys_size)
+                for key in keys_file.read().decode("utf-8").splitlines():
+                    if key not in self.rows:
+                        self.rows[key] = len(self.keys)
+                        self.keys.append(key)
+            self.keys_size = keys_size
+        if self.dim is not None:
+            stored = os.path.getsize(self.vectors_path) // (self.dim * 4) if self.vectors_path.exists() else 0
+            if self.vectors is None or stored > self.capacity:
+                self._open(max(stored, len(self.keys), 1024))
+
+    def _open(self, capacity: int) -> None:
+        # Grow the files in place; the memory maps are reopened over the larger files.
+        for path, dtype, width in ((self.vectors_path, np.float32, self.dim), (self.assignments_path, np.int32, 1)):
+            size = capacity * width * np.dtype(dtype).itemsize
+            with open(path, "ab") as index_file:
+                if os.path.getsize(path) < size:
+                    index_file.truncate(size)
+        self.capacity = capacity
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self.assignments = np.memmap(self.assignments_path, dtype=np.int32, mode="r+", shape=(capacity,))
+
+    def _train(self, iterations: int = 10) -> None:
+        count = len(self.keys)
+        lists = int(np.sqrt(count))
+        rng = np.random.default_rng(0)
+        sample = self.vectors[rng.choice(count, size=min(count, lists * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=lists, replace=False)].copy()
+        for _ in range(iterations):
+            # Spherical k-means: assign by cosine similarity, then renormalize the means.
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for index in range(lists):
+                members = sample[labels == index]
+                if len(members):
+                    centroids[index] = members.mean(axis=0)
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+        for start in range(0, count, 8192):
+            block = self.vectors[start:min(start + 8192, count)]
+            self.assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        self.assignments.flush()
+        self.centroids = centroids
+        np.save(self.centroids_path, centroids)
+        self.trained_count = count
+        self._write_meta()
+        logger.info(f"Trained vector index with {lists} lists over {count} vectors")
+
+    def _write_meta(self) -> None:
+        temporary_path = self.meta_path.with_suffix(".tmp")
+        temporary_path.write_text(json.dumps({"dim": self.dim, "trained_count": self.trained_count}),
+                                  encoding="utf-8")
+        temporary_path.replace(self.meta_path)
+        self.meta_version = self.meta_path.stat().st_mtime_ns
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
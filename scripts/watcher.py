@@ -1,78 +1,228 @@
+import fnmatch
+import os
+import threading
 import time
+from pathlib import Path
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
-from logging_config import setup_logging
+from scripts.logging_config import setup_logging
+from scripts.ingestion import IngestionService, PROJECT_ROOT, load_config
+from scripts.ingestion_worker import IngestionWorker
+from scripts.worker_pool import PreforkWorkerPool
+from scripts.metrics import start_metrics_server
 import logging
-import subprocess
-import sys
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
+# Hidden files and the temporary files of editors, browsers and copy tools.
+DEFAULT_IGNORE_PATTERNS = [".*", "~$*", "*~", "*.tmp", "*.part", "*.partial", "*.crdownload", "*.download", "*.swp"]
+
 
 class Watcher(FileSystemEventHandler):
+    def __init__(self, worker: IngestionWorker, root: str, ignore_patterns: list[str] | None = None,
+                 settle_seconds: float = 2.0) -> None:
+        """
+        Initializes the Watcher instance.
+
+        Created, modified and moved-in files are not handed to the worker right away:
+        they are tracked until their size and modification time have not changed for
+        `settle_seconds`, so files that are still being copied are never processed
+        half-written. Repeated events for the same file only restart its timer.
+
+        :param worker: The IngestionWorker that new files are handed to.
+        :param root: The watched directory.
+        :param ignore_patterns: Glob patterns of file and directory names that are never processed.
+        :param settle_seconds: How long a file must stay unchanged before it is processed.
+        :return: None
+        """
+        super().__init__()
+        self.worker = worker
+        self.root = Path(root)
+        self.ignore_patterns = DEFAULT_IGNORE_PATTERNS if ignore_patterns is None else ignore_patterns
+        self.settle_seconds = settle_seconds
+        # Path -> (time of the last change, (size, mtime) at that time).
+        self.pending: dict[str, tuple[float, tuple[int, int] | None]] = {}
+        self.lock = threading.Lock()
+
     def on_created(self, event):
         """
         Called when a file or directory is created within the directory that is being watched.
-        Logs a message to the console indicating that a new file has been detected.
+
         :param event: A FileSystemEvent object that contains information about the file that was created.
         """
-        if event.is_directory:
+        if not event.is_directory:
+            self.track(self._event_path(event.src_path))
+
+    def on_modified(self, event):
+        """
+        Called when a file within the watched directory is written to.
+
+        :param event: A FileSystemEvent object that contains information about the modified file.
+        """
+        if not event.is_directory:
+            self.track(self._event_path(event.src_path))
+
+    def on_moved(self, event):
+        """
+        Called when a file is renamed or moved; tools that write to a temporary name
+        and rename it when done are picked up under the final name.
+
+        :param event: A FileSystemMovedEvent object with the source and destination paths.
+        """
+        if not event.is_directory:
+            self.track(self._event_path(event.dest_path))
+
+    def track(self, path: str) -> None:
+        """
+        Starts or restarts the settle timer of a file, unless the file is ignored.
+
+        :param path: The path to the file.
+        """
+        if self.is_ignored(path):
             return
+        with self.lock:
+            if path not in self.pending:
+                logging.info(f"New file detected: {path}")
+            last_stat = self.pending.get(path, (0.0, None))[1]
+            self.pending[path] = (time.monotonic(), last_stat)
 
-        src_path_str: str
-        if isinstance(event.src_path, str):
-            src_path_str = event.src_path
-        else:
-            # event.src_path may be bytes or a memoryview (e.g. from some backends); convert to bytes then decode.
+    def scan(self, recursive: bool = True) -> int:
+        """
+        Tracks the files already in the watched directory, e.g. those that arrived
+        while the watcher was not running.
+
+        :param recursive: Whether to include subdirectories.
+        :return: The number of files found.
+        """
+        count = 0
+        for directory, directory_names, file_names in os.walk(self.root):
+            directory_names[:] = sorted(name for name in directory_names
+                                        if recursive and not self.is_ignored(os.path.join(directory, name)))
+            for file_name in sorted(file_names):
+                path = os.path.join(directory, file_name)
+                if not self.is_ignored(path):
+                    self.track(path)
+                    count += 1
+        if count:
+            logging.info(f"Found {count} file(s) waiting in {self.root}")
+        return count
+
+    def poll(self) -> int:
+        """
+        Hands the files whose size and modification time have settled to the worker.
+
+        :return: The number of files handed to the worker.
+        """
+        now = time.monotonic()
+        with self.lock:
+            pending = list(self.pending.items())
+        ready = []
+        for path, (changed, last_stat) in pending:
             try:
-                src_bytes = bytes(event.src_path)
-            except TypeError:
-                # Fallback to string representation if conversion to bytes is not supported.
-                src_path_str = str(event.src_path)
-            else:
-                src_path_str = src_bytes.decode("utf-8", "surrogateescape")
+                stat = os.stat(path)
+            except FileNotFoundError:
+                with self.lock:
+                    self.pending.pop(path, None)
+                continue
+            current = (stat.st_size, stat.st_mtime_ns)
+            with self.lock:
+                if self.pending.get(path, (None,))[0] != changed:
+                    # A new event arrived in the meantime; check again on the next poll.
+                    continue
+                if current != last_stat:
+                    self.pending[path] = (now, current)
+                elif now - changed >= self.settle_seconds:
+                    del self.pending[path]
+                    ready.append((path, stat.st_size))
+        for path, size in ready:
+            self.worker.submit(path, priority=size)
+        return len(ready)
+
+    def is_ignored(self, path: str) -> bool:
+        """
+        Tells whether a path or one of its directories within the watched directory
+        matches an ignore pattern.
 
-        logging.info(f"New file detected: {event.src_path}")
-        process_file(src_path_str)
+        :param path: The path to check.
+        :return: True if the path is ignored.
+        """
+        try:
+            parts = Path(path).relative_to(self.root).parts
+        except ValueError:
+            parts = (Path(path).name,)
+        return any(fnmatch.fnmatch(part, pattern) for part in parts for pattern in self.ignore_patterns)
+
+    @staticmethod
+    def _event_path(path) -> str:
+        if isinstance(path, str):
+            return path
+        # event.src_path may be bytes or a memoryview (e.g. from some backends); convert to bytes then decode.
+        try:
+            src_bytes = bytes(path)
+        except TypeError:
+            # Fallback to string representation if conversion to bytes is not supported.
+            return str(path)
+        return src_bytes.decode("utf-8", "surrogateescape")
 
 
-def start_watching(path: str):
+def start_watching(path: str, worker: IngestionWorker, recursive: bool = True,
+                   ignore_patterns: list[str] | None = None, settle_seconds: float = 2.0,
+                   poll_seconds: float = 0.5):
     """
     Start watching the given directory for any changes.
 
+    Files already in the directory are picked up first, then new files as they
+    appear and settle.
+
     :param path: The path to the directory that should be watched for changes.
+    :param worker: The IngestionWorker that processes the detected files.
+    :param recursive: Whether to watch subdirectories as well.
+    :param ignore_patterns: Glob patterns of file and directory names that are never processed.
+    :param settle_seconds: How long a file must stay unchanged before it is processed.
+    :param poll_seconds: How often the settle timers of the detected files are checked.
     """
-    event_hander = Watcher()
+    event_hander = Watcher(worker, root=path, ignore_patterns=ignore_patterns, settle_seconds=settle_seconds)
     observer = Observer()
-    observer.schedule(event_hander, path=path, recursive=False)
+    observer.schedule(event_hander, path=path, recursive=recursive)
     observer.start()
+    # Scan after the observer is running, so no file falls between the scan and the first event.
+    event_hander.scan(recursive=recursive)
 
     logging.info(f"Started watching directory {path}")
 
     try:
         while True:
-            time.sleep(1)
+            time.sleep(poll_seconds)
+            event_hander.poll()
     except KeyboardInterrupt:
         logging.info(f"Stopped watching directory {path}")
         observer.stop()
         observer.join()
+        worker.stop()
 
 
-def process_file(file_path: str):
-    """
-    Process the given file using the main.py script.
-
-    :param file_path: The path to the file that should be processed.
-    :raises subprocess.CalledProcessError: If the file could not be processed using the main.py script.
-    """
-    try:
-        subprocess.run([sys.executable, "../main.py", file_path], check=True)
-        logging.info(f"Processed file successfully: {file_path}")
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error processing file {file_path}: {e}")
+if __name__ == "__main__":
+    # Models are loaded once here and shared by every file the watcher picks up.
+    config = load_config()
+    daemon_config = config.get("daemon", {})
+    batch_size = config.get("batch", {}).get("documents", 1)
+    processes = daemon_config.get("processes", 1)
+    if processes is None or processes > 1:
+        ingestion_worker = PreforkWorkerPool(config, processes=processes, batch_size=batch_size,
+                                             torch_threads=daemon_config.get("torch_threads"))
+    else:
+        service = IngestionService(config=config)
+        ingestion_worker = IngestionWorker(service, max_workers=daemon_config.get("workers", 1),
+                                           batch_size=batch_size)
+    ingestion_worker.start()
 
+    metrics_port = config.get("metrics", {}).get("port")
+    if metrics_port:
+        start_metrics_server(metrics_port)
 
-if __name__ == "__main__":
-    watch_path = "../inbox"
-    start_watching(watch_path)
+    watch_path = str(PROJECT_ROOT / daemon_config.get("inbox", "inbox"))
+    Path(watch_path).mkdir(parents=True, exist_ok=True)
+    start_watching(watch_path, ingestion_worker, recursive=daemon_config.get("recursive", True),
+                   ignore_patterns=daemon_config.get("ignore"),
+                   settle_seconds=daemon_config.get("settle_seconds", 2.0))
@@ -1,18 +1,91 @@
+import re
+from collections import Counter
+
+
+def _build_trie_pattern(keywords: list[str]) -> str:
+    """
+    Builds a regular expression that matches any of the given keywords.
+
+    The keywords are merged into a prefix trie first, so the resulting pattern
+    shares common prefixes ("def", "define", "deferred" -> "def(?:erred|ine)?")
+    instead of trying every keyword separately at each position of the text.
+    Spaces inside keywords match any run of whitespace.
+
+    :param keywords: The lowercased keywords.
+    :return: The regular expression source.
+    """
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        is_end = "" in node
+        branches = [(r"\s+" if char == " " else re.escape(char)) + build(child)
+                    for char, child in sorted(node.items()) if char != ""]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        return group + "?" if is_end else group
+
+    return build(trie)
 
 
 class KeywordClassifier:
     def __init__(self, config):
+        """
+        Initializes the KeywordClassifier instance.
+
+        All keywords of all categories are compiled once into a single
+        word-boundary pattern, so classifying a text is one pass over it.
+
+        :param config: A mapping of each category to its list of keywords.
+        """
         self.config = config
+        self.categories_by_keyword: dict[str, list[str]] = {}
+        for category, keywords in config.items():
+            for keyword in keywords:
+                normalized = " ".join(keyword.lower().split())
+                if normalized:
+                    self.categories_by_keyword.setdefault(normalized, []).append(category)
+
+        self.pattern = None
+        if self.categories_by_keyword:
+            trie_pattern = _build_trie_pattern(list(self.categories_by_keyword))
+            self.pattern = re.compile(rf"(?<!\w)(?:{trie_pattern})(?!\w)", re.IGNORECASE)
+
+    def scores(self, text: str) -> dict[str, int]:
+        """
+        Count the keyword hits of every category in the given text.
+
+        Keywords only match whole words, so "def" does not match inside "defer".
+
+        :param text: The text content that should be scored.
+        :return: A mapping of each category to its number of keyword hits.
+        """
+        hits = Counter()
+        if self.pattern is not None:
+            for match in self.pattern.finditer(text):
+                keyword = " ".join(match.group(0).lower().split())
+                for category in self.categories_by_keyword.get(keyword, []):
+                    hits[category] += 1
+        return {category: hits[category] for category in self.config}
 
     def classify(self, text: str) -> str:
         """
         Classify the given text into one of the predefined categories.
 
+        The category with the most keyword hits wins; ties go to the category listed first.
+
         :param text: The text content that should be classified.
         :return: The category that the text belongs to, or "uncategorized" if no category is found.
         """
-        text_lower = text.lower()
-        for category, keywords in self.config.items():
-            if any(keyword.lower() in text_lower for keyword in keywords):
-                return category
-        return "uncategorized"
+        best_category, best_hits = "uncategorized", 0
+        for category, hits in self.scores(text).items():
+            if hits > best_hits:
+                best_category, best_hits = category, hits
+        return best_category
@@ -0,0 +1,204 @@
+import gc
+import math
+import multiprocessing
+import os
+import queue
+import threading
+import logging
+from scripts.logging_config import setup_logging
+from scripts.ingestion import IngestionService
+from scripts.metrics import metrics
+from scripts.model_registry import model_registry
+from scripts.ingestion_worker import IngestionWorker, _IDLE_CHECK_SECONDS, _STOP
+from scripts.enricher import NerEnricher
+from scripts.related_notes import Embedder
+from scripts.summarizer import Summarizer
+from scripts.zero_shot_service import ZeroShotService
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def preload_models(config: dict) -> None:
+    """
+    Loads every model the ingestion flow can use into the shared model registry.
+
+    The registry's limits are set first, so the memory ceiling applies while the
+    models are loaded in the parent rather than in every child. Only loads them:
+    running inference before forking could leave the children with the parent's
+    thread pools in an unusable state.
+
+    :param config: The configuration dictionary.
+    :raises Exception: If a model fails to load.
+    """
+    registry_config = config.get("model_registry", {})
+    model_registry.configure(max_memory_mb=registry_config.get("max_memory_mb"),
+                             idle_seconds=registry_config.get("idle_seconds"))
+    models_config = config.get("models", {})
+    # Built without the cache and the scheduler, so no connection or thread outlives the fork.
+    ZeroShotService(model_config=models_config.get("zero_shot")).classifier
+    summarizer = Summarizer(config=config.get("summarizer", {}), model_config=models_config.get("summarizer"))
+    summarizer.summarizer
+    summarizer.tokenizer
+    NerEnricher(config=config.get("ner", {})).nlp
+    if config.get("similar_notes", {}).get("enabled", False):
+        Embedder(model_config=models_config.get("embeddings")).extractor
+
+
+def _child_main(config: dict, paths_queue, metrics_queue, setup_lock, batch_size: int,
+                torch_threads: int | None) -> None:
+    if torch_threads:
+        import torch
+
+        torch.set_num_threads(torch_threads)
+    # Report only this process's work; the parent adds it to its own totals.
+    metrics.reset()
+    name = multiprocessing.current_process().name
+    # The models are already in the frozen registry inherited from the parent; the service
+    # only opens this process's own database connections and threads. The processes open
+    # them one at a time: SQLite fails instead of waiting when two connections switch a
+    # new database to WAL mode at once.
+    with setup_lock:
+        service = IngestionService(config=config)
+    while True:
+        try:
+            file_path = paths_queue.get(timeout=_IDLE_CHECK_SECONDS)
+        except queue.Empty:
+            service.flush()
+            metrics_queue.put((name, metrics.snapshot()))
+            continue
+        if file_path is _STOP:
+            break
+        batch = [file_path]
+        stop = False
+        while len(batch) < batch_size:
+            try:
+                file_path = paths_queue.get_nowait()
+            except queue.Empty:
+                break
+            if file_path is _STOP:
+                stop = True
+                break
+            batch.append(file_path)
+        try:
+            service.process_batch(batch)
+        except Exception as e:
+            logger.error(f"Error processing batch of {len(batch)} files: {e}")
+            for file_path in batch:
+                logger.error(f"Error processing file {file_path}: {e}", path=file_path)
+        metrics_queue.put((name, metrics.snapshot()))
+        if stop:
+            break
+    service.flush()
+    metrics_queue.put((name, metrics.snapshot()))
+
+
+class PreforkWorkerPool(IngestionWorker):
+    def __init__(self, config: dict, processes: int | None = None, batch_size: int = 1,
+                 torch_threads: int | None = None) -> None:
+        """
+        Initializes the PreforkWorkerPool instance.
+
+        A drop-in replacement for IngestionWorker that processes files in several
+        processes. The models are loaded once in the parent, then the worker processes
+        are forked: their copies of the weights share the parent's memory pages until
+        written to, which inference never does, so the total memory stays close to that
+        of one process. The Python objects are moved out of the garbage collector's
+        reach before forking so that collections in the children do not copy them.
+
+        The parent keeps the priority queue of IngestionWorker (small files first, no
+        duplicates) and feeds a small shared queue the processes pull batches from.
+        Every process opens its own connections to the cache and indexes of the vault.
+        The processes send their metrics to the parent after every batch, so the
+        parent's metrics (and the watcher's metrics endpoint) cover the whole pool.
+        Forking needs a POSIX system.
+
+        :param config: The configuration dictionary.
+        :param processes: The number of worker processes; defaults to the number of CPUs.
+        :param batch_size: The maximum number of queued files a process takes as one batch.
+        :param torch_threads: The intra-op threads of each process; defaults to the CPUs
+            divided by the processes, so the processes do not oversubscribe the cores.
+        :return: None
+        """
+        cpu_count = os.cpu_count() or 1
+        processes = max(1, int(processes or cpu_count))
+        super().__init__(service=None, max_workers=processes, batch_size=batch_size)
+        self.config = config
+        self.torch_threads = torch_threads or max(1, cpu_count // processes)
+        self.context = multiprocessing.get_context("fork")
+        self.paths_queue = self.context.Queue(maxsize=processes * self.batch_size)
+        self.metrics_queue = self.context.Queue()
+        self.setup_lock = self.context.Lock()
+        self.processes: list = []
+        self.collector: threading.Thread | None = None
+
+    def start(self) -> None:
+        """
+        Loads the models, forks the worker processes and starts feeding them.
+        """
+        preload_models(self.config)
+        model_registry.freeze()
+        gc.collect()
+        gc.freeze()
+        for index in range(self.max_workers):
+            process = self.context.Process(target=_child_main, name=f"ingestion-process-{index}", daemon=True,
+                                           args=(self.config, self.paths_queue, self.metrics_queue,
+                                                 self.setup_lock, self.batch_size, self.torch_threads))
+            process.start()
+            self.processes.append(process)
+        gc.unfreeze()
+        # Threads are only started after forking; a fork copies no threads but all their locks.
+        feeder = threading.Thread(target=self._run, name="ingestion-feeder", daemon=True)
+        feeder.start()
+        self.threads.append(feeder)
+        self.collector = threading.Thread(target=self._collect_metrics, name="ingestion-metrics", daemon=True)
+        self.collector.start()
+        logger.info(f"Ingestion worker pool started with {self.max_workers} process(es) "
+                    f"of {self.torch_threads} torch thread(s)")
+
+    def stop(self) -> None:
+        """
+        Stops the worker processes after the queued files have been processed.
+        """
+        self.queue.put((math.inf, next(self.sequence), _STOP))
+        for thread in self.threads:
+            thread.join()
+        for _ in self.processes:
+            if not self._put(_STOP):
+                break
+        for process in self.processes:
+            process.join()
+        self.metrics_queue.put(_STOP)
+        self.collector.join()
+        self.threads = []
+        self.processes = []
+        logger.info("Ingestion worker pool stopped")
+
+    def _run(self) -> None:
+        # Feeds the shared queue in priority order; blocks while the processes are busy.
+        while True:
+            file_path = self._take(self.queue.get())
+            self.queue.task_done()
+            if file_path is _STOP:
+                return
+            if not self._put(file_path):
+                logger.error(f"All worker processes exited; {file_path} and the remaining queued files "
+                             f"stay in the inbox until the next start")
+                return
+
+    def _collect_metrics(self) -> None:
+        # Runs until `stop`; the snapshots are cumulative, so the latest one per process is kept.
+        while True:
+            item = self.metrics_queue.get()
+            if item is _STOP:
+                return
+            metrics.update_worker(*item)
+
+    def _put(self, item) -> bool:
+        while True:
+            try:
+                self.paths_queue.put(item, timeout=1)
+                return True
+            except queue.Full:
+                if not any(process.is_alive() for process in self.processes):
+                    return False
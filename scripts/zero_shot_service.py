@@ -1,30 +1,58 @@
-from transformers import pipeline
 import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from scripts.logging_config import setup_logging
+from scripts.inference_cache import InferenceCache
+from scripts.metrics import metrics
+from scripts.model_loader import load_pipeline, model_id, model_settings
+from scripts.model_registry import model_registry
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
 
 class ZeroShotService:
-    def __init__(self) -> None:
+    def __init__(self, cache: InferenceCache | None = None, config: dict | None = None,
+                 model_config: dict | None = None) -> None:
         """
         Initializes the ZeroShotService instance.
 
-        The instance will load the zero-shot classification model during initialization,
-        which is used to classify text into predefined categories.
+        The zero-shot classification model, which is used to classify text into
+        predefined categories, is loaded through the shared model registry on first use.
 
-        :param model: The name of the zero-shot classification model to use.
-        :raises Exception: If there is an error during the model loading process.
+        With the scheduler enabled, requests from all callers are queued and a
+        background thread coalesces them, grouped by label set, into batches of up to
+        about `max_batch_size` texts, waiting at most `max_wait_ms` for a batch to fill. The
+        scheduler stops waiting as soon as every caller currently in flight has its
+        requests in the batch, so a lone caller never pays the wait.
+
+        :param cache: An optional InferenceCache; cached predictions skip the model entirely.
+        :param config: The `ml_service` configuration section; its `scheduler` entry
+            configures request coalescing.
+        :param model_config: The `models.zero_shot` configuration section selecting the
+            model, dtype, threads, backend and quantization.
         """
-        try:
-            self.classifier = pipeline(task="zero-shot-classification", model="facebook/bart-large-mnli")
-            logging.info("Zero-shot classification model loaded successfully.")
-        except Exception as e:
-            logging.error(f"Failed to load zero-shot classification mode: {e}")
-            raise
+        scheduler_config = (config or {}).get("scheduler", {})
+        self.model_settings = model_settings("zero_shot", model_config)
+        self.model_name = model_id(self.model_settings)
+        self.cache = cache
+        self.max_batch_size = scheduler_config.get("max_batch_size", 32)
+        self.max_wait_seconds = scheduler_config.get("max_wait_ms", 10) / 1000
+        self.forward_batch_size = scheduler_config.get("forward_batch_size", 16)
+        self.requests: queue.Queue | None = None
+        self.scheduler_thread = None
+        # Number of requests queued for the scheduler and not yet taken into a batch.
+        self.active_callers = 0
+        self.callers_lock = threading.Lock()
+        if scheduler_config.get("enabled", False):
+            self.requests = queue.Queue()
+            self.scheduler_thread = threading.Thread(target=self._schedule, args=(self.requests,),
+                                                     name="zero-shot-scheduler", daemon=True)
+            self.scheduler_thread.start()
 
-    def predict(self, text: str, labels: list) -> tuple[str, float]:
+    def predict(self, text: str, labels: list, stage: str = "zero_shot") -> tuple[str, float]:
 
         """
         Predicts the category of the given text using the zero-shot classification model.
@@ -37,16 +65,154 @@ class ZeroShotService:
 
         :param text: The text content to classify.
         :param labels: The list of labels to classify into.
+        :param stage: The pipeline stage the prediction belongs to; part of the cache key.
         :return: A tuple containing the predicted category and the confidence score.
-        :raises Exception: If there is an error during the classification process.
         """
+        return self.predict_batch([text], labels, batch_size=1, stage=stage)[0]
+
+    def predict_batch(self, texts: list[str], labels: list, batch_size: int = 8,
+                      stage: str = "zero_shot") -> list[tuple[str, float]]:
+        """
+        Predicts the category of every text in the list with batched forward passes.
+
+        The texts are handed to the pipeline as one list, so the model sees padded
+        batches of `batch_size` instead of one call per text. Texts found in the cache
+        are not sent to the model at all. If the batched call fails, every text is
+        retried on its own so one bad input cannot sink the rest. With the scheduler
+        enabled, the texts are coalesced with concurrent requests from other callers.
+
+        :param texts: The text contents to classify.
+        :param labels: The list of labels to classify into.
+        :param batch_size: The number of sequence/label pairs per forward pass.
+        :param stage: The pipeline stage the predictions belong to; part of the cache key.
+        :return: A list of (category, confidence score) tuples in the order of `texts`.
+        :raises Exception: If the model fails to load.
+        """
+        if not texts:
+            return []
+        keys = [self._cache_key(text, labels, stage) for text in texts]
+        cached = self.cache.get_many(keys) if self.cache is not None else {}
+        predictions = {key: tuple(value) for key, value in cached.items()}
+        pending = {key: text for key, text in zip(keys, texts) if key not in predictions}
+        if pending:
+            if self.requests is not None:
+                results = self._submit(list(pending.values()), labels)
+            else:
+                results = self._infer(list(pending.values()), labels, batch_size)
+            computed = dict(zip(pending, results))
+            if self.cache is not None:
+                self.cache.set_many({key: list(prediction) for key, prediction in computed.items()
+                                     if prediction is not None})
+            predictions.update((key, prediction or ("uncategorized", 0.0)) for key, prediction in computed.items())
+        return [predictions[key] for key in keys]
+
+    @property
+    def classifier(self):
+        """
+        The zero-shot classification pipeline, loaded on first use.
+        """
+        return model_registry.get(f"zero-shot-classification:{self.model_name}", self._load_pipeline)
+
+    def close(self) -> None:
+        """
+        Stops the scheduler thread, if one is running.
+
+        Requests queued before the call are still answered; later calls run the model
+        directly instead of waiting on the stopped scheduler.
+        """
+        if self.scheduler_thread is not None:
+            with self.callers_lock:
+                requests, self.requests = self.requests, None
+                requests.put(None)
+            self.scheduler_thread.join()
+            self.scheduler_thread = None
+
+    def _submit(self, texts: list[str], labels: list) -> list[tuple[str, float] | None]:
+        future = Future()
+        with self.callers_lock:
+            # Read under the lock, so no request is queued behind the stop marker of `close`.
+            requests = self.requests
+            if requests is not None:
+                self.active_callers += 1
+                requests.put((texts, tuple(labels), future))
+        if requests is None:
+            return self._infer(texts, labels, self.forward_batch_size)
+        return future.result()
+
+    def _schedule(self, requests: queue.Queue) -> None:
+        while True:
+            request = requests.get()
+            if request is None:
+                return
+            batch = [request]
+            batch_texts = len(request[0])
+            deadline = time.monotonic() + self.max_wait_seconds
+            stop = False
+            while batch_texts < self.max_batch_size:
+                try:
+                    # Take what is already queued; only wait while other callers may still add requests.
+                    if requests.empty() and len(batch) >= self.active_callers:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        request = requests.get_nowait()
+                    else:
+                        request = requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+                batch_texts += len(request[0])
+            # Callers in this batch are answered by it, so they no longer count as adding requests.
+            with self.callers_lock:
+                self.active_callers -= len(batch)
+
+            # One padded forward pass per label set.
+            groups: dict[tuple, list] = {}
+            for texts, labels, future in batch:
+                groups.setdefault(labels, []).append((texts, future))
+            for labels, items in groups.items():
+                flat_texts = [text for texts, _ in items for text in texts]
+                try:
+                    results = self._infer(flat_texts, list(labels), self.forward_batch_size)
+                except Exception as e:
+                    logging.error(f"Zero-shot scheduler batch failed: {e}")
+                    results = [None] * len(flat_texts)
+                offset = 0
+                for texts, future in items:
+                    future.set_result(results[offset:offset + len(texts)])
+                    offset += len(texts)
+            metrics.increment("zero_shot_scheduler_batches")
+            metrics.increment("zero_shot_scheduler_texts", batch_texts)
+            if stop:
+                return
+
+    def _infer(self, texts: list[str], labels: list, batch_size: int) -> list[tuple[str, float] | None]:
+        classifier = self.classifier
         try:
-            results = self.classifier(text, labels)
-            if not results or not isinstance(results, dict):
-                return ("uncategorized", 0.0)
-            label = results.get('labels', ["uncategorized"])[0]
-            score = results.get('scores', [0.0])[0]
-            return (label, score)
+            results = classifier(texts if len(texts) > 1 else texts[0], labels, batch_size=batch_size)
+            if isinstance(results, dict):
+                results = [results]
+            return [self._top_prediction(result) for result in results]
         except Exception as e:
-            logging.error(f"Failed to classify text: {e}")
+            if len(texts) == 1:
+                logging.error(f"Failed to classify text: {e}")
+                return [None]
+            logging.error(f"Failed to classify batch of {len(texts)} texts, retrying one by one: {e}")
+            return [self._infer([text], labels, 1)[0] for text in texts]
+
+    def _load_pipeline(self):
+        return load_pipeline("zero-shot-classification", self.model_settings)
+
+    def _cache_key(self, text: str, labels: list, stage: str) -> str:
+        return InferenceCache.make_key(stage, self.model_name, list(labels), text)
+
+    @staticmethod
+    def _top_prediction(results) -> tuple[str, float]:
+        if not results or not isinstance(results, dict):
             return ("uncategorized", 0.0)
+        label = results.get('labels', ["uncategorized"])[0]
+        score = results.get('scores', [0.0])[0]
+        return (label, score)
@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+@pytest.fixture(autouse=True)
+def quarantine_path(tmp_path, monkeypatch):
+    # Files quarantined by a test go to its temporary directory, not the project's quarantine.
+    import scripts.logging_config
+
+    path = tmp_path / "quarantine"
+    monkeypatch.setattr(scripts.logging_config, "QUARANTINE_PATH", str(path))
+    return path
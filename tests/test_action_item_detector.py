@@ -0,0 +1,102 @@
+import pytest
+from scripts import action_item_detector
+from scripts.action_item_detector import TASK_MARKER_PATTERN, ActionItemDetector
+
+LABELS = ["action item", "task"]
+
+
+class FakeZeroShotService:
+    def __init__(self, actionable: set[str] | None = None, seconds_per_line: float = 0.0, clock=None) -> None:
+        self.actionable = actionable or set()
+        self.seconds_per_line = seconds_per_line
+        self.clock = clock
+        self.calls = []
+
+    def predict_batch(self, texts, labels, batch_size=8, stage="zero_shot"):
+        self.calls.append(list(texts))
+        if self.clock is not None:
+            self.clock.now += self.seconds_per_line * len(texts)
+        return [("action item", 0.9) if text in self.actionable else ("other", 0.9) for text in texts]
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.mark.parametrize("line", [
+    "- [ ] Send the report",
+    "[ ] call Bob",
+    "* [ ]   book the room",
+    "TODO: fix the parser",
+    "- TODO(alice): review the draft",
+    "FIXME - handle empty input",
+    "ACTION: Carol to send the minutes",
+    "ACTION ITEM: update the budget",
+])
+def test_task_marker_matches_explicit_tasks(line):
+    assert TASK_MARKER_PATTERN.search(line)
+
+
+@pytest.mark.parametrize("line", [
+    "Action items:",
+    "Action plan for Q3 was approved",
+    "Todo list review",
+    "todo: lowercase tags are left to the model",
+    "TODO",
+    "TODO:",
+    "- [ ]",
+    "[ ]",
+    "[x] already done",
+    "TODOS are piling up",
+])
+def test_task_marker_ignores_headings_and_prose(line):
+    assert not TASK_MARKER_PATTERN.search(line)
+
+
+def test_marked_lines_skip_the_model_and_lose_their_checkbox():
+    service = FakeZeroShotService()
+    detector = ActionItemDetector(service, config={"prefilter": True})
+    text = "Action items:\n- [ ] Send the report\nTODO: fix the parser\nWeather was nice"
+    assert detector.detect(text, LABELS) == ["Send the report", "TODO: fix the parser"]
+    assert all("Send the report" not in call for call in service.calls)
+
+
+def test_heading_is_left_to_the_model():
+    service = FakeZeroShotService(actionable={"- Email the vendor"})
+    detector = ActionItemDetector(service, config={"prefilter": True})
+    assert detector.detect("Action items:\n- Email the vendor", LABELS) == ["Email the vendor"]
+    assert ["Action items:", "- Email the vendor"] in service.calls
+
+
+def test_time_budget_is_enforced_per_document(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(action_item_detector, "time", clock)
+    long_document = "\n".join(f"Please send report {number}" for number in range(20))
+    short_documents = ["Please call Bob", "Please book the room"]
+    actionable = {"Please call Bob", "Please book the room"}
+    service = FakeZeroShotService(actionable=actionable, seconds_per_line=1.0, clock=clock)
+    detector = ActionItemDetector(service, config={"batch_size": 2, "time_budget_seconds": 3})
+
+    results = detector.detect_batch([long_document, *short_documents], LABELS)
+
+    assert results[1:] == [["Please call Bob"], ["Please book the room"]]
+    classified = [line for call in service.calls for line in call]
+    # The long document stops after its own budget (two batches of two lines) instead of using up everyone's.
+    assert sum(line.startswith("Please send report") for line in classified) == 4
+
+
+def test_time_budget_cuts_a_slow_model_short(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(action_item_detector, "time", clock)
+    lines = [f"Please send report {number}" for number in range(100)]
+    service = FakeZeroShotService(actionable={lines[1], lines[99]}, seconds_per_line=10.0, clock=clock)
+    detector = ActionItemDetector(service, config={"batch_size": 4, "time_budget_seconds": 60})
+
+    assert detector.detect_batch(["\n".join(lines)], LABELS) == [["Please send report 1"]]
+    # Model time stops at the first batch that reaches the budget, not after all 100 lines.
+    assert clock.now == 80.0
+    assert len(service.calls) == 2
@@ -0,0 +1,29 @@
+from scripts.duplicate_index import DuplicateIndex
+
+TEXT = " ".join(f"word{number}" for number in range(300))
+
+
+def test_exact_duplicate_ignores_case_punctuation_and_whitespace(tmp_path):
+    index = DuplicateIndex(tmp_path / "duplicates.sqlite3")
+    index.add("note.md", index.fingerprint(TEXT))
+    assert index.find(index.fingerprint(TEXT.upper().replace(" ", " ,\n"))) == ("note.md", 1.0)
+    index.close()
+
+
+def test_near_duplicate_is_found_above_the_threshold(tmp_path):
+    index = DuplicateIndex(tmp_path / "duplicates.sqlite3", threshold=0.8)
+    index.add("note.md", index.fingerprint(TEXT))
+    match = index.find(index.fingerprint(TEXT + " one extra sentence at the end"))
+    assert match is not None
+    assert match[0] == "note.md"
+    assert 0.8 <= match[1] < 1.0
+    index.close()
+
+
+def test_different_text_and_removed_notes_are_not_found(tmp_path):
+    index = DuplicateIndex(tmp_path / "duplicates.sqlite3")
+    index.add("note.md", index.fingerprint(TEXT))
+    assert index.find(index.fingerprint(" ".join(f"other{number}" for number in range(300)))) is None
+    index.remove("note.md")
+    assert index.find(index.fingerprint(TEXT)) is None
+    index.close()
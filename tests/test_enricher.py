@@ -0,0 +1,48 @@
+from collections import defaultdict
+import pytest
+from benchmarks.stubs import StubNerEnricher, StubNlp
+from scripts.data_models import ClassifiedData
+from scripts.model_registry import model_registry
+
+NAMES = ["Ada Lovelace", "Grace Hopper", "Alan Turing", "Acme Corp", "New York", "Barbara Liskov"]
+
+
+@pytest.fixture(autouse=True)
+def unload_models():
+    yield
+    model_registry.unload()
+
+
+def whole_text_entities(text: str) -> dict:
+    entities = defaultdict(list)
+    for span in StubNlp()(text).ents:
+        entities[span.label_].append(span.text)
+    return dict(entities)
+
+
+def test_long_element_is_windowed_without_losing_entities():
+    enricher = StubNerEnricher(config={"max_chars": 200})
+    # One element (no blank lines) of many sentences, each naming two entities.
+    element = " ".join(f"In week {number} {NAMES[number % 6]} met {NAMES[(number + 1) % 6]} about the plan."
+                       for number in range(60))
+    assert len(element) > 10 * enricher.max_chars
+
+    windows = enricher._windows(element)
+    assert len(windows) > 10
+    assert all(len(window) <= enricher.max_chars for window in windows)
+    assert " ".join(windows).split() == element.split()
+
+    [enriched] = enricher.enrich_batch([ClassifiedData(text=f"Intro by Ada Lovelace\n\n{element}",
+                                                       source_path="long.txt")])
+    assert enriched.entities == whole_text_entities(f"Intro by Ada Lovelace\n\n{element}")
+
+
+def test_element_without_sentence_ends_is_cut_at_spaces_then_anywhere():
+    enricher = StubNerEnricher(config={"max_chars": 50})
+    words = " ".join(f"word{number} Acme" for number in range(40))
+    windows = enricher._windows(words)
+    assert all(len(window) <= 50 and not window.startswith(" ") for window in windows)
+    assert " ".join(windows).split() == words.split()
+
+    token = "x" * 120
+    assert enricher._windows(token) == ["x" * 50, "x" * 50, "x" * 20]
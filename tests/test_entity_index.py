@@ -0,0 +1,61 @@
+from scripts.entity_index import EntityIndex, hub_name, normalize_entities
+
+
+def test_entities_are_normalized_and_deduplicated():
+    entities = {"ORG": ["the  Acme Corp.'s", "ACME CORP", "x"], "PERSON": ["Acme Corp", "Alice"]}
+    assert normalize_entities(entities) == {"ORG": ["Acme Corp"], "PERSON": ["Alice"]}
+    assert hub_name("C/C++: a [guide]").startswith("C C++ a guide (")
+    assert hub_name("Acme Corp") == "Acme Corp"
+
+
+def test_hub_pages_link_back_to_every_mentioning_note(tmp_path):
+    index = EntityIndex(tmp_path / "entities.sqlite3", hub_dir=tmp_path / "entities", labels=("ORG",))
+    index.update_note("vault/2024-01-01-a.md", {"ORG": ["Acme"], "DATE": ["Monday"]})
+    index.update_note("vault/2024-01-02-b.md", {"ORG": ["acme"]})
+    assert index.flush(force=True) == 1
+    page = (tmp_path / "entities" / "Acme.md").read_text(encoding="utf-8")
+    assert "## Mentioned in (2)" in page
+    assert page.index("[[2024-01-02-b]]") < page.index("[[2024-01-01-a]]")
+    assert not (tmp_path / "entities" / "Monday.md").exists()
+    index.close()
+
+
+def test_unchanged_mentions_do_not_rewrite_hub_pages(tmp_path):
+    index = EntityIndex(tmp_path / "entities.sqlite3", hub_dir=tmp_path / "entities", labels=("ORG",))
+    index.update_note("vault/a.md", {"ORG": ["Acme"]})
+    index.flush(force=True)
+    index.update_note("vault/a.md", {"ORG": ["Acme"]})
+    assert index.flush(force=True) == 0
+    index.close()
+
+
+def test_flush_is_debounced_and_removed_entities_lose_their_page(tmp_path):
+    index = EntityIndex(tmp_path / "entities.sqlite3", hub_dir=tmp_path / "entities", labels=("ORG",),
+                        debounce_seconds=3600)
+    index.update_note("vault/a.md", {"ORG": ["Acme"]})
+    assert index.flush() == 0
+    assert index.flush(force=True) == 1
+    index.remove_note("vault/a.md")
+    assert index.flush(force=True) == 1
+    assert not (tmp_path / "entities" / "Acme.md").exists()
+    assert index.notes("Acme") == []
+    index.close()
+
+
+def test_entities_with_the_same_cleaned_name_get_separate_hub_pages(tmp_path):
+    index = EntityIndex(tmp_path / "entities.sqlite3", hub_dir=tmp_path / "entities", labels=("ORG", "PRODUCT"))
+    index.update_note("vault/a.md", normalize_entities({"ORG": ["A/B"], "PRODUCT": ["C#.NET", "C++"]}))
+    index.update_note("vault/b.md", normalize_entities({"ORG": ["A B", "a/b"], "PRODUCT": ["C .NET"]}))
+    assert index.flush(force=True) == 5
+
+    names = ["A/B", "A B", "C#.NET", "C .NET", "C++"]
+    assert len({hub_name(name) for name in names}) == 5
+    pages = {name: (tmp_path / "entities" / f"{hub_name(name)}.md").read_text(encoding="utf-8") for name in names}
+    assert "[[a]]" in pages["A/B"] and "[[b]]" in pages["A/B"]
+    assert "[[a]]" not in pages["A B"] and "[[b]]" in pages["A B"]
+    assert "[[a]]" in pages["C#.NET"] and "[[b]]" not in pages["C#.NET"]
+    assert "[[a]]" not in pages["C .NET"] and "[[b]]" in pages["C .NET"]
+    assert "[[a]]" in pages["C++"]
+    # Every spelling of an entity links to the same page.
+    assert hub_name("a/b").casefold() == hub_name("A/B").casefold()
+    index.close()
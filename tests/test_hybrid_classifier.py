@@ -0,0 +1,88 @@
+from scripts.hybrid_classifier import HybridClassifier
+
+LABELS = ["Meeting Notes", "Technical Article", "Code Snippet", "uncategorized"]
+
+
+class FakeZeroShotService:
+    def __init__(self) -> None:
+        self.texts = []
+
+    def predict_batch(self, texts, labels, batch_size=8, stage="zero_shot"):
+        self.texts.extend(texts)
+        return [("Technical Article", 0.9) for _ in texts]
+
+
+def make_classifier(**classifier_config):
+    service = FakeZeroShotService()
+    config = {"classifier": classifier_config, "word_classifier": {"config": {}}}
+    return HybridClassifier(config, zs_service=service), service
+
+
+def test_meeting_headers_decide_without_the_model():
+    classifier, service = make_classifier()
+    text = "Weekly sync\nAttendees: Alice, Bob\nAgenda:\n- budget\nDecisions: approve budget\nNext steps: hire"
+    assert classifier.classify(text, LABELS) == "Meeting Notes"
+    assert classifier.stats["structure"] == 1
+    assert service.texts == []
+
+
+def test_generic_headers_are_not_meeting_cues():
+    classifier, service = make_classifier()
+    travel_log = "\n".join(["Date: 2024-05-01", "Location: Lisbon", "Time: 09:00",
+                            "Walked along the river and visited the museum."] * 3)
+    assert classifier.classify(travel_log, LABELS) == "Technical Article"
+    assert classifier.stats["structure"] == 0
+    assert len(service.texts) == 1
+
+
+def test_meeting_cues_need_a_meeting_specific_header():
+    classifier, service = make_classifier()
+    text = "Decisions: ship it\nNext steps: write docs\nPresent: Alice\nThe release went well."
+    assert classifier.classify(text, LABELS) == "Technical Article"
+    assert classifier.stats["structure"] == 0
+
+
+def test_sparse_meeting_headers_go_to_the_model():
+    classifier, service = make_classifier()
+    lines = ["Agenda: quarterly review", "Minutes taken by Bob"] + [f"Paragraph {number} of a long report."
+                                                                    for number in range(38)]
+    assert classifier.classify("\n".join(lines), LABELS) == "Technical Article"
+    assert classifier.stats["structure"] == 0
+
+
+def test_code_structure_decides_code_snippet():
+    classifier, _ = make_classifier()
+    code = "import os\n\ndef main():\n    return os.getcwd()\n\nclass Runner:\n    pass\n"
+    assert classifier.classify(code, LABELS) == "Code Snippet"
+    assert classifier.stats["structure"] == 1
+
+
+def test_extension_decides_before_structure():
+    classifier, service = make_classifier(extension_categories={".py": "Code Snippet"})
+    assert classifier.classify("Agenda:\nAttendees: Alice", LABELS, source_path="notes.py") == "Code Snippet"
+    assert classifier.stats["extension"] == 1
+
+
+def test_mentions_are_not_code_cues():
+    classifier, _ = make_classifier()
+    text = ("Weekly sync\nAttendees: Alice, Bob, Carol\nAgenda: release and hiring\n"
+            "@alice send the release notes\n@bob book the room\n@carol review the offer")
+    assert classifier.classify(text, LABELS) == "Meeting Notes"
+
+
+def test_semicolons_in_prose_are_not_code_cues():
+    classifier, service = make_classifier()
+    text = "Return the loaner laptops by Friday;\nBudget is fine;\nThe offsite moves to June."
+    assert classifier.classify(text, LABELS) == "Technical Article"
+    assert classifier.stats["structure"] == 0
+    assert len(service.texts) == 1
+
+
+def test_code_cues_need_a_definition_import_or_brace():
+    classifier, _ = make_classifier()
+    text = "total = price * count;\nreturn total\nlet the team know;\nresult = total;"
+    assert classifier.classify(text, LABELS) == "Technical Article"
+    assert classifier.stats["structure"] == 0
+
+    javascript = "function total(items) {\n  const sum = items.length;\n  return sum;\n}"
+    assert classifier.classify(javascript, LABELS) == "Code Snippet"
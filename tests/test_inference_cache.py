@@ -0,0 +1,71 @@
+import time
+from scripts.inference_cache import InferenceCache
+
+
+def _rows(cache: InferenceCache) -> dict[str, float]:
+    return dict(cache.connection.execute("SELECT key, last_access FROM inference_cache"))
+
+
+def test_round_trip(tmp_path):
+    cache = InferenceCache(tmp_path / "cache.sqlite3")
+    key = InferenceCache.make_key("zero_shot", "model", {"labels": ["a"]}, "text")
+    cache.set(key, ["a", 0.9])
+    assert cache.get(key) == ["a", 0.9]
+    assert cache.get("missing") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_size_is_only_checked_every_evict_every_writes(tmp_path):
+    cache = InferenceCache(tmp_path / "cache.sqlite3", max_entries=3, evict_every=4)
+    cache.set_many({f"key{number}": number for number in range(3)})
+    cache.set_many({"key3": 3})
+    # Four writes reach the check: one entry over the limit is evicted.
+    assert len(_rows(cache)) == 3
+    cache.set_many({"key4": 4, "key5": 5})
+    # Below the next check the table may grow past the limit.
+    assert len(_rows(cache)) == 5
+    cache.set_many({"key6": 6, "key7": 7})
+    assert len(_rows(cache)) == 3
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = InferenceCache(tmp_path / "cache.sqlite3", max_entries=2, evict_every=1,
+                           access_resolution_seconds=0)
+    cache.set("old", 1)
+    time.sleep(0.01)
+    cache.set("newer", 2)
+    time.sleep(0.01)
+    assert cache.get("old") == 1
+    cache.set("newest", 3)
+    assert set(_rows(cache)) == {"old", "newest"}
+
+
+def test_hits_only_refresh_stale_access_times(tmp_path):
+    cache = InferenceCache(tmp_path / "cache.sqlite3", access_resolution_seconds=60)
+    cache.set_many({"fresh": 1, "stale": 2})
+    cache.connection.execute("UPDATE inference_cache SET last_access = ? WHERE key = 'stale'",
+                             (time.time() - 120,))
+    cache.connection.commit()
+    before = _rows(cache)
+    changes = cache.connection.total_changes
+
+    assert cache.get_many(["fresh", "stale"]) == {"fresh": 1, "stale": 2}
+    after = _rows(cache)
+    assert after["fresh"] == before["fresh"]
+    assert after["stale"] > before["stale"]
+    assert cache.connection.total_changes == changes + 1
+
+
+def test_fresh_hit_performs_no_write(tmp_path):
+    cache = InferenceCache(tmp_path / "cache.sqlite3", access_resolution_seconds=60)
+    cache.set_many({"key": ["a", 0.9], "other": ["b", 0.1]})
+    statements = []
+    cache.connection.set_trace_callback(statements.append)
+    wal_size = (tmp_path / "cache.sqlite3-wal").stat().st_size
+
+    for _ in range(3):
+        assert cache.get_many(["key", "other", "missing"]) == {"key": ["a", 0.9], "other": ["b", 0.1]}
+    assert statements and all(statement.lstrip().upper().startswith("SELECT") for statement in statements)
+    assert not cache.connection.in_transaction
+    assert (tmp_path / "cache.sqlite3-wal").stat().st_size == wal_size
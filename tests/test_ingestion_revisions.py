@@ -0,0 +1,119 @@
+import shutil
+from pathlib import Path
+import pytest
+from benchmarks.stubs import StubNerEnricher, StubSummarizer, StubZeroShotService
+from scripts import enrichment_pipeline, ingestion
+from scripts.kb_integrator import GENERATED_END_MARKER
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+BOILERPLATE = "\n\n".join(f"Shared boilerplate paragraph {number} about installing and running the tools."
+                          for number in range(8))
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingestion, "ZeroShotService", StubZeroShotService)
+    monkeypatch.setattr(enrichment_pipeline, "NerEnricher", StubNerEnricher)
+    monkeypatch.setattr(enrichment_pipeline, "Summarizer", StubSummarizer)
+    shutil.copytree(PROJECT_ROOT / "templates", tmp_path / "templates")
+    (tmp_path / "inbox").mkdir()
+    config = ingestion.load_config()
+    config["similar_notes"]["enabled"] = False
+    config["metrics"]["enabled"] = False
+    config["entities"]["enabled"] = False
+    service = ingestion.IngestionService(config, vault_path=tmp_path / "vault", archive_path=tmp_path / "archive",
+                                         project_root=tmp_path)
+    yield service
+    for index in (service.source_index, service.duplicate_index, service.cache):
+        if index is not None:
+            index.close()
+
+
+def drop(tmp_path: Path, relative: str, text: str) -> str:
+    path = tmp_path / "inbox" / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def project_readme(name: str, topic: str) -> str:
+    # Mostly the same short paragraphs (a revision by its elements), but mostly different words (no duplicate).
+    details = "\n\n".join(f"{name} section {number}: " + " ".join(f"{topic}{number}word{index}" for index in range(40))
+                          for number in range(4))
+    shared = "\n\n".join(f"Run step {number} of the setup." for number in range(5))
+    return f"{details}\n\n{shared}"
+
+
+def test_same_name_in_different_folders_is_not_a_revision(tmp_path, service):
+    note_a = service.process(drop(tmp_path, "projA/README.md", project_readme("Project Alpha", "parser")))
+    note_b = service.process(drop(tmp_path, "projB/README.md", project_readme("Project Beta", "renderer")))
+
+    assert note_a and note_b and note_a != note_b
+    assert "Project Alpha" in Path(note_a).read_text(encoding="utf-8")
+    assert "Project Beta" in Path(note_b).read_text(encoding="utf-8")
+
+
+def test_revision_updates_the_note_in_place(tmp_path, service):
+    note = service.process(drop(tmp_path, "report.txt", f"First draft of the report.\n\n{BOILERPLATE}"))
+    revised = service.process(drop(tmp_path, "report.txt", f"Second draft of the report.\n\n{BOILERPLATE}"))
+
+    assert revised == note
+    content = Path(note).read_text(encoding="utf-8")
+    assert "Second draft" in content
+    assert "First draft" not in content
+    assert len(list(Path(note).parent.glob("*.md"))) == 1
+
+
+def test_revision_keeps_user_notes_and_linked_duplicates(tmp_path, service):
+    text = f"Original notes on the design.\n\n{BOILERPLATE}"
+    note = service.process(drop(tmp_path, "design.txt", text))
+    assert GENERATED_END_MARKER in Path(note).read_text(encoding="utf-8")
+
+    assert service.process(drop(tmp_path, "copy-of-design.txt", text)) == note
+    with open(note, "a", encoding="utf-8") as note_file:
+        note_file.write("My own remark about the design.\n")
+
+    assert service.process(drop(tmp_path, "design.txt", f"Revised notes on the design.\n\n{BOILERPLATE}")) == note
+    content = Path(note).read_text(encoding="utf-8")
+    assert "Revised notes" in content
+    generated, _, kept = content.partition(GENERATED_END_MARKER)
+    assert "Original notes" not in generated
+    assert "> Duplicate source: copy-of-design.txt" in kept
+    assert "My own remark about the design." in kept
+
+
+def test_revision_of_an_edited_note_keeps_the_edits_below_the_marker(tmp_path, service):
+    note = service.process(drop(tmp_path, "plan.txt", f"Plan for the first quarter.\n\n{BOILERPLATE}"))
+    generated, marker, _ = Path(note).read_text(encoding="utf-8").partition(GENERATED_END_MARKER)
+    edited = generated.replace("Plan for the first quarter.", "Plan for the first quarter, as I remember it.")
+    assert edited != generated
+    Path(note).write_text(f"{edited}{marker}\n## My notes\n\nAsk about the budget.\n", encoding="utf-8")
+
+    assert service.process(drop(tmp_path, "plan.txt", f"Plan for the second quarter.\n\n{BOILERPLATE}")) == note
+    generated, _, kept = Path(note).read_text(encoding="utf-8").partition(GENERATED_END_MARKER)
+    # The part above the marker is regenerated from the revised source, edits included.
+    assert "Plan for the second quarter." in generated
+    assert "as I remember it" not in generated
+    assert kept == "\n## My notes\n\nAsk about the budget.\n"
+
+
+def test_source_that_grows_past_the_streaming_threshold_is_a_revision(tmp_path, service):
+    # Paragraphs separated by lines holding only spaces, which the streaming converter splits on too.
+    text = "Release checklist.\n \n" + BOILERPLATE.replace("\n\n", "\n \n")
+    service.streaming_min_bytes = len(text.encode("utf-8")) + 50
+    note = service.process(drop(tmp_path, "checklist.txt", text))
+
+    grown = f"{text}\n\nAdded step: verify the signed build before the release."
+    assert len(grown.encode("utf-8")) >= service.streaming_min_bytes
+    assert service.process(drop(tmp_path, "checklist.txt", grown)) == note
+    assert "Added step: verify the signed build" in Path(note).read_text(encoding="utf-8")
+    assert len(list(Path(note).parent.glob("*.md"))) == 1
+
+
+def test_unchanged_file_is_skipped(tmp_path, service):
+    text = f"Meeting recap.\n\n{BOILERPLATE}"
+    note = service.process(drop(tmp_path, "recap.txt", text))
+    mtime = Path(note).stat().st_mtime_ns
+    assert service.process(drop(tmp_path, "recap.txt", text)) == note
+    assert Path(note).stat().st_mtime_ns == mtime
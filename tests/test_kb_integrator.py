@@ -0,0 +1,111 @@
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from scripts.data_models import EnrichedData
+from scripts.entity_index import EntityIndex
+from scripts.kb_integrator import GENERATED_END_MARKER, KBIntegrator, slugify
+from scripts.note_templates import CompiledTemplate
+
+TEMPLATE = "# {title}\n{summary}\n{entities_list}{text}\n{action_items_list}{missing}|{title!r}|{summary:>5}\n"
+
+
+def make_integrator(tmp_path, template: str = TEMPLATE, **kwargs) -> KBIntegrator:
+    (tmp_path / "templates").mkdir(exist_ok=True)
+    (tmp_path / "templates" / "default.md").write_text(template, encoding="utf-8")
+    return KBIntegrator(tmp_path / "vault", {"Default": "templates/default.md"}, project_root=tmp_path,
+                        template_check_seconds=0, **kwargs)
+
+
+def make_data(source_path: str, text: str = "hello", **fields) -> EnrichedData:
+    values = dict(text=text, source_path=source_path, category="Meeting Notes", summary="sum",
+                  entities={"ORG": ["Acme", "acme"]}, action_items=["Send the report"])
+    values.update(fields)
+    return EnrichedData(**values)
+
+
+def test_compiled_template_matches_format_map():
+    values = {"title": "Doc", "summary": "sum", "text": "body", "entities_list": "", "action_items_list": "",
+              "count": 3}
+    template = TEMPLATE + "{count}{count:03d}{title.upper}"
+    assert CompiledTemplate(template).render(values) == template.format_map(defaultdict(str, values))
+
+
+def test_slugify():
+    assert slugify("  Meeting Notes: Q3/Q4 (draft) ") == "meeting-notes-q3q4-draft"
+
+
+def test_note_is_rendered_and_ends_with_the_marker(tmp_path):
+    integrator = make_integrator(tmp_path)
+    note = integrator.create_note(make_data("/inbox/My Doc.pdf"))
+    assert note.endswith("meeting-notes/" + time.strftime("%Y-%m-%d") + "-my-doc.md")
+    content = open(note, encoding="utf-8").read()
+    assert content.startswith("# My Doc\nsum\n- **ORG:** [[Acme]]\nhello\n- [ ] Send the report\n|'My Doc'|  sum\n")
+    assert content.endswith(f"\n{GENERATED_END_MARKER}\n")
+
+
+def test_entity_links_point_to_the_written_hub_pages(tmp_path):
+    entity_index = EntityIndex(tmp_path / "entities.sqlite3", hub_dir=tmp_path / "vault" / "entities",
+                               labels=("ORG",))
+    integrator = make_integrator(tmp_path, entity_index=entity_index)
+    note = integrator.create_note(make_data("/inbox/doc.txt", entities={"ORG": ["A/B", "A B", "C#.NET", "C .NET"]}))
+    entity_index.flush(force=True)
+
+    targets = re.findall(r"\[\[([^|\]]+)", open(note, encoding="utf-8").read().split("\n")[2])
+    assert len(set(targets)) == 4
+    assert sorted(path.stem for path in (tmp_path / "vault" / "entities").iterdir()) == sorted(targets)
+    entity_index.close()
+
+
+def test_same_name_never_overwrites_another_note(tmp_path):
+    integrator = make_integrator(tmp_path, durable_writes=True)
+    notes = []
+    threads = [threading.Thread(target=lambda: notes.append(integrator.create_note(make_data("/inbox/race.txt"))))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(notes)) == 8
+    written = sorted(os.listdir(tmp_path / "vault" / "meeting-notes"))
+    assert written == sorted(os.path.basename(note) for note in notes)
+
+
+def test_batch_reports_failures_per_note(tmp_path):
+    integrator = make_integrator(tmp_path)
+    notes = integrator.create_notes([(make_data("/inbox/a.txt"), None),
+                                     (make_data("/inbox/b.txt", category=None), None),
+                                     (make_data("/inbox/c.txt"), None)])
+    assert notes[0] and notes[2]
+    assert notes[1] == ""
+
+
+def test_edited_template_is_recompiled(tmp_path):
+    integrator = make_integrator(tmp_path)
+    integrator.create_note(make_data("/inbox/a.txt"))
+    time.sleep(0.01)
+    (tmp_path / "templates" / "default.md").write_text("Changed {title}\n", encoding="utf-8")
+    note = integrator.create_note(make_data("/inbox/b.txt"))
+    assert open(note, encoding="utf-8").read().startswith("Changed b\n")
+
+
+def test_update_keeps_content_below_the_marker(tmp_path):
+    integrator = make_integrator(tmp_path, template="{text}\n")
+    note = integrator.create_note(make_data("/inbox/a.txt", text="first"))
+    integrator.link_duplicate(note, "/inbox/copy.txt", 0.9)
+    with open(note, "a", encoding="utf-8") as note_file:
+        note_file.write("My remark\n")
+    assert integrator.create_note(make_data("/inbox/a.txt", text="second"), note_path=note) == note
+    assert open(note, encoding="utf-8").read() == (f"second\n\n{GENERATED_END_MARKER}\n"
+                                                   f"\n> Duplicate source: copy.txt (90% similar)\nMy remark\n")
+    assert not [name for name in os.listdir(os.path.dirname(note)) if name.startswith(".")]
+
+
+def test_unchanged_update_does_not_rewrite_the_note(tmp_path):
+    integrator = make_integrator(tmp_path)
+    note = integrator.create_note(make_data("/inbox/a.txt"))
+    mtime = os.stat(note).st_mtime_ns
+    time.sleep(0.01)
+    assert integrator.create_note(make_data("/inbox/a.txt"), note_path=note) == note
+    assert os.stat(note).st_mtime_ns == mtime
@@ -0,0 +1,65 @@
+import pytest
+import main
+from scripts import ingestion
+
+
+class RecordingService:
+    instances = []
+
+    def __init__(self, config: dict) -> None:
+        self.batches = []
+        self.flushed = False
+        RecordingService.instances.append(self)
+
+    def process_batch(self, file_paths: list[str]) -> dict[str, str]:
+        self.batches.append(list(file_paths))
+        return {file_path: "" if "broken" in file_path else f"vault/{file_path}" for file_path in file_paths}
+
+    def flush(self) -> None:
+        self.flushed = True
+
+
+@pytest.fixture
+def service(monkeypatch):
+    RecordingService.instances = []
+    monkeypatch.setattr(ingestion, "IngestionService", RecordingService)
+    monkeypatch.setattr(ingestion, "load_config", lambda path: {"batch": {"documents": 2}})
+    return RecordingService
+
+
+def make_files(tmp_path, names: list[str]) -> None:
+    for name in names:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("content", encoding="utf-8")
+
+
+def test_directories_are_expanded_to_supported_files(tmp_path):
+    make_files(tmp_path, ["inbox/b.md", "inbox/a.txt", "inbox/sub/c.PDF", "inbox/skip.exe", "single.docx",
+                          "other.xyz"])
+    paths = main.collect_files([str(tmp_path / "inbox"), str(tmp_path / "single.docx"), str(tmp_path / "other.xyz")])
+    assert paths == [str(tmp_path / "inbox" / "a.txt"), str(tmp_path / "inbox" / "b.md"),
+                     str(tmp_path / "inbox" / "sub" / "c.PDF"), str(tmp_path / "single.docx")]
+
+
+def test_files_are_processed_in_configured_batches(tmp_path, service):
+    make_files(tmp_path, [f"inbox/{number}.txt" for number in range(5)])
+    assert main.main([str(tmp_path / "inbox")]) == 0
+
+    [instance] = service.instances
+    assert [len(batch) for batch in instance.batches] == [2, 2, 1]
+    assert sum(instance.batches, []) == [str(tmp_path / "inbox" / f"{number}.txt") for number in range(5)]
+    assert instance.flushed
+
+
+def test_any_failed_file_exits_with_status_1(tmp_path, service):
+    make_files(tmp_path, ["inbox/a.txt", "inbox/broken.txt", "inbox/c.txt"])
+    assert main.main([str(tmp_path / "inbox")]) == 1
+    assert service.instances[0].flushed
+
+
+def test_nothing_to_process_exits_with_status_1(tmp_path, service):
+    make_files(tmp_path, ["inbox/skip.exe"])
+    assert main.main([]) == 1
+    assert main.main([str(tmp_path / "inbox")]) == 1
+    assert service.instances == []
@@ -0,0 +1,38 @@
+from scripts.metrics import Metrics
+
+
+def worker_snapshot(calls: int, documents: int) -> dict:
+    return {"stages": {"classify": {"calls": calls, "wall_seconds": 1.0, "cpu_seconds": 0.5}},
+            "counters": {"documents_processed": documents}, "peak_rss_bytes": 300, "rss_bytes": 200,
+            "inference_cache": {"hits": documents, "hit_rate": 0.5}}
+
+
+def test_worker_snapshots_are_added_to_the_totals():
+    metrics = Metrics()
+    metrics.increment("documents_processed", 1)
+    metrics.update_worker("worker-0", worker_snapshot(calls=2, documents=3))
+    metrics.update_worker("worker-1", worker_snapshot(calls=1, documents=4))
+    # Snapshots are cumulative: a newer one replaces the previous one of the same worker.
+    metrics.update_worker("worker-1", worker_snapshot(calls=2, documents=5))
+
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["documents_processed"] == 9
+    assert snapshot["stages"]["classify"]["calls"] == 4
+    assert snapshot["peak_rss_bytes"] >= 300
+    assert snapshot["workers"]["worker-1"]["inference_cache"] == {"hits": 5, "hit_rate": 0.5}
+
+    text = metrics.prometheus_text()
+    assert "pkdm_documents_processed_total 9" in text
+    assert 'pkdm_inference_cache_hit_rate{worker="worker-0"} 0.5' in text
+
+
+def test_reset_drops_inherited_totals():
+    metrics = Metrics()
+    with metrics.stage("model_load"):
+        pass
+    metrics.update_worker("worker-0", worker_snapshot(calls=1, documents=1))
+    metrics.reset()
+    snapshot = metrics.snapshot()
+    assert snapshot["stages"] == {}
+    assert snapshot["counters"] == {}
+    assert "workers" not in snapshot
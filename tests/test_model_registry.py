@@ -0,0 +1,25 @@
+from scripts.model_registry import ModelRegistry
+
+
+def test_frozen_registry_ignores_configure_and_keeps_its_models():
+    registry = ModelRegistry()
+    registry.configure(max_memory_mb=None, idle_seconds=None)
+    registry.get("a", lambda: object())
+    registry.get("b", lambda: object())
+    registry.entries["a"]["bytes"] = registry.entries["b"]["bytes"] = 1024 * 1024
+    registry.freeze()
+
+    # A forked worker configuring its own service must not evict the shared models.
+    registry.configure(max_memory_mb=1, idle_seconds=1)
+    assert registry.max_memory_bytes is None
+    assert registry.idle_seconds is None
+    assert list(registry.entries) == ["a", "b"]
+
+
+def test_configure_enforces_the_ceiling_before_freezing():
+    registry = ModelRegistry()
+    registry.get("a", lambda: object())
+    registry.get("b", lambda: object())
+    registry.entries["a"]["bytes"] = registry.entries["b"]["bytes"] = 1024 * 1024
+    registry.configure(max_memory_mb=1)
+    assert list(registry.entries) == ["b"]
@@ -0,0 +1,31 @@
+from scripts.search_index import SearchIndex
+
+
+def make_vault(tmp_path):
+    vault = tmp_path / "vault"
+    (vault / "meeting-notes").mkdir(parents=True)
+    (vault / "entities").mkdir()
+    (vault / ".obsidian").mkdir()
+    (vault / "meeting-notes" / "2024-01-01-kickoff.md").write_text(
+        "# Kickoff\n\n## Summary\nAcme kickoff.\n\n- [ ] Send the contract\n", encoding="utf-8")
+    (vault / "entities" / "Acme.md").write_text("# Acme\n\n- [[2024-01-01-kickoff]]\n", encoding="utf-8")
+    (vault / ".obsidian" / "workspace.md").write_text("# Acme\n", encoding="utf-8")
+    return vault
+
+
+def test_reindex_skips_hidden_and_excluded_directories(tmp_path):
+    vault = make_vault(tmp_path)
+    index = SearchIndex(vault / ".search.sqlite3")
+    assert index.reindex(vault, exclude=("entities",))["indexed"] == 1
+    assert [result["title"] for result in index.search("Acme")] == ["Kickoff"]
+    assert [item["text"] for item in index.open_action_items()] == ["Send the contract"]
+    index.close()
+
+
+def test_reindex_removes_previously_indexed_hub_pages(tmp_path):
+    vault = make_vault(tmp_path)
+    index = SearchIndex(vault / ".search.sqlite3")
+    assert index.reindex(vault)["indexed"] == 2
+    assert index.reindex(vault, exclude=("entities",))["removed"] == 1
+    assert len(index.search("Acme")) == 1
+    index.close()
@@ -0,0 +1,66 @@
+import io
+import os
+from scripts.file_handler import PlainTextConverter, split_elements
+from scripts.source_index import SourceIndex, SourceRecord
+from scripts.spooled_text import SPOOL_PREFIX, clear_spool, copy_spooled_text, spool_elements
+
+
+def test_elements_round_trip_through_the_spool_file(tmp_path):
+    elements = ["First paragraph.", "Second\n\n\nparagraph with a blank line.", "   ", "Third."]
+    spooled = spool_elements(elements, directory=tmp_path)
+    assert list(spooled.elements()) == ["First paragraph.", "Second\nparagraph with a blank line.", "Third."]
+    assert spooled.words == 9
+    # Hashed like the same text read in memory, where the blank line splits the second element.
+    assert spooled.element_hashes == SourceIndex.element_hashes(split_elements("\n\n".join(elements)))
+    assert len(spooled.element_hashes) == 4
+    assert spooled.sample == "First paragraph.\n\nSecond\nparagraph with a blank line.\n\nThird."
+    spooled.remove()
+    assert not os.path.exists(spooled.path)
+
+
+def test_sample_is_bounded_and_spread_over_the_document(tmp_path):
+    elements = [f"{number:04d} " + "x" * 95 for number in range(1000)]
+    spooled = spool_elements(elements, directory=tmp_path, sample_chars=1600, windows=16)
+    assert len(spooled.sample) <= 1600 + 2 * 16
+    assert "0000" in spooled.sample
+    assert any(f"{number:04d}" in spooled.sample for number in range(900, 1000))
+    spooled.remove()
+
+
+def test_copy_stops_at_the_character_limit(tmp_path):
+    spooled = spool_elements(["a" * 10, "b" * 10], directory=tmp_path)
+    target = io.StringIO()
+    assert copy_spooled_text(spooled.path, target, max_chars=15, chunk_size=4)
+    assert target.getvalue() == "a" * 10 + "\n\nbbb"
+    target = io.StringIO()
+    assert not copy_spooled_text(spooled.path, target, chunk_size=4)
+    assert target.getvalue() == "a" * 10 + "\n\n" + "b" * 10
+
+
+def test_clear_spool_keeps_the_files_of_running_processes(tmp_path):
+    own = spool_elements(["text"], directory=tmp_path)
+    live = tmp_path / f"{SPOOL_PREFIX}{os.getppid()}-live.txt"
+    stale = tmp_path / f"{SPOOL_PREFIX}999999999-stale.txt"
+    live.write_text("x")
+    stale.write_text("x")
+    clear_spool(tmp_path)
+    assert live.exists()
+    assert not stale.exists()
+    assert os.path.exists(own.path)
+    own.remove()
+
+
+def test_streamed_log_matches_its_earlier_version_read_in_memory(tmp_path):
+    # A log without blank lines, which the streaming converter cuts into elements of a bounded size.
+    log = "\n".join(f"2024-05-01 12:{number // 60:02d}:{number % 60:02d} request {number} served in {number % 97} ms"
+                    for number in range(3000))
+    previous = SourceRecord(name="app.log", file_hash="",
+                            element_hashes=SourceIndex.element_hashes(split_elements(log)))
+    grown = tmp_path / "app.log"
+    grown.write_text(log + "\n" + "\n".join(f"late request {number}" for number in range(100)), encoding="utf-8")
+
+    spooled = spool_elements(PlainTextConverter().iter_elements(str(grown)),
+                             directory=tmp_path)
+    assert len(list(spooled.elements())) > 1
+    assert previous.similarity(spooled.element_hashes) >= 0.8
+    spooled.remove()
@@ -0,0 +1,84 @@
+import random
+import pytest
+from benchmarks.stubs import StubSummarizationPipeline, StubSummarizer
+from scripts.model_registry import model_registry
+
+CONFIG = {"chunk_tokens": 42, "chunk_max_length": 10, "chunk_min_length": 2, "max_chunks": 32,
+          "max_total_tokens": 32768, "max_reduce_rounds": 3, "min_words": 60}
+
+
+class RecordingPipeline(StubSummarizationPipeline):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = []
+
+    def __call__(self, texts, max_length: int = 150, min_length: int = 40, **kwargs):
+        self.calls.append((list(texts), max_length))
+        return super().__call__(texts, max_length=max_length, min_length=min_length, **kwargs)
+
+
+class RecordingSummarizer(StubSummarizer):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.model_name = "test/recording-summarizer"
+        self.pipeline = RecordingPipeline()
+
+    def _load_pipeline(self):
+        return self.pipeline
+
+
+@pytest.fixture(autouse=True)
+def unload_models():
+    yield
+    model_registry.unload()
+
+
+def document(seed: int, elements: int = 40) -> str:
+    rng = random.Random(seed)
+    # Mostly short paragraphs, with a few longer than a whole chunk.
+    lengths = [rng.choice([3, 8, 15, 25, 90]) for _ in range(elements)]
+    return "\n\n".join(" ".join(f"w{seed}-{index}-{word}" for word in range(length))
+                       for index, length in enumerate(lengths))
+
+
+def test_chunks_fit_the_window_and_keep_every_word():
+    summarizer = StubSummarizer(config={**CONFIG, "max_chunks": 1000})
+    text = document(1)
+    chunks = summarizer._chunk(text)
+    assert summarizer.chunk_tokens == 40
+    assert len(chunks) > 1
+    assert all(len(chunk.split()) <= summarizer.chunk_tokens for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_chunking_is_deterministic():
+    text = document(2)
+    assert StubSummarizer(config=CONFIG)._chunk(text) == StubSummarizer(config=CONFIG)._chunk(text)
+    first = StubSummarizer(config=CONFIG).summarize_batch([text, document(3)])
+    model_registry.unload()
+    assert StubSummarizer(config=CONFIG).summarize_batch([text, document(3)]) == first
+
+
+def test_over_long_texts_are_sampled_across_the_document():
+    summarizer = StubSummarizer(config={**CONFIG, "max_chunks": 4})
+    text = document(4, elements=200)
+    chunks = summarizer._chunk(text)
+    assert len(chunks) == 4
+    words = text.split()
+    assert words.index(chunks[-1].split()[0]) > len(words) // 2
+
+
+def test_reduce_passes_end_in_a_single_summary_per_text():
+    summarizer = RecordingSummarizer(config=CONFIG)
+    texts = [document(5), "too short to summarize", document(6, elements=10)]
+    summaries = summarizer.summarize_batch(texts, batch_size=4)
+
+    assert summaries[1] == "too short to summarize"
+    calls = summarizer.pipeline.calls
+    # Map and reduce passes use the chunk length; the texts end in one final pass of one input each.
+    final_inputs = [text for inputs, max_length in calls if max_length == 150 for text in inputs]
+    assert len(final_inputs) == 2
+    assert {summaries[0], summaries[2]} == {" ".join(text.split()[:150]) for text in final_inputs}
+    assert all(len(text.split()) <= summarizer.chunk_tokens for text in final_inputs)
+    assert sum(1 for _, max_length in calls if max_length == 10) >= 2
+    assert summaries[0] and summaries[2]
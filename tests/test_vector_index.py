@@ -0,0 +1,44 @@
+import numpy as np
+from scripts.vector_index import VectorIndex
+
+
+def unit(values) -> np.ndarray:
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_exact_search_returns_the_most_similar_keys(tmp_path):
+    index = VectorIndex(tmp_path / "vectors")
+    index.add("a.md", unit([1, 0, 0]))
+    index.add("b.md", unit([0.9, 0.1, 0]))
+    index.add("c.md", unit([0, 0, 1]))
+    results = index.search(unit([1, 0, 0]), k=2)
+    assert [key for key, _ in results] == ["a.md", "b.md"]
+    assert results[0][1] > 0.99
+    assert [key for key, _ in index.search(unit([1, 0, 0]), k=1, exclude={"a.md"})] == ["b.md"]
+
+
+def test_replacing_a_key_keeps_one_row(tmp_path):
+    index = VectorIndex(tmp_path / "vectors")
+    index.add("a.md", unit([1, 0, 0]))
+    index.add("a.md", unit([0, 1, 0]))
+    assert len(index) == 1
+    assert index.search(unit([0, 1, 0]), k=1)[0][0] == "a.md"
+
+
+def test_other_instances_see_added_vectors(tmp_path):
+    # Two instances on the same directory stand in for two worker processes.
+    first = VectorIndex(tmp_path / "vectors")
+    second = VectorIndex(tmp_path / "vectors")
+    first.add("a.md", unit([1, 0]))
+    second.add("b.md", unit([0, 1]))
+    assert {key for key, _ in first.search(unit([1, 1]), k=5)} == {"a.md", "b.md"}
+
+
+def test_clustered_search_finds_near_neighbours(tmp_path):
+    rng = np.random.default_rng(0)
+    index = VectorIndex(tmp_path / "vectors", exact_max=50, nprobe=4)
+    vectors = rng.normal(size=(200, 16)).astype(np.float32)
+    for number, vector in enumerate(vectors):
+        index.add(f"{number}.md", unit(vector))
+    assert index.search(unit(vectors[42]), k=1)[0][0] == "42.md"
@@ -0,0 +1,122 @@
+import time
+import pytest
+from scripts.ingestion_worker import IngestionWorker
+from scripts.watcher import Watcher
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class RecordingWorker:
+    def __init__(self) -> None:
+        self.submitted = []
+
+    def submit(self, file_path, priority=None):
+        self.submitted.append((file_path, priority))
+        return True
+
+
+class RecordingService:
+    def __init__(self) -> None:
+        self.batches = []
+
+    def process_batch(self, file_paths):
+        self.batches.append(list(file_paths))
+        return {file_path: file_path for file_path in file_paths}
+
+    def flush(self):
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def worker():
+    return RecordingWorker()
+
+
+@pytest.fixture
+def watcher(tmp_path, worker):
+    return Watcher(worker, root=str(tmp_path), settle_seconds=2.0)
+
+
+def test_growing_file_is_submitted_only_after_it_settles(tmp_path, clock, worker, watcher):
+    path = tmp_path / "download.pdf"
+    path.write_bytes(b"x" * 10)
+    watcher.track(str(path))
+    for size in (20, 30, 40):
+        clock.now += 5
+        assert watcher.poll() == 0
+        path.write_bytes(b"x" * size)
+    # The last change is only seen on this poll, which restarts the timer.
+    clock.now += 5
+    assert watcher.poll() == 0
+    clock.now += 1
+    assert watcher.poll() == 0
+    assert worker.submitted == []
+
+    clock.now += 1
+    assert watcher.poll() == 1
+    assert worker.submitted == [(str(path), 40)]
+    assert watcher.pending == {}
+
+
+def test_repeated_events_submit_a_file_once(tmp_path, clock, worker, watcher):
+    path = tmp_path / "note.txt"
+    path.write_text("Some text", encoding="utf-8")
+    for _ in range(5):
+        watcher.track(str(path))
+        clock.now += 1
+    assert watcher.poll() == 0
+    clock.now += 2
+    assert watcher.poll() == 1
+    for _ in range(3):
+        clock.now += 5
+        assert watcher.poll() == 0
+    assert worker.submitted == [(str(path), 9)]
+
+
+def test_ignored_files_are_never_submitted(tmp_path, clock, worker, watcher):
+    names = [".hidden.md", "~$report.docx", "report.docx~", "upload.tmp", "movie.part", "file.crdownload",
+             ".git/config", "notes/.obsidian/workspace.json"]
+    for name in names:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("content", encoding="utf-8")
+        watcher.track(str(path))
+    kept = tmp_path / "notes" / "kept.md"
+    kept.write_text("content", encoding="utf-8")
+
+    assert watcher.scan() == 1
+    for _ in range(3):
+        clock.now += 5
+        watcher.poll()
+    assert worker.submitted == [(str(kept), 7)]
+
+
+def test_worker_takes_smaller_files_first(tmp_path):
+    service = RecordingService()
+    worker = IngestionWorker(service, max_workers=1, batch_size=1)
+    paths = []
+    for name, size in (("huge.pdf", 5000), ("note.txt", 10), ("medium.md", 300), ("tiny.md", 1)):
+        path = tmp_path / name
+        path.write_bytes(b"x" * size)
+        paths.append(str(path))
+    for path in paths:
+        assert worker.submit(path)
+    # Already waiting, so not queued twice.
+    assert not worker.submit(paths[0])
+
+    worker.start()
+    worker.stop()
+    assert service.batches == [[str(tmp_path / name)] for name in ("tiny.md", "note.txt", "medium.md", "huge.pdf")]
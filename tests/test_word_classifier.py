@@ -0,0 +1,46 @@
+from scripts.word_classifier import KeywordClassifier, _build_trie_pattern
+
+CONFIG = {
+    "Code": ["def", "define", "c++", "c#", "node.js", "pull request"],
+    "Meeting Notes": ["meeting", "action items", "action"],
+    "Article": ["study", "introduction"],
+}
+
+
+def test_shared_prefixes_are_merged():
+    assert _build_trie_pattern(["def", "define", "deferred"]) == "def(?:erred|ine)?"
+
+
+def test_keywords_only_match_whole_words():
+    classifier = KeywordClassifier(CONFIG)
+    assert classifier.scores("We defer the undefined definitions, as defined.")["Code"] == 0
+    assert classifier.scores("def main(): pass; #define X; redefine")["Code"] == 2
+    assert classifier.scores("Meetings and premeeting notes")["Meeting Notes"] == 0
+
+
+def test_multi_word_keywords_match_across_whitespace_runs_and_newlines():
+    classifier = KeywordClassifier({"Meeting Notes": ["Action  Items"], "Code": ["pull request"]})
+    text = "Action items:\nACTION \t ITEMS\nAction\n\nitems\nOpen a pull\nrequest. Actionitems, action itemsX"
+    assert classifier.scores(text) == {"Meeting Notes": 3, "Code": 1}
+
+
+def test_keywords_with_symbols():
+    classifier = KeywordClassifier(CONFIG)
+    text = "C++ and C# code, a Node.js server (node.js), c++17 and nodexjs"
+    assert classifier.scores(text)["Code"] == 4
+    assert classifier.scores("abc# and xc++ and nodejs")["Code"] == 0
+
+
+def test_longest_keyword_is_counted_once():
+    classifier = KeywordClassifier(CONFIG)
+    scores = classifier.scores("The action items of the meeting; action!")
+    assert scores == {"Code": 0, "Meeting Notes": 3, "Article": 0}
+
+
+def test_classify_picks_the_most_hits_and_breaks_ties_by_order():
+    classifier = KeywordClassifier(CONFIG)
+    assert classifier.classify("A study with an introduction, written at a meeting") == "Article"
+    assert classifier.classify("A study from the meeting") == "Meeting Notes"
+    assert classifier.classify("Study: def main in node.js at the meeting") == "Code"
+    assert classifier.classify("Nothing to see here") == "uncategorized"
+    assert KeywordClassifier({}).classify("meeting") == "uncategorized"
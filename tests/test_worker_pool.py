@@ -0,0 +1,93 @@
+import os
+import shutil
+from pathlib import Path
+import pytest
+from benchmarks.stubs import StubNerEnricher, StubSummarizer, StubZeroShotService
+from scripts import enrichment_pipeline, ingestion, worker_pool
+from scripts.metrics import metrics
+from scripts.model_registry import model_registry
+from scripts.worker_pool import PreforkWorkerPool
+
+PROJECT_ROOT = Path(__file__).parent.parent
+LOADS_PATH = None
+
+
+def record_load(name: str) -> None:
+    with open(LOADS_PATH, "a", encoding="utf-8") as loads_file:
+        loads_file.write(f"{name} {os.getpid()}\n")
+
+
+class RecordingZeroShotService(StubZeroShotService):
+    def _load_pipeline(self):
+        record_load("zero_shot")
+        return super()._load_pipeline()
+
+
+class RecordingSummarizer(StubSummarizer):
+    def _load_pipeline(self):
+        record_load("summarizer")
+        return super()._load_pipeline()
+
+
+class RecordingNerEnricher(StubNerEnricher):
+    def _load_model(self):
+        record_load("ner")
+        return super()._load_model()
+
+
+@pytest.fixture
+def pool_config(tmp_path, monkeypatch):
+    global LOADS_PATH
+    LOADS_PATH = tmp_path / "loads.txt"
+    for module in (worker_pool, ingestion):
+        monkeypatch.setattr(module, "ZeroShotService", RecordingZeroShotService)
+    for module in (worker_pool, enrichment_pipeline):
+        monkeypatch.setattr(module, "Summarizer", RecordingSummarizer)
+        monkeypatch.setattr(module, "NerEnricher", RecordingNerEnricher)
+
+    class TemporaryIngestionService(ingestion.IngestionService):
+        def __init__(self, config: dict) -> None:
+            super().__init__(config, vault_path=tmp_path / "vault", archive_path=tmp_path / "archive",
+                             project_root=tmp_path)
+
+    monkeypatch.setattr(worker_pool, "IngestionService", TemporaryIngestionService)
+    # The pool freezes the process-wide registry; the other tests need it configurable again.
+    monkeypatch.setattr(model_registry, "frozen", False)
+    shutil.copytree(PROJECT_ROOT / "templates", tmp_path / "templates")
+    config = ingestion.load_config()
+    config["similar_notes"]["enabled"] = False
+    config["metrics"]["enabled"] = False
+    metrics.reset()
+    yield config
+    metrics.reset()
+    model_registry.unload()
+
+
+def test_forked_workers_share_the_models_and_report_their_metrics(tmp_path, pool_config):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    for number in range(6):
+        (inbox / f"note {number}.md").write_text(f"# Meeting {number}\n\nAgenda item {number} for the team.\n\n"
+                                                 f"- [ ] Send report {number}\n", encoding="utf-8")
+
+    pool = PreforkWorkerPool(pool_config, processes=2, batch_size=2, torch_threads=1)
+    for path in sorted(inbox.iterdir()):
+        assert pool.submit(str(path))
+    pool.start()
+    pool.stop()
+
+    assert list(inbox.iterdir()) == []
+    notes = [path for path in (tmp_path / "vault").rglob("*.md") if path.parent.name != "entities"]
+    assert len(notes) == 6
+    # Every model was loaded once, in the parent, before forking.
+    loads = (tmp_path / "loads.txt").read_text(encoding="utf-8").split("\n")[:-1]
+    assert sorted(loads) == sorted(f"{name} {os.getpid()}" for name in ("zero_shot", "summarizer", "ner"))
+
+    snapshot = metrics.snapshot()
+    assert set(snapshot["workers"]) == {"ingestion-process-0", "ingestion-process-1"}
+    assert snapshot["counters"]["documents_processed"] == 6
+    assert snapshot["stages"]["model_load"]["calls"] == 3
+    text = metrics.prometheus_text()
+    assert "pkdm_documents_processed_total 6" in text
+    for name in ("ingestion-process-0", "ingestion-process-1"):
+        assert f'pkdm_worker_rss_bytes{{worker="{name}"}}' in text
@@ -0,0 +1,135 @@
+import threading
+import time
+import pytest
+from scripts.zero_shot_service import ZeroShotService
+
+
+class RecordingPipeline:
+    def __init__(self) -> None:
+        self.calls = []
+        # Cleared to hold the scheduler inside a forward pass while other callers queue up.
+        self.release = threading.Event()
+        self.release.set()
+        self.entered = threading.Event()
+
+    def __call__(self, sequences, candidate_labels, batch_size=1, **kwargs):
+        single = isinstance(sequences, str)
+        texts = [sequences] if single else list(sequences)
+        self.calls.append((texts, list(candidate_labels)))
+        self.entered.set()
+        assert self.release.wait(5)
+        if any("bad" in text for text in texts):
+            raise ValueError("unreadable input")
+        results = [{"labels": [f"{candidate_labels[0]}:{text}"], "scores": [0.9]} for text in texts]
+        return results[0] if single else results
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    pipeline = RecordingPipeline()
+    monkeypatch.setattr(ZeroShotService, "classifier", property(lambda self: pipeline))
+    return pipeline
+
+
+@pytest.fixture
+def service(pipeline):
+    service = ZeroShotService(config={"scheduler": {"enabled": True, "max_wait_ms": 5000, "max_batch_size": 32}})
+    yield service
+    pipeline.release.set()
+    service.close()
+
+
+def call_in_thread(service, texts, labels):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", service.predict_batch(texts, labels)))
+    thread.start()
+    return thread, result
+
+
+def hold_scheduler(service, pipeline):
+    # Keeps the scheduler busy with a first request, so the next ones are all queued when it is released.
+    pipeline.release.clear()
+    thread, _ = call_in_thread(service, ["gate"], ["x"])
+    assert pipeline.entered.wait(5)
+    return thread
+
+
+def wait_for_queue(service, size):
+    deadline = time.monotonic() + 5
+    while service.requests.qsize() < size:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_concurrent_callers_share_one_forward_pass(service, pipeline):
+    gate = hold_scheduler(service, pipeline)
+    callers = [call_in_thread(service, [f"text {number}", f"more {number}"], ["a", "b"]) for number in range(4)]
+    wait_for_queue(service, 4)
+    released = time.monotonic()
+    pipeline.release.set()
+    for thread, _ in [(gate, None)] + callers:
+        thread.join(5)
+
+    # Once every queued caller is in the batch, the scheduler does not wait for the deadline.
+    assert time.monotonic() - released < service.max_wait_seconds / 2
+    assert len(pipeline.calls) == 2
+    assert sorted(pipeline.calls[1][0]) == sorted(f"{word} {number}" for number in range(4)
+                                                  for word in ("text", "more"))
+    for number, (_, result) in enumerate(callers):
+        assert result["value"] == [(f"a:text {number}", 0.9), (f"a:more {number}", 0.9)]
+
+
+def test_requests_are_grouped_by_label_set(service, pipeline):
+    gate = hold_scheduler(service, pipeline)
+    callers = [call_in_thread(service, [f"text {number}"], ["a", "b"] if number % 2 else ["c"])
+               for number in range(4)]
+    wait_for_queue(service, 4)
+    pipeline.release.set()
+    for thread, _ in [(gate, None)] + callers:
+        thread.join(5)
+
+    batches = {tuple(labels): sorted(texts) for texts, labels in pipeline.calls[1:]}
+    assert batches == {("a", "b"): ["text 1", "text 3"], ("c",): ["text 0", "text 2"]}
+    assert [result["value"] for _, result in callers] == [[("c:text 0", 0.9)], [("a:text 1", 0.9)],
+                                                          [("c:text 2", 0.9)], [("a:text 3", 0.9)]]
+
+
+def test_single_caller_does_not_wait_for_the_deadline(service, pipeline):
+    started = time.monotonic()
+    assert service.predict_batch(["alone"], ["a"]) == [("a:alone", 0.9)]
+    assert time.monotonic() - started < service.max_wait_seconds / 2
+
+
+def test_failed_batch_is_retried_per_text_for_the_right_callers(service, pipeline):
+    gate = hold_scheduler(service, pipeline)
+    first, first_result = call_in_thread(service, ["good 1", "bad 1"], ["a"])
+    wait_for_queue(service, 1)
+    second, second_result = call_in_thread(service, ["good 2"], ["a"])
+    wait_for_queue(service, 2)
+    pipeline.release.set()
+    for thread in (gate, first, second):
+        thread.join(5)
+
+    assert pipeline.calls[1][0] == ["good 1", "bad 1", "good 2"]
+    assert [texts for texts, _ in pipeline.calls[2:]] == [["good 1"], ["bad 1"], ["good 2"]]
+    assert first_result["value"] == [("a:good 1", 0.9), ("uncategorized", 0.0)]
+    assert second_result["value"] == [("a:good 2", 0.9)]
+
+
+def test_close_answers_queued_callers_and_stops_the_scheduler(service, pipeline):
+    gate = hold_scheduler(service, pipeline)
+    waiting, result = call_in_thread(service, ["queued"], ["a"])
+    wait_for_queue(service, 1)
+    scheduler = service.scheduler_thread
+    closing = threading.Thread(target=service.close)
+    closing.start()
+    pipeline.release.set()
+    for thread in (gate, waiting, closing):
+        thread.join(5)
+        assert not thread.is_alive()
+
+    assert result["value"] == [("a:queued", 0.9)]
+    assert not scheduler.is_alive()
+    assert service.scheduler_thread is None
+    # Later calls run the model directly instead of waiting on the stopped scheduler.
+    assert service.predict_batch(["late"], ["a"]) == [("a:late", 0.9)]